@@ -1,15 +1,16 @@
 # app.py
 
 import os
-import time
 import json
 import base64
 import re
+import uuid
+from collections import Counter
 import streamlit as st
 from dotenv import load_dotenv
 from markdown_it import MarkdownIt
-from src.cogniquery_crew.crew import CogniQueryCrew
-from src.cogniquery_crew.tools.activity_logger import get_activity_logger
+from src.cogniquery_crew.job_queue import get_job_scheduler, QueueFullError
+from src.cogniquery_crew.tools.run_context import RunContext
 
 # Try to import WeasyPrint - it might not be available in all environments
 try:
@@ -33,23 +34,22 @@ except ImportError:
 
 # Load environment variables
 load_dotenv()
-# Ensure output directory exists
-os.makedirs("output", exist_ok=True)
 
-def create_pdf_report(markdown_content, chart_files):
+def create_pdf_report(markdown_content, chart_images):
     """
     Generates a PDF report from markdown and chart images, embedding the images.
+    chart_images come from the run's artifact registry (name, media type and bytes).
     Uses WeasyPrint if available, otherwise falls back to ReportLab.
     """
     if WEASYPRINT_AVAILABLE:
-        return create_pdf_with_weasyprint(markdown_content, chart_files)
+        return create_pdf_with_weasyprint(markdown_content, chart_images)
     elif REPORTLAB_AVAILABLE:
-        return create_pdf_with_reportlab(markdown_content, chart_files)
+        return create_pdf_with_reportlab(markdown_content, chart_images)
     else:
         st.error("PDF generation is unavailable. Neither WeasyPrint nor ReportLab are properly installed.")
         return None
 
-def create_pdf_with_weasyprint(markdown_content, chart_files):
+def create_pdf_with_weasyprint(markdown_content, chart_images):
     """
     Generates a PDF using WeasyPrint (preferred method).
     """
@@ -58,27 +58,23 @@ def create_pdf_with_weasyprint(markdown_content, chart_files):
         pdf_content = markdown_content
 
         # --- 1. Find chart references and replace with Base64 embedded images ---
-        for chart_file in chart_files:
-            chart_path = os.path.join("output", chart_file)
-            if os.path.exists(chart_path):
-                try:
-                    # Read image data in binary format
-                    with open(chart_path, "rb") as f:
-                        image_data = f.read()
-                    # Encode to Base64
-                    base64_image = base64.b64encode(image_data).decode("utf-8")
-                    # Create the HTML img tag with embedded data
-                    img_tag = f'<img src="data:image/png;base64,{base64_image}" alt="{chart_file}" style="max-width: 100%; height: auto; margin: 20px auto; display: block;">'
-                    
-                    # Replace various possible markdown image references
-                    chart_name = chart_file.split('.')[0]
-                    pdf_content = pdf_content.replace(f"![{chart_name}]({chart_file})", img_tag)
-                    pdf_content = pdf_content.replace(f"![Chart]({chart_file})", img_tag)
-                    pdf_content = pdf_content.replace(f"![chart]({chart_file})", img_tag)
-                    pdf_content = pdf_content.replace(chart_file, img_tag)
-
-                except Exception as e:
-                    st.warning(f"Could not embed chart {chart_file}: {e}")
+        for chart in chart_images:
+            chart_file = chart.name
+            try:
+                # Encode the chart bytes to Base64
+                base64_image = base64.b64encode(chart.data).decode("utf-8")
+                # Create the HTML img tag with embedded data
+                img_tag = f'<img src="data:{chart.media_type};base64,{base64_image}" alt="{chart_file}" style="max-width: 100%; height: auto; margin: 20px auto; display: block;">'
+                
+                # Replace various possible markdown image references
+                chart_name = chart_file.split('.')[0]
+                pdf_content = pdf_content.replace(f"![{chart_name}]({chart_file})", img_tag)
+                pdf_content = pdf_content.replace(f"![Chart]({chart_file})", img_tag)
+                pdf_content = pdf_content.replace(f"![chart]({chart_file})", img_tag)
+                pdf_content = pdf_content.replace(chart_file, img_tag)
+
+            except Exception as e:
+                st.warning(f"Could not embed chart {chart_file}: {e}")
 
         # --- 2. Convert the final Markdown to HTML ---
         md = MarkdownIt()
@@ -134,7 +130,7 @@ def create_pdf_with_weasyprint(markdown_content, chart_files):
         st.error(f"Failed to generate PDF with WeasyPrint: {e}")
         return None
 
-def create_pdf_with_reportlab(markdown_content, chart_files):
+def create_pdf_with_reportlab(markdown_content, chart_images):
     """
     Generates a PDF using ReportLab (fallback method for Windows).
     """
@@ -371,21 +367,24 @@ def create_pdf_with_reportlab(markdown_content, chart_files):
             story.append(Paragraph(para_text, body_style))
         
         # Add charts with proper formatting
-        for chart_file in chart_files:
-            chart_path = os.path.join("output", chart_file)
-            if os.path.exists(chart_path):
-                try:
-                    story.append(Spacer(1, 30))
-                    chart_title = chart_file.replace('.png', '').replace('_', ' ').title()
-                    story.append(Paragraph(f"Chart: {chart_title}", h3_style))
-                    story.append(Spacer(1, 10))
-                    
-                    # Add the image with appropriate sizing
-                    img = Image(chart_path, width=6.5*inch, height=4*inch)
-                    story.append(img)
-                    story.append(Spacer(1, 20))
-                except Exception as e:
-                    story.append(Paragraph(f"Error loading chart {chart_file}: {e}", body_style))
+        for chart in chart_images:
+            chart_file = chart.name
+            if chart.media_type == "image/svg+xml":
+                # ReportLab only draws raster images
+                story.append(Paragraph(f"Chart {chart_file} is an SVG and cannot be embedded by ReportLab.", body_style))
+                continue
+            try:
+                story.append(Spacer(1, 30))
+                chart_title = chart_file.replace('.png', '').replace('_', ' ').title()
+                story.append(Paragraph(f"Chart: {chart_title}", h3_style))
+                story.append(Spacer(1, 10))
+                
+                # Add the image with appropriate sizing, straight from memory
+                img = Image(BytesIO(chart.data), width=6.5*inch, height=4*inch)
+                story.append(img)
+                story.append(Spacer(1, 20))
+            except Exception as e:
+                story.append(Paragraph(f"Error loading chart {chart_file}: {e}", body_style))
         
         # Build the PDF
         doc.build(story)
@@ -480,112 +479,104 @@ def create_table_from_markdown(table_rows):
     
     return table
 
-def cleanup_output_files():
-    """Removes generated files from the output directory to keep it clean."""
-    # Clean generated files from output directory
-    file_patterns = ["chart.png", "final_report.md", "final_report.pdf", "activity_log.json"]
-    
-    for pattern in file_patterns:
-        file_path = f"output/{pattern}"
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                print(f"Cleaned up: {file_path}")
-            except Exception as e:
-                print(f"Could not remove {file_path}: {e}")
-    
-    # Also remove any other PNG files that might have been created
-    if os.path.exists("output"):
-        for file in os.listdir("output"):
-            if file.endswith('.png'):
-                try:
-                    os.remove(f"output/{file}")
-                    print(f"Cleaned up chart file: {file}")
-                except Exception as e:
-                    print(f"Could not remove chart file {file}: {e}")
-
-def display_activity_log():
-    """Display the current activity log in the UI."""
+def cleanup_previous_run():
+    """Removes this session's previous run workspace; runs of other sessions are left alone."""
+    previous_run = st.session_state.pop('run_context', None)
+    if previous_run is not None:
+        previous_run.cleanup()
+        print(f"Cleaned up run workspace: {previous_run.workspace}")
+
+def create_activity_feed(container, logger):
+    """Set up the activity log so later updates only append new entries."""
+    with container:
+        header = st.empty()
+        entries = st.container()
+    return {"header": header, "entries": entries, "logger": logger, "cursor": 0, "counts": Counter()}
+
+def update_activity_feed(feed):
+    """Render activities logged since the last update and refresh the summary."""
     try:
-        logger = get_activity_logger()
-        activities = logger.get_activities()
+        logger = feed["logger"]
+        new_activities, feed["cursor"] = logger.get_activities_since(feed["cursor"])
         status = logger.get_current_status()
+        counts = feed["counts"]
+        for activity in new_activities:
+            counts[activity.get('type')] += 1
         
-        if not activities and not status.get('current_agent'):
+        if not sum(counts.values()) and not status.get('current_agent'):
             return
         
-        st.subheader("🔍 Agent Activity Log")
-        st.write("*Watch your AI agents work in real-time! All SQL queries and Python code execution are logged below.*")
-        
-        # Current status indicator
-        if status.get('current_agent') and status.get('current_task'):
-            st.info(f"🤖 **Currently Active:** {status['current_agent']} is working on {status['current_task'].replace('_', ' ')}")
-        
-        # Activity summary
-        sql_count = len([a for a in activities if a.get('type') == 'sql_query'])
-        python_count = len([a for a in activities if a.get('type') == 'python_code'])
-        task_count = len([a for a in activities if a.get('type') == 'task_start'])
-        
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("SQL Queries", sql_count)
-        with col2:
-            st.metric("Python Scripts", python_count)
-        with col3:
-            st.metric("Tasks Started", task_count)
-        
-        if not activities:
-            return
+        with feed["header"].container():
+            st.subheader("🔍 Agent Activity Log")
+            st.write("*Watch your AI agents work in real-time! All SQL queries and Python code execution are logged below.*")
             
-        st.divider()
-        
-        for i, activity in enumerate(activities):
-            timestamp = activity.get('timestamp', '').split('T')[1].split('.')[0] if activity.get('timestamp') else ''
-            agent = activity.get('agent', 'Unknown')
-            activity_type = activity.get('type', 'unknown')
-            content = activity.get('content', '')
-            details = activity.get('details', {})
+            # Current status indicator
+            if status.get('current_agent') and status.get('current_task'):
+                st.info(f"🤖 **Currently Active:** {status['current_agent']} is working on {status['current_task'].replace('_', ' ')}")
             
-            # Create different styling for different activity types
-            if activity_type == 'sql_query':
-                st.markdown(f"**🗄️ [{timestamp}] {agent} - SQL Query Execution**")
-                st.code(content, language='sql')
-                if details.get('result_preview'):
-                    st.success("✅ Query executed successfully")
-                    with st.expander("View Query Results"):
-                        st.text(details['result_preview'])
-                        
-            elif activity_type == 'python_code':
-                st.markdown(f"**🐍 [{timestamp}] {agent} - Python Code Execution**")
-                st.code(content, language='python')
-                if details.get('result'):
-                    with st.expander("View Execution Results"):
-                        st.text(details['result'])
-                        
-            elif activity_type == 'task_start':
-                st.markdown(f"**🎯 [{timestamp}] {agent} - Task Started**")
-                st.info(f"**{details.get('task_name', 'Unknown Task')}**")
-                with st.expander("Task Description"):
-                    st.write(details.get('description', content))
-                    
-            elif activity_type == 'tool_usage':
-                st.markdown(f"**🛠️ [{timestamp}] {agent} - {details.get('tool_name', 'Tool')} Usage**")
-                st.write(f"**Action:** {details.get('action', content)}")
-                if details.get('result'):
-                    with st.expander("Tool Result"):
-                        st.text(details['result'])
-            else:
-                st.markdown(f"**ℹ️ [{timestamp}] {agent} - {activity_type.replace('_', ' ').title()}**")
-                st.text(content)
-                if details:
-                    with st.expander("Details"):
-                        st.json(details)
+            # Activity summary
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("SQL Queries", counts['sql_query'])
+            with col2:
+                st.metric("Python Scripts", counts['python_code'])
+            with col3:
+                st.metric("Tasks Started", counts['task_start'])
             
-            st.divider()
+            if sum(counts.values()):
+                st.divider()
+        
+        with feed["entries"]:
+            for activity in new_activities:
+                render_activity(activity)
+                st.divider()
             
     except Exception as e:
         st.error(f"Error displaying activity log: {e}")
 
+def render_activity(activity):
+    """Render a single activity log entry."""
+    timestamp = activity.get('timestamp', '').split('T')[1].split('.')[0] if activity.get('timestamp') else ''
+    agent = activity.get('agent', 'Unknown')
+    activity_type = activity.get('type', 'unknown')
+    content = activity.get('content', '')
+    details = activity.get('details', {})
+    
+    # Create different styling for different activity types
+    if activity_type == 'sql_query':
+        st.markdown(f"**🗄️ [{timestamp}] {agent} - SQL Query Execution**")
+        st.code(content, language='sql')
+        if details.get('result_preview'):
+            st.success("✅ Query executed successfully")
+            with st.expander("View Query Results"):
+                st.text(details['result_preview'])
+                
+    elif activity_type == 'python_code':
+        st.markdown(f"**🐍 [{timestamp}] {agent} - Python Code Execution**")
+        st.code(content, language='python')
+        if details.get('result'):
+            with st.expander("View Execution Results"):
+                st.text(details['result'])
+                
+    elif activity_type == 'task_start':
+        st.markdown(f"**🎯 [{timestamp}] {agent} - Task Started**")
+        st.info(f"**{details.get('task_name', 'Unknown Task')}**")
+        with st.expander("Task Description"):
+            st.write(details.get('description', content))
+            
+    elif activity_type == 'tool_usage':
+        st.markdown(f"**🛠️ [{timestamp}] {agent} - {details.get('tool_name', 'Tool')} Usage**")
+        st.write(f"**Action:** {details.get('action', content)}")
+        if details.get('result'):
+            with st.expander("Tool Result"):
+                st.text(details['result'])
+    else:
+        st.markdown(f"**ℹ️ [{timestamp}] {agent} - {activity_type.replace('_', ' ').title()}**")
+        st.text(content)
+        if details:
+            with st.expander("Details"):
+                st.json(details)
+
 st.set_page_config(page_title="CogniQuery", page_icon="🤖")
 st.title("CogniQuery 🤖")
 st.subheader("Your AI Data Scientist")
@@ -653,6 +644,9 @@ query = st.text_area(
 # Initialize session state for button control
 if 'report_generating' not in st.session_state:
     st.session_state.report_generating = False
+# Identifies this browser session to the job scheduler for per-user fairness
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 # Generate Report button with conditional disable
 generate_button_disabled = st.session_state.report_generating
@@ -675,8 +669,10 @@ if st.button(button_text, disabled=generate_button_disabled):
         os.environ["OPENAI_API_KEY"] = final_openai_key
         os.environ["NEONDB_CONN_STR"] = final_db_conn
         
-        # Clean up old files before running
-        cleanup_output_files()
+        # Clean up this session's previous run, then give this run its own workspace and log
+        cleanup_previous_run()
+        run_context = RunContext.create(db_connection_string=final_db_conn)
+        st.session_state.run_context = run_context
 
         # Create placeholder for activity log
         activity_placeholder = st.empty()
@@ -686,40 +682,39 @@ if st.button(button_text, disabled=generate_button_disabled):
             st.info("🤖 Your AI Data Scientist is starting up...")
 
         try:
-            # Initialize and run the crew
-            cogniquery_crew = CogniQueryCrew(db_connection_string=final_db_conn)
-            
-            # Run the crew in a separate process while updating the UI
-            import threading
-            result = [None]  # Use list to allow modification in nested function
-            error = [None]
-            
-            def run_crew():
-                try:
-                    result[0] = cogniquery_crew.crew().kickoff(inputs={'query': query})
-                except Exception as e:
-                    error[0] = e
-            
-            # Start crew execution in background
-            crew_thread = threading.Thread(target=run_crew)
-            crew_thread.start()
+            # Queue the run; the shared scheduler bounds how many crews run at once
+            job = get_job_scheduler().submit(
+                user_id=st.session_state.session_id,
+                query=query,
+                db_connection_string=final_db_conn,
+                run_context=run_context,
+            )
             
-            # Update activity log while crew is running
-            while crew_thread.is_alive():
-                with activity_placeholder.container():
-                    display_activity_log()
-                time.sleep(2)  # Update every 2 seconds
-                
-            # Wait for thread to complete
-            crew_thread.join()
+            # Update activity log while the job is queued or running, appending only new entries.
+            # The loop sleeps until the crew logs something, starts or finishes.
+            activity_feed = create_activity_feed(activity_placeholder.container(), run_context.logger)
+            shown_status = None
+            while not job.done.is_set():
+                status = get_job_scheduler().status(job.job_id)
+                if status and (status["status"], status["queue_position"]) != shown_status:
+                    shown_status = (status["status"], status["queue_position"])
+                    with status_placeholder:
+                        if status["status"] == "queued":
+                            st.info(f"⏳ Your analysis is queued (position {status['queue_position']}). It will start as soon as a worker is free.")
+                        else:
+                            st.info("🤖 Your AI Data Scientist is working...")
+                update_activity_feed(activity_feed)
+                run_context.logger.wait_for_activity(activity_feed["cursor"], timeout=5 if job.status == "queued" else 30, stop_event=job.done)
             
             # Final update of activity log
-            with activity_placeholder.container():
-                display_activity_log()
+            update_activity_feed(activity_feed)
             
-            if error[0]:
-                raise error[0]
-                
+            # The job is finished; drop it from the scheduler whether it succeeded or failed
+            get_job_scheduler().forget(job.job_id)
+            if job.error:
+                raise job.error
+            crew_result = job.result
+
             with status_placeholder:
                 st.success("✅ Report generated successfully!")
             
@@ -728,41 +723,31 @@ if st.button(button_text, disabled=generate_button_disabled):
 
             # Display the generated markdown report
             st.subheader("📊 Generated Analysis Report")
-            st.markdown(result[0].raw, unsafe_allow_html=True)
+            st.markdown(crew_result.raw, unsafe_allow_html=True)
             
-            # Display all chart images with improved detection
-            output_dir = "output"
-            chart_files = []
-            
-            # Debug: List all files in output directory
-            try:
-                if os.path.exists(output_dir):
-                    output_files = os.listdir(output_dir)
-                    chart_files = [f for f in output_files if f.endswith('.png')]
-                    st.write(f"📁 Files in output directory: {output_files}")
-                    st.write(f"📊 Chart files found: {chart_files}")
-                else:
-                    st.write("📁 Output directory does not exist")
-            except Exception as e:
-                st.write(f"📁 Could not list output directory: {e}")
+            # Display the charts this run's executions produced, from its artifact registry.
+            # Their bytes are loaded once and shared by the UI and the PDF.
+            output_dir = run_context.output_dir
+            chart_images = sorted(run_context.artifacts.chart_images(), key=lambda chart: chart.name)
+            chart_files = [chart.name for chart in chart_images]
+            st.write(f"📊 Charts produced: {chart_files}")
             
             # Display charts
-            if chart_files:
+            if chart_images:
                 st.subheader("📈 Generated Charts")
                 
-                # Sort chart files for consistent display order
-                chart_files.sort()
-                
                 # Display each chart
-                for i, chart_file in enumerate(chart_files):
-                    chart_path = os.path.join(output_dir, chart_file)
+                for i, chart in enumerate(chart_images):
+                    chart_file = chart.name
                     try:
                         # Create a more descriptive caption
-                        chart_name = chart_file.replace('.png', '').replace('_', ' ').title()
-                        st.image(chart_path, caption=f"{chart_name}", use_container_width=True)
+                        chart_name = os.path.splitext(chart_file)[0].replace('_', ' ').title()
+                        # st.image takes SVG as markup and raster images as bytes
+                        image = chart.data.decode("utf-8") if chart.media_type == "image/svg+xml" else chart.data
+                        st.image(image, caption=f"{chart_name}", use_container_width=True)
                         
                         # Add some spacing between charts
-                        if i < len(chart_files) - 1:
+                        if i < len(chart_images) - 1:
                             st.write("")
                             
                     except Exception as e:
@@ -773,23 +758,21 @@ if st.button(button_text, disabled=generate_button_disabled):
             else:
                 st.warning("⚠️ No charts were generated or could not be found. Check the activity log for details.")
                 st.write(f"Expected charts location: {os.path.abspath(output_dir)}")
-                if os.path.exists(output_dir):
-                    output_contents = os.listdir(output_dir)
-                    st.write(f"Output directory contents: {output_contents}")
-                else:
-                    st.write("Output directory does not exist")
+                other_artifacts = [artifact.path for artifact in run_context.artifacts.artifacts()]
+                if other_artifacts:
+                    st.write(f"Files produced by code executions: {other_artifacts}")
 
             # --- ADD PDF DOWNLOAD SECTION ---
             st.divider()
             st.subheader("📄 Download Report")
 
-            if result[0] and (WEASYPRINT_AVAILABLE or REPORTLAB_AVAILABLE):
+            if crew_result and (WEASYPRINT_AVAILABLE or REPORTLAB_AVAILABLE):
                 # Determine which PDF engine is being used
                 pdf_engine = "WeasyPrint" if WEASYPRINT_AVAILABLE else "ReportLab"
                 
                 # Generate the PDF in memory
                 with st.spinner(f"Creating PDF report using {pdf_engine}..."):
-                    pdf_bytes = create_pdf_report(result[0].raw, chart_files)
+                    pdf_bytes = create_pdf_report(crew_result.raw, chart_images)
                 
                 if pdf_bytes:
                     # Create different button text based on whether charts are included
@@ -812,6 +795,10 @@ if st.button(button_text, disabled=generate_button_disabled):
                 st.info("📄 A report must be generated first to create a PDF.")
             # --- END OF PDF DOWNLOAD SECTION ---
 
+        except QueueFullError as e:
+            with status_placeholder:
+                st.warning(f"⏳ {e}")
+            st.session_state.report_generating = False
         except Exception as e:
             with status_placeholder:
                 st.error(f"❌ An error occurred: {e}")
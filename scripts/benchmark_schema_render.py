@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+CogniQuery Schema Rendering Benchmark
+Compares the legacy iterrows-based schema formatting with the groupby/join
+renderer on a synthetic catalog (5,000 tables by default).
+"""
+
+import os
+import sys
+import time
+import argparse
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.cogniquery_crew.tools.catalog_introspection import snapshot_from_frames
+from src.cogniquery_crew.tools.schema_renderer import render_schema_explorer
+
+def build_synthetic_catalog(table_count, columns_per_table):
+    """Build information_schema-shaped frames for a synthetic catalog."""
+    columns, pks, fks = [], [], []
+    for t in range(table_count):
+        table = f"table_{t:05d}"
+        columns.append((table, "id", "integer", "NO", f"nextval('{table}_id_seq'::regclass)"))
+        pks.append((table, "id"))
+        for c in range(1, columns_per_table):
+            columns.append((table, f"column_{c}", "character varying", "YES", None))
+        if t > 0:
+            columns.append((table, "parent_id", "integer", "YES", None))
+            fks.append((f"{table}_parent_fk", table, "parent_id", f"table_{t - 1:05d}", "id"))
+
+    columns_df = pd.DataFrame(columns, columns=["table_name", "column_name", "data_type", "is_nullable", "column_default"])
+    pk_df = pd.DataFrame(pks, columns=["table_name", "column_name"])
+    fk_df = pd.DataFrame(fks, columns=["constraint_name", "source_table", "source_column", "target_table", "target_column"])
+    return columns_df, pk_df, fk_df
+
+def legacy_render(columns_df, pk_df, fk_df):
+    """The original per-table filter + iterrows + string concatenation formatter."""
+    schema_str = "=== DATABASE SCHEMA ANALYSIS ===\n\n"
+    tables = columns_df['table_name'].unique()
+
+    pk_lookup = {}
+    for _, row in pk_df.iterrows():
+        pk_lookup.setdefault(row['table_name'], []).append(row['column_name'])
+
+    fk_lookup = {}
+    for _, row in fk_df.iterrows():
+        fk_lookup.setdefault(row['source_table'], []).append({
+            'source_column': row['source_column'],
+            'target_table': row['target_table'],
+            'target_column': row['target_column']
+        })
+
+    for table in sorted(tables):
+        table_columns = columns_df[columns_df['table_name'] == table]
+        schema_str += f"📊 TABLE: {table}\n"
+        for _, col in table_columns.iterrows():
+            pk_indicator = " (PK)" if table in pk_lookup and col['column_name'] in pk_lookup[table] else ""
+            nullable = "NULL" if col['is_nullable'] == 'YES' else "NOT NULL"
+            default = f", DEFAULT: {col['column_default']}" if col['column_default'] else ""
+            schema_str += f"  • {col['column_name']}: {col['data_type']}{pk_indicator} ({nullable}{default})\n"
+        if table in fk_lookup:
+            schema_str += f"  Foreign Keys:\n"
+            for fk in fk_lookup[table]:
+                schema_str += f"    • {fk['source_column']} -> {fk['target_table']}.{fk['target_column']}\n"
+        schema_str += "\n"
+    return schema_str
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark schema rendering on a synthetic catalog.")
+    parser.add_argument("--tables", type=int, default=5000)
+    parser.add_argument("--columns", type=int, default=12)
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the new renderer")
+    args = parser.parse_args()
+
+    print("🤖 CogniQuery Schema Rendering Benchmark")
+    print("=" * 40)
+    columns_df, pk_df, fk_df = build_synthetic_catalog(args.tables, args.columns)
+    print(f"📊 Synthetic catalog: {args.tables} tables, {len(columns_df)} columns, {len(fk_df)} foreign keys")
+
+    snapshot, build_seconds = time_call(snapshot_from_frames, columns_df, pk_df, fk_df)
+    rendered, render_seconds = time_call(render_schema_explorer, snapshot)
+    print(f"🚀 groupby + join renderer: {build_seconds + render_seconds:.3f}s "
+          f"(snapshot {build_seconds:.3f}s, render {render_seconds:.3f}s, {len(rendered):,} chars)")
+
+    if not args.skip_legacy:
+        legacy, legacy_seconds = time_call(legacy_render, columns_df, pk_df, fk_df)
+        print(f"🐢 legacy iterrows renderer: {legacy_seconds:.3f}s ({len(legacy):,} chars)")
+        print(f"📈 Speedup: {legacy_seconds / max(build_seconds + render_seconds, 1e-9):.1f}x")
+
+if __name__ == "__main__":
+    main()
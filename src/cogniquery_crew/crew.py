@@ -9,7 +9,8 @@ from .tools.local_code_executor import LocalCodeExecutorTool
 from .tools.sample_data_tool import SampleDataTool
 from .tools.sql_executor_tool import SQLExecutorTool
 from .tools.reporting_tools import ReportingTools
-from .tools.activity_logger import get_activity_logger
+from .tools.run_context import RunContext
+from .prefetch import PREFETCH_ENABLED, NO_PREFETCHED_CONTEXT, prefetch_context, aprefetch_context
 
 # Set up the default LLM
 os.environ["OPENAI_MODEL_NAME"] = "gpt-4.1"
@@ -24,22 +25,41 @@ class CogniQueryCrew():
     agents_config = os.path.join(BASE_DIR, 'config', 'agents.yaml')
     tasks_config = os.path.join(BASE_DIR, 'config', 'tasks.yaml')
 
-    def __init__(self, db_connection_string: str):
+    def __init__(self, db_connection_string: str, run_context: RunContext = None):
         self.db_connection_string = db_connection_string
+        # Every run logs and writes files in its own context so concurrent runs do not collide
+        self.run_context = run_context or RunContext.create(db_connection_string=db_connection_string)
+        if not self.run_context.db_connection_string:
+            self.run_context.db_connection_string = db_connection_string
+        
         self.schema_tool = SchemaExplorerTool()
         self.sample_data_tool = SampleDataTool()
         self.sql_executor_tool = SQLExecutorTool()
         self.report_tool = ReportingTools()
         self.local_code_executor = LocalCodeExecutorTool()
         
-        # Configure all database tools with the connection string
-        for tool in [self.schema_tool, self.sample_data_tool, self.sql_executor_tool]:
-            if hasattr(tool, 'db_connection_string'):
-                tool.db_connection_string = db_connection_string
-        
-        # Clear previous activity log
-        logger = get_activity_logger()
-        logger.clear_log()
+        # Configure all tools with the run context (connection string, logger, output directory)
+        for tool in [self.schema_tool, self.sample_data_tool, self.sql_executor_tool, self.report_tool, self.local_code_executor]:
+            tool.run_context = self.run_context
+
+    def kickoff(self, query: str):
+        """Run the crew for a query within this crew's run context."""
+        context = NO_PREFETCHED_CONTEXT
+        if PREFETCH_ENABLED:
+            context = prefetch_context(query, self.schema_tool, self.sample_data_tool)
+        return self.crew().kickoff(inputs={'query': query, 'prefetched_context': context})
+
+    async def akickoff(self, query: str):
+        """Async kickoff: agents await the tools' async implementations on the caller's event loop."""
+        context = NO_PREFETCHED_CONTEXT
+        if PREFETCH_ENABLED:
+            context = await aprefetch_context(query, self.schema_tool, self.sample_data_tool)
+        inputs = {'query': query, 'prefetched_context': context}
+        crew = self.crew()
+        if hasattr(crew, "akickoff"):
+            return await crew.akickoff(inputs=inputs)
+        # Older crewai: runs the blocking kickoff in a thread
+        return await crew.kickoff_async(inputs=inputs)
 
     @agent
     def prompt_enhancer(self) -> Agent:
@@ -67,7 +87,7 @@ class CogniQueryCrew():
 
     @task
     def enhance_prompt_task(self) -> Task:
-        logger = get_activity_logger()
+        logger = self.run_context.logger
         task_config = self.tasks_config['enhance_prompt_task']
         
         # Log task start
@@ -82,7 +102,7 @@ class CogniQueryCrew():
 
     @task
     def analyze_data_task(self) -> Task:
-        logger = get_activity_logger()
+        logger = self.run_context.logger
         # Notify agent that connection is auto-configured
         task_description = self.tasks_config['analyze_data_task']['description'] + "\n\nNOTE: The database connection is automatically configured. When using Database Tools, only provide the SQL query."
         
@@ -102,9 +122,9 @@ class CogniQueryCrew():
 
     @task
     def generate_report_task(self) -> Task:
-        logger = get_activity_logger()
+        logger = self.run_context.logger
         # Write the final markdown report to a file for later PDF conversion
-        md_path = "output/final_report.md"
+        md_path = self.run_context.output_path("final_report.md")
         
         # Log task start
         def log_start_callback(task):
@@ -0,0 +1,351 @@
+# src/cogniquery_crew/job_queue.py
+
+import os
+import time
+import uuid
+import asyncio
+import datetime
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .tools.run_context import RunContext, reap_stale_workspaces
+
+MAX_CONCURRENT_RUNS = int(os.getenv("COGNIQUERY_MAX_CONCURRENT_RUNS", "2"))
+MAX_QUEUED_RUNS = int(os.getenv("COGNIQUERY_MAX_QUEUED_RUNS", "20"))
+MAX_QUEUED_RUNS_PER_USER = int(os.getenv("COGNIQUERY_MAX_QUEUED_RUNS_PER_USER", "2"))
+# Run crews as tasks on one event loop (CogniQueryCrew.akickoff) instead of one thread each
+ASYNC_RUNS = os.getenv("COGNIQUERY_ASYNC_RUNS", "0").lower() in ("1", "true", "yes")
+# Finished jobs kept for status polling before the oldest are forgotten
+MAX_FINISHED_JOBS = 200
+# How often submit() looks for run workspaces past their TTL
+REAP_INTERVAL_SECONDS = 600
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a job is refused by admission control."""
+
+
+class Job:
+    """One crew kickoff submitted to the scheduler."""
+
+    def __init__(self, user_id: str, query: str, run_context: RunContext):
+        self.job_id = f"job_{uuid.uuid4().hex[:12]}"
+        self.user_id = user_id
+        self.query = query
+        self.run_context = run_context
+        self.status = QUEUED
+        self.result: Any = None
+        self.error: Optional[Exception] = None
+        self.submitted_at = datetime.datetime.now()
+        self.started_at: Optional[datetime.datetime] = None
+        self.finished_at: Optional[datetime.datetime] = None
+        self.done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED, CANCELLED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status summary suitable for polling."""
+        return {
+            "job_id": self.job_id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "run_id": self.run_context.run_id,
+            "submitted_at": self.submitted_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": str(self.error) if self.error else None,
+        }
+
+
+class JobScheduler:
+    """Runs crew kickoffs on a bounded pool of worker threads.
+
+    At most `max_workers` crews run at once, which bounds concurrent LLM and
+    database load. Admission control refuses jobs beyond `max_queued`
+    waiting jobs overall or `max_queued_per_user` unfinished jobs per user.
+    Waiting jobs are dispatched round-robin across users, so one analyst
+    submitting many questions cannot starve the others.
+
+    With `use_event_loop`, a single thread runs an asyncio loop and the
+    crews run as tasks on it through CogniQueryCrew.akickoff, still at most
+    `max_workers` at a time.
+    """
+
+    def __init__(self, max_workers: int = MAX_CONCURRENT_RUNS,
+                 max_queued: int = MAX_QUEUED_RUNS,
+                 max_queued_per_user: int = MAX_QUEUED_RUNS_PER_USER,
+                 crew_factory: Callable[..., Any] = None,
+                 use_event_loop: bool = ASYNC_RUNS):
+        self.max_workers = max(1, max_workers)
+        self.max_queued = max_queued
+        self.max_queued_per_user = max_queued_per_user
+        self._crew_factory = crew_factory
+        self._jobs: Dict[str, Job] = {}
+        # user_id -> waiting jobs; key order is the round-robin order
+        self._waiting: "OrderedDict[str, Deque[Job]]" = OrderedDict()
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._loop_wakeup = None  # (loop, asyncio.Event) of the event-loop dispatcher
+        self._last_reap = 0.0
+        self._reap_stale_workspaces()
+        self._workers: List[threading.Thread] = []
+        if use_event_loop:
+            worker = threading.Thread(target=self._event_loop_main, name="cogniquery-run-loop", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        else:
+            for i in range(self.max_workers):
+                worker = threading.Thread(target=self._worker_loop, name=f"cogniquery-run-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def submit(self, user_id: str, query: str, db_connection_string: str,
+               run_context: RunContext = None) -> Job:
+        """Queue a crew kickoff; raises QueueFullError if admission control refuses it."""
+        if time.monotonic() - self._last_reap >= REAP_INTERVAL_SECONDS:
+            self._reap_stale_workspaces()
+        with self._condition:
+            if self._shutdown:
+                raise QueueFullError("The scheduler is shutting down.")
+            waiting = sum(len(jobs) for jobs in self._waiting.values())
+            if waiting >= self.max_queued:
+                raise QueueFullError(f"The server is busy ({waiting} analyses waiting). Please try again shortly.")
+            unfinished = sum(1 for job in self._jobs.values() if job.user_id == user_id and not job.finished)
+            if unfinished >= self.max_queued_per_user:
+                raise QueueFullError(f"You already have {unfinished} analyses queued or running. "
+                                     f"Wait for one to finish before submitting another.")
+
+            job = Job(user_id, query, run_context or RunContext.create(db_connection_string=db_connection_string))
+            if not job.run_context.db_connection_string:
+                job.run_context.db_connection_string = db_connection_string
+            self._jobs[job.job_id] = job
+            self._waiting.setdefault(user_id, deque()).append(job)
+            self._condition.notify()
+            self._wake_event_loop()
+            return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Poll a job: its state, timestamps, error and queue position."""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            status = job.to_dict()
+            status["queue_position"] = self._queue_position(job) if job.status == QUEUED else None
+            return status
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position in dispatch order, or None if the job is not waiting."""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return None
+            return self._queue_position(job)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet."""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return False
+            self._waiting[job.user_id].remove(job)
+            if not self._waiting[job.user_id]:
+                del self._waiting[job.user_id]
+            self._finish(job, CANCELLED)
+        job.run_context.close()
+        return True
+
+    def forget(self, job_id: str):
+        """Drop a finished job from the scheduler's bookkeeping."""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is not None and job.finished:
+                del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            jobs = list(self._jobs.values())
+            return {
+                "max_workers": self.max_workers,
+                "running": sum(1 for job in jobs if job.status == RUNNING),
+                "queued": sum(1 for job in jobs if job.status == QUEUED),
+                "users_waiting": len(self._waiting),
+            }
+
+    def shutdown(self):
+        """Stop accepting jobs; running jobs finish, waiting jobs are cancelled."""
+        with self._condition:
+            self._shutdown = True
+            waiting = [job for jobs in self._waiting.values() for job in jobs]
+            self._waiting.clear()
+            for job in waiting:
+                self._finish(job, CANCELLED)
+            self._condition.notify_all()
+            self._wake_event_loop()
+
+    def _queue_position(self, job: Job) -> Optional[int]:
+        # Simulate round-robin dispatch over a snapshot of the waiting queues
+        queues = [list(jobs) for jobs in self._waiting.values()]
+        position = 0
+        for depth in range(max((len(jobs) for jobs in queues), default=0)):
+            for jobs in queues:
+                if depth < len(jobs):
+                    position += 1
+                    if jobs[depth] is job:
+                        return position
+        return None
+
+    def _next_job(self) -> Optional[Job]:
+        # Called with the condition held: take the oldest job of the next user in turn
+        if not self._waiting:
+            return None
+        user_id, jobs = next(iter(self._waiting.items()))
+        job = jobs.popleft()
+        del self._waiting[user_id]
+        if jobs:
+            self._waiting[user_id] = jobs  # back of the rotation
+        return job
+
+    def _finish(self, job: Job, status: str):
+        # Called with the condition held
+        job.status = status
+        job.finished_at = datetime.datetime.now()
+        job.done.set()
+        finished = [job_id for job_id, other in self._jobs.items() if other.finished]
+        for job_id in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self._jobs[job_id]
+
+    def _start(self, job: Job):
+        # Called with the condition held
+        job.status = RUNNING
+        job.started_at = datetime.datetime.now()
+
+    def _make_crew(self, job: Job):
+        crew_factory = self._crew_factory
+        if crew_factory is None:
+            from .crew import CogniQueryCrew
+            crew_factory = CogniQueryCrew
+        return crew_factory(db_connection_string=job.run_context.db_connection_string, run_context=job.run_context)
+
+    def _reap_stale_workspaces(self):
+        self._last_reap = time.monotonic()
+        with self._condition:
+            active = [job.run_context.workspace for job in self._jobs.values() if not job.finished]
+        try:
+            reap_stale_workspaces(keep=active)
+        except Exception as e:
+            print(f"Error removing stale run workspaces: {e}")
+
+    def _complete(self, job: Job, status: str):
+        # Export the log and stop its writer thread; the in-memory activities stay readable
+        try:
+            job.run_context.close()
+        except Exception as e:
+            print(f"Error closing run {job.job_id}: {e}")
+        with self._condition:
+            self._finish(job, status)
+        job.run_context.logger.wake()
+
+    def _worker_loop(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    if self._shutdown:
+                        return
+                    self._condition.wait()
+                    job = self._next_job()
+                self._start(job)
+            # Let anyone watching the run's log see that it has started
+            job.run_context.logger.wake()
+            self._run(job)
+
+    def _run(self, job: Job):
+        status = SUCCEEDED
+        try:
+            job.result = self._make_crew(job).kickoff(job.query)
+        except Exception as e:
+            job.error = e
+            status = FAILED
+        finally:
+            self._complete(job, status)
+
+    def _wake_event_loop(self):
+        # Called with the condition held
+        if self._loop_wakeup is not None:
+            loop, wakeup = self._loop_wakeup
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def _event_loop_main(self):
+        asyncio.run(self._dispatch_on_event_loop())
+
+    async def _dispatch_on_event_loop(self):
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        running = set()
+
+        def task_done(task):
+            running.discard(task)
+            wakeup.set()
+
+        with self._condition:
+            self._loop_wakeup = (loop, wakeup)
+        while True:
+            started = []
+            with self._condition:
+                while len(running) + len(started) < self.max_workers:
+                    job = self._next_job()
+                    if job is None:
+                        break
+                    self._start(job)
+                    started.append(job)
+                if self._shutdown and not running and not started:
+                    self._loop_wakeup = None
+                    return
+                wakeup.clear()
+            for job in started:
+                job.run_context.logger.wake()
+                task = loop.create_task(self._arun(job))
+                running.add(task)
+                task.add_done_callback(task_done)
+            await wakeup.wait()
+
+    async def _arun(self, job: Job):
+        status = SUCCEEDED
+        try:
+            job.result = await self._make_crew(job).akickoff(job.query)
+        except Exception as e:
+            job.error = e
+            status = FAILED
+        finally:
+            self._complete(job, status)
+
+
+# Global scheduler instance
+_scheduler_instance = None
+_scheduler_lock = threading.Lock()
+
+def get_job_scheduler() -> JobScheduler:
+    """Get the global job scheduler instance."""
+    global _scheduler_instance
+    with _scheduler_lock:
+        if _scheduler_instance is None:
+            _scheduler_instance = JobScheduler()
+        return _scheduler_instance
@@ -0,0 +1,76 @@
+# src/cogniquery_crew/prefetch.py
+
+import os
+import time
+import asyncio
+from typing import List
+
+from .tools.run_context import activity_logger_for, connection_string_for
+from .tools.async_db import ASYNCPG_AVAILABLE, close_async_pools
+from .tools.catalog_introspection import load_catalog_snapshot, aload_catalog_snapshot
+from .tools.schema_renderer import render_schema_explorer
+from .tools.schema_retrieval import get_schema_index, render_schema_selection
+
+PREFETCH_ENABLED = os.getenv("COGNIQUERY_PREFETCH", "1").lower() not in ("0", "false", "no")
+PREFETCH_TOP_K = int(os.getenv("COGNIQUERY_PREFETCH_TOP_K", "5"))
+
+# Task context used when nothing could be prefetched
+NO_PREFETCHED_CONTEXT = "No database context was prefetched. Use SchemaExplorer() and SampleData to inspect the database."
+
+
+async def aprefetch_context(query: str, schema_tool, sample_tool,
+                            top_k: int = PREFETCH_TOP_K) -> str:
+    """Fetch the schema and data profiles of the tables relevant to a query, concurrently.
+
+    Small schemas (at most `top_k` tables) are included whole; larger ones are
+    pruned to the top-k tables for the query plus their join paths. Every
+    included table is examined at the same time through the SampleData tool
+    in its default profile mode, so the calls are logged like agent tool calls.
+    """
+    logger = activity_logger_for(schema_tool.run_context)
+    conn_str = connection_string_for(schema_tool.run_context)
+    if not conn_str:
+        return NO_PREFETCHED_CONTEXT
+
+    started = time.perf_counter()
+    try:
+        if ASYNCPG_AVAILABLE:
+            snapshot = await aload_catalog_snapshot(conn_str)
+        else:
+            snapshot = await asyncio.to_thread(load_catalog_snapshot, conn_str)
+    except Exception as e:
+        print(f"Context prefetch failed: {e}")
+        return NO_PREFETCHED_CONTEXT
+
+    if len(snapshot.tables) <= top_k:
+        tables: List[str] = [table.name for table in snapshot.tables]
+        schema_str = render_schema_explorer(snapshot)
+    else:
+        selection = get_schema_index(snapshot, conn_str).select(query, top_k=top_k)
+        tables = [table.name for table in selection.tables]
+        schema_str = render_schema_selection(selection, query)
+
+    samples = await asyncio.gather(
+        *(sample_tool._arun(table_name=table) for table in tables),
+        return_exceptions=True,
+    )
+    sample_sections = [sample for sample in samples if isinstance(sample, str) and not sample.startswith("Error")]
+
+    logger.log_tool_usage(
+        "Business Analyst", "Context Prefetch",
+        f"Prefetched schema and data for {len(tables)} tables in {time.perf_counter() - started:.2f}s: {', '.join(tables)}"
+    )
+    return "\n\n".join([schema_str] + sample_sections)
+
+
+def prefetch_context(query: str, schema_tool, sample_tool,
+                     top_k: int = PREFETCH_TOP_K) -> str:
+    """Blocking wrapper around aprefetch_context for callers without an event loop."""
+    async def run():
+        try:
+            return await aprefetch_context(query, schema_tool, sample_tool, top_k)
+        finally:
+            # The loop ends here, so its asyncpg pool must not outlive it
+            await close_async_pools()
+
+    return asyncio.run(run())
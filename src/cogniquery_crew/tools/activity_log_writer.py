@@ -0,0 +1,172 @@
+# src/cogniquery_crew/tools/activity_log_writer.py
+
+import os
+import json
+import time
+import queue
+import threading
+from typing import List, Dict, Any, Tuple
+
+ACTIVITY_LOG_FLUSH_INTERVAL = float(os.getenv("COGNIQUERY_ACTIVITY_FLUSH_INTERVAL", "0.5"))
+ACTIVITY_LOG_FSYNC_INTERVAL = float(os.getenv("COGNIQUERY_ACTIVITY_FSYNC_INTERVAL", "2"))
+ACTIVITY_LOG_MAX_QUEUE = int(os.getenv("COGNIQUERY_ACTIVITY_MAX_QUEUE", "10000"))
+
+
+class ActivityLogWriter:
+    """Append-only JSON Lines journal written by a background thread.
+
+    Callers only enqueue entries. The flusher thread drains the queue in
+    batches, appends one line per entry and fsyncs at most every
+    `fsync_interval` seconds. `export_json` rewrites the journal as the
+    indented JSON array the rest of the app reads.
+    """
+
+    def __init__(self, path: str,
+                 flush_interval: float = ACTIVITY_LOG_FLUSH_INTERVAL,
+                 fsync_interval: float = ACTIVITY_LOG_FSYNC_INTERVAL,
+                 max_queue: int = ACTIVITY_LOG_MAX_QUEUE):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Tuple[int, Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._generation = 0  # bumped by reset() so batches already dequeued are discarded
+        self._file_lock = threading.Lock()
+        self._file = None
+        self._last_fsync = time.monotonic()
+        self._closed = threading.Event()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._flush_loop, name="activity-log-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, entry: Dict[str, Any]):
+        """Queue an entry for writing without blocking; drops it if the queue is full.
+
+        After close() there is no flusher thread, so the entry is written directly.
+        """
+        if self._closed.is_set():
+            self._write_batch([(self._generation, entry)])
+            return
+        try:
+            # Callers hold the logger lock, so waiting for room would stall every thread that logs
+            self._queue.put_nowait((self._generation, entry))
+        except queue.Full:
+            self.dropped += 1
+            print(f"Activity log queue full, dropped entry ({self.dropped} dropped so far)")
+
+    def flush(self):
+        """Block until every queued entry is written and synced to disk."""
+        self._queue.join()
+        with self._file_lock:
+            self._sync(force=True)
+
+    def reset(self):
+        """Discard queued entries and start an empty journal."""
+        while True:
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+            except queue.Empty:
+                break
+        with self._file_lock:
+            self._generation += 1
+            self._close_file()
+            # Reopen rather than truncate so a journal deleted underneath us is recreated
+            open(self.path, "w", encoding="utf-8").close()
+
+    def read_all(self) -> List[Dict[str, Any]]:
+        """Read every complete entry from the journal."""
+        self.flush()
+        entries = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue  # torn final line after a crash
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def export_json(self, json_path: str):
+        """Write the journal as an indented JSON array, replacing json_path atomically."""
+        entries = self.read_all()
+        temp_path = f"{json_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(temp_path, json_path)
+
+    def close(self):
+        self.flush()
+        self._closed.set()
+        self._thread.join(timeout=5)
+        # Entries queued between the flush and the thread stopping
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+                self._queue.task_done()
+            except queue.Empty:
+                break
+        if batch:
+            self._write_batch(batch)
+        with self._file_lock:
+            self._close_file()
+
+    def _flush_loop(self):
+        while not self._closed.is_set():
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                with self._file_lock:
+                    self._sync()
+                continue
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                print(f"Error writing activity log: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: List[Tuple[int, Dict[str, Any]]]):
+        with self._file_lock:
+            lines = "".join(
+                json.dumps(entry, default=str) + "\n"
+                for generation, entry in batch if generation == self._generation
+            )
+            if not lines:
+                return
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(lines)
+            self._file.flush()
+            self._sync()
+
+    def _sync(self, force: bool = False):
+        # Called with _file_lock held
+        if self._file is None:
+            return
+        if force or time.monotonic() - self._last_fsync >= self.fsync_interval:
+            try:
+                os.fsync(self._file.fileno())
+            except OSError:
+                pass
+            self._last_fsync = time.monotonic()
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
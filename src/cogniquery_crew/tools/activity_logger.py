@@ -1,39 +1,56 @@
 # src/cogniquery_crew/tools/activity_logger.py
 
 import os
-import json
+import atexit
 import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import threading
+from .activity_log_writer import ActivityLogWriter
 
 class ActivityLogger:
-    """Thread-safe activity logger for tracking agent activities and SQL queries."""
+    """Thread-safe activity logger for tracking agent activities and SQL queries.
+    
+    Activities are appended to a JSON Lines journal next to log_file_path by a
+    background writer; export_log() writes the JSON array to log_file_path.
+    """
     
     def __init__(self, log_file_path: str = "output/activity_log.json"):
         self.log_file_path = log_file_path
+        self.journal_path = os.path.splitext(log_file_path)[0] + ".jsonl"
         self.activities: List[Dict[str, Any]] = []
         self.current_agent: str = None
         self.current_task: str = None
         self._lock = threading.Lock()
+        # Notified on every new activity and by wake(); shares the logger lock
+        self._activity_condition = threading.Condition(self._lock)
+        # Sequence numbers keep increasing across clear_log() so old cursors stay valid
+        self._next_sequence = 1
+        self._first_sequence = 1  # sequence of activities[0]
+        self._wake_generation = 0  # bumped by wake() so waiters return
         
         # Ensure output directory exists
         os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
         
-        # Initialize log file
-        self._save_to_file()
+        # Start with an empty journal
+        self._writer = ActivityLogWriter(self.journal_path)
+        self._writer.reset()
     
     def log_activity(self, agent_name: str, activity_type: str, content: str, details: Dict[str, Any] = None):
         """Log an activity with timestamp."""
         with self._lock:
             activity = {
+                "seq": self._next_sequence,
                 "timestamp": datetime.datetime.now().isoformat(),
                 "agent": agent_name,
                 "type": activity_type,
                 "content": content,
                 "details": details or {}
             }
+            self._next_sequence += 1
             self.activities.append(activity)
-            self._save_to_file()
+            # Enqueue under the lock so the journal keeps log order
+            self._writer.append(activity)
+            self._activity_condition.notify_all()
     
     def log_sql_query(self, agent_name: str, sql_query: str, result_preview: str = None):
         """Log an SQL query execution."""
@@ -101,19 +118,57 @@ class ActivityLogger:
         with self._lock:
             return self.activities.copy()
     
+    def get_activities_since(self, cursor: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Get the activities logged after `cursor` and the cursor to pass next time.
+        
+        A cursor is the sequence number of the last activity already seen; 0 reads everything.
+        """
+        with self._lock:
+            start = max(cursor - self._first_sequence + 1, 0)
+            return self.activities[start:], self._next_sequence - 1
+    
+    def wait_for_activity(self, cursor: int, timeout: float = None, stop_event: threading.Event = None) -> bool:
+        """Block until an activity newer than `cursor` is logged, wake() is called, `stop_event` is set or the timeout passes.
+        
+        Returns True if there are new activities to read.
+        """
+        with self._activity_condition:
+            generation = self._wake_generation
+            self._activity_condition.wait_for(
+                lambda: (self._next_sequence - 1 > cursor or self._wake_generation != generation
+                         or (stop_event is not None and stop_event.is_set())),
+                timeout=timeout,
+            )
+            return self._next_sequence - 1 > cursor
+    
+    def wake(self):
+        """Wake every waiter so it can re-check its stop condition."""
+        with self._activity_condition:
+            self._wake_generation += 1
+            self._activity_condition.notify_all()
+    
     def clear_log(self):
         """Clear all activities."""
         with self._lock:
             self.activities = []
+            self._first_sequence = self._next_sequence
             self.current_agent = None
             self.current_task = None
-            self._save_to_file()
+            self._writer.reset()
+    
+    def flush(self):
+        """Wait until every logged activity is on disk."""
+        self._writer.flush()
+    
+    def close(self):
+        """Export the log and stop the background writer."""
+        self.export_log()
+        self._writer.close()
     
-    def _save_to_file(self):
-        """Save activities to JSON file."""
+    def export_log(self):
+        """Write the journal to log_file_path as a JSON array (the format the app has always produced)."""
         try:
-            with open(self.log_file_path, 'w') as f:
-                json.dump(self.activities, f, indent=2)
+            self._writer.export_json(self.log_file_path)
         except Exception as e:
             print(f"Error saving activity log: {e}")
 
@@ -125,4 +180,5 @@ def get_activity_logger() -> ActivityLogger:
     global _logger_instance
     if _logger_instance is None:
         _logger_instance = ActivityLogger()
+        atexit.register(_logger_instance.export_log)
     return _logger_instance
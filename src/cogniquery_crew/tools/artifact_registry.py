@@ -0,0 +1,160 @@
+# src/cogniquery_crew/tools/artifact_registry.py
+
+import os
+import json
+import uuid
+import hashlib
+import datetime
+import threading
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional, Any
+
+# Artifacts with these extensions are shown as charts in the UI and the PDF
+CHART_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+_MEDIA_TYPES = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "svg": "image/svg+xml",
+}
+
+
+@dataclass
+class Artifact:
+    """One file written by a Python execution."""
+    path: str  # relative to the output directory
+    size: int
+    sha256: str
+    execution_id: str
+    snippet: str
+    created: str
+    media_type: str = "application/octet-stream"
+    # Contents of a figure captured in memory; such artifacts have no file on disk
+    data: Optional[bytes] = field(default=None, repr=False)
+
+    @property
+    def is_chart(self) -> bool:
+        return self.media_type.startswith("image/") or self.path.lower().endswith(CHART_EXTENSIONS)
+
+    @property
+    def in_memory(self) -> bool:
+        return self.data is not None
+
+
+@dataclass
+class ChartImage:
+    """A chart ready to display or embed."""
+    name: str
+    media_type: str
+    data: bytes
+
+
+def _media_type(path: str, image_format: Optional[str] = None) -> str:
+    extension = image_format or os.path.splitext(path)[1].lstrip(".")
+    return _MEDIA_TYPES.get(extension.lower(), "application/octet-stream")
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ArtifactRegistry:
+    """Manifest of the files each Python execution produced in a run's output directory.
+
+    Entries come from the savefig hook in the Python worker, so the tool
+    output, the UI and the PDF builders see exactly what was produced instead
+    of scanning the directory. The manifest is mirrored to a JSONL file.
+    """
+
+    def __init__(self, output_dir: str, manifest_path: Optional[str] = None):
+        self.output_dir = os.path.abspath(output_dir)
+        self.manifest_path = manifest_path
+        self._artifacts: List[Artifact] = []
+        self._lock = threading.Lock()
+
+    def record(self, paths: List[str], snippet: str = "", base_dir: Optional[str] = None,
+               figures: Optional[List[Dict[str, Any]]] = None) -> List[Artifact]:
+        """Register the files one execution wrote; paths may be relative to base_dir.
+
+        `figures` are figures the execution captured in memory ({"path",
+        "format", "data"}); they are kept as buffers and never touch the disk.
+        Files outside the output directory, or no longer on disk, are skipped.
+        """
+        execution_id = f"exec_{uuid.uuid4().hex[:12]}"
+        created = datetime.datetime.now().isoformat()
+        buffers = {figure["path"]: figure for figure in figures or []}
+        recorded = []
+        for path in paths:
+            absolute = os.path.abspath(os.path.join(base_dir or self.output_dir, path))
+            relative = os.path.relpath(absolute, self.output_dir)
+            figure = buffers.get(path)
+            if relative.startswith(os.pardir) or (figure is None and not os.path.isfile(absolute)):
+                continue
+            if any(artifact.path == relative for artifact in recorded):
+                continue
+            if figure is not None:
+                size, sha256, data = len(figure["data"]), hashlib.sha256(figure["data"]).hexdigest(), figure["data"]
+            else:
+                size, sha256, data = os.path.getsize(absolute), _sha256_file(absolute), None
+            recorded.append(Artifact(
+                path=relative,
+                size=size,
+                sha256=sha256,
+                execution_id=execution_id,
+                snippet=snippet,
+                created=created,
+                media_type=_media_type(relative, figure["format"] if figure else None),
+                data=data,
+            ))
+        if not recorded:
+            return recorded
+
+        with self._lock:
+            # A file written again belongs to its latest execution
+            paths_written = {artifact.path for artifact in recorded}
+            self._artifacts = [artifact for artifact in self._artifacts if artifact.path not in paths_written]
+            self._artifacts.extend(recorded)
+            if self.manifest_path:
+                try:
+                    with open(self.manifest_path, "a", encoding="utf-8") as f:
+                        for artifact in recorded:
+                            entry = {**asdict(artifact), "data": None, "in_memory": artifact.in_memory}
+                            f.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    print(f"Could not write artifact manifest: {e}")
+        return recorded
+
+    def artifacts(self) -> List[Artifact]:
+        """Registered artifacts still available, in creation order."""
+        with self._lock:
+            artifacts = list(self._artifacts)
+        return [artifact for artifact in artifacts if artifact.in_memory or os.path.exists(self.path_of(artifact))]
+
+    def charts(self) -> List[str]:
+        """Chart names, relative to the output directory, in creation order."""
+        return [artifact.path for artifact in self.artifacts() if artifact.is_chart]
+
+    def chart_images(self) -> List[ChartImage]:
+        """Charts with their contents, read once so the UI and the PDF share the same bytes."""
+        images = []
+        for artifact in self.artifacts():
+            if not artifact.is_chart:
+                continue
+            data = artifact.data
+            if data is None:
+                try:
+                    with open(self.path_of(artifact), "rb") as f:
+                        data = f.read()
+                except OSError as e:
+                    print(f"Could not read chart {artifact.path}: {e}")
+                    continue
+            images.append(ChartImage(name=artifact.path, media_type=artifact.media_type, data=data))
+        return images
+
+    def path_of(self, artifact: Artifact) -> str:
+        return os.path.join(self.output_dir, artifact.path)
@@ -0,0 +1,117 @@
+# src/cogniquery_crew/tools/async_db.py
+
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import Dict, Any
+import pandas as pd
+import psycopg2.extensions
+from .connection_pool import PoolTimeoutError, POOL_MAX_SIZE, POOL_MAX_IDLE_SECONDS, POOL_ACQUIRE_TIMEOUT
+
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    ASYNCPG_AVAILABLE = False
+
+# libpq connection parameters and their asyncpg.connect() names
+_CONNECT_PARAMS = {
+    "host": "host",
+    "port": "port",
+    "user": "user",
+    "password": "password",
+    "dbname": "database",
+    "sslmode": "ssl",
+}
+
+# asyncpg pools belong to the event loop that created them
+_async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = weakref.WeakKeyDictionary()
+
+
+def connect_kwargs(conn_str: str) -> Dict[str, Any]:
+    """Translate a libpq connection string or URI into asyncpg.connect() arguments.
+
+    Parameters asyncpg does not understand (e.g. Neon's channel_binding) are
+    dropped instead of being sent to the server as settings.
+    """
+    params = psycopg2.extensions.parse_dsn(conn_str)
+    kwargs = {target: params[name] for name, target in _CONNECT_PARAMS.items() if params.get(name)}
+    if "port" in kwargs:
+        kwargs["port"] = int(kwargs["port"])
+    return kwargs
+
+
+async def get_async_pool(conn_str: str):
+    """Get the asyncpg pool for a connection string on the running event loop."""
+    if not ASYNCPG_AVAILABLE:
+        raise RuntimeError("asyncpg is not installed")
+    loop = asyncio.get_running_loop()
+    pools = _async_pools.setdefault(loop, {})
+    task = pools.get(conn_str)
+    if task is None:
+        task = loop.create_task(_open_pool(conn_str))
+        pools[conn_str] = task
+    try:
+        return await asyncio.shield(task)
+    except Exception:
+        if pools.get(conn_str) is task:
+            del pools[conn_str]
+        raise
+
+
+async def _open_pool(conn_str: str):
+    return await asyncpg.create_pool(
+        min_size=0,
+        max_size=POOL_MAX_SIZE,
+        max_inactive_connection_lifetime=POOL_MAX_IDLE_SECONDS,
+        # Prepared statements do not survive transaction-mode poolers such as Neon's
+        statement_cache_size=0,
+        **connect_kwargs(conn_str),
+    )
+
+
+@asynccontextmanager
+async def async_connection(conn_str: str):
+    """Async context manager yielding a pooled asyncpg connection inside a transaction.
+
+    The transaction is always rolled back, matching the psycopg2 pool, which
+    rolls back whatever a tool left uncommitted.
+    """
+    pool = await get_async_pool(conn_str)
+    try:
+        conn = await pool.acquire(timeout=POOL_ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise PoolTimeoutError(
+            f"Timed out after {POOL_ACQUIRE_TIMEOUT}s waiting for a database connection "
+            f"(pool size {POOL_MAX_SIZE})"
+        )
+    try:
+        transaction = conn.transaction()
+        await transaction.start()
+        try:
+            yield conn
+        finally:
+            if not conn.is_closed():
+                await transaction.rollback()
+    finally:
+        await pool.release(conn)
+
+
+async def aread_sql_query(conn_str: str, query: str, *args) -> pd.DataFrame:
+    """Async counterpart of pd.read_sql_query on a pooled connection."""
+    async with async_connection(conn_str) as conn:
+        prepared = await conn.prepare(query)
+        columns = [attribute.name for attribute in prepared.get_attributes()]
+        rows = await prepared.fetch(*args)
+    return pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns, coerce_float=True)
+
+
+async def close_async_pools():
+    """Close every asyncpg pool created on the running event loop."""
+    pools = _async_pools.pop(asyncio.get_running_loop(), {})
+    for task in pools.values():
+        try:
+            pool = await task
+        except Exception:
+            continue
+        await pool.close()
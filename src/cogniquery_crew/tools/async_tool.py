@@ -0,0 +1,35 @@
+# src/cogniquery_crew/tools/async_tool.py
+
+from typing import Any, Dict
+from crewai.tools import BaseTool
+from crewai.tools.structured_tool import CrewStructuredTool, ToolUsageLimitExceededError
+
+
+class AsyncStructuredTool(CrewStructuredTool):
+    """Structured tool whose async invocation awaits the tool's _arun.
+
+    CrewStructuredTool.ainvoke runs the synchronous _run in a thread pool;
+    under Crew.akickoff this keeps the agent's tool calls on the event loop.
+    """
+
+    async def ainvoke(self, input: str | Dict[str, Any], config: Dict[str, Any] | None = None, **kwargs: Any) -> Any:
+        parsed_args = self._parse_args(input)
+        if self.has_reached_max_usage_count():
+            raise ToolUsageLimitExceededError(
+                f"Tool '{self.name}' has reached its maximum usage limit of {self.max_usage_count}. "
+                f"You should not use the {self.name} tool again."
+            )
+        self._increment_usage_count()
+        return await self._original_tool._arun(**parsed_args, **kwargs)
+
+
+class AsyncNativeTool(BaseTool):
+    """Base for tools with both a blocking _run and a native async _arun."""
+
+    def to_structured_tool(self) -> CrewStructuredTool:
+        structured_tool = super().to_structured_tool()
+        async_tool = AsyncStructuredTool(**{
+            name: getattr(structured_tool, name) for name in CrewStructuredTool.model_fields
+        })
+        async_tool._original_tool = self
+        return async_tool
@@ -0,0 +1,334 @@
+# src/cogniquery_crew/tools/catalog_introspection.py
+
+import json
+import asyncio
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Any, Optional
+import pandas as pd
+from .connection_pool import get_connection_pool
+from .schema_cache import get_schema_cache
+from .async_db import async_connection
+
+# One round trip: a row per relation with its columns, keys, indexes, row
+# estimate and comments aggregated as JSON by correlated pg_catalog subqueries.
+CATALOG_QUERY = """
+SELECT
+    c.relname AS table_name,
+    c.relkind AS kind,
+    c.reltuples::bigint AS row_estimate,
+    obj_description(c.oid, 'pg_class') AS comment,
+    (SELECT coalesce(json_agg(json_build_object(
+                'name', a.attname,
+                'data_type', format_type(a.atttypid, a.atttypmod),
+                'not_null', a.attnotnull,
+                'default', pg_get_expr(d.adbin, d.adrelid),
+                'comment', col_description(c.oid, a.attnum)
+            ) ORDER BY a.attnum), '[]'::json)
+     FROM pg_catalog.pg_attribute a
+     LEFT JOIN pg_catalog.pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+     WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped) AS columns,
+    (SELECT coalesce(json_agg(a.attname ORDER BY k.ord), '[]'::json)
+     FROM pg_catalog.pg_constraint con
+     CROSS JOIN LATERAL unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+     JOIN pg_catalog.pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+     WHERE con.conrelid = c.oid AND con.contype = 'p') AS primary_key,
+    (SELECT coalesce(json_agg(json_build_object(
+                'name', con.conname,
+                'columns', (SELECT json_agg(a.attname ORDER BY k.ord)
+                            FROM unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+                            JOIN pg_catalog.pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum),
+                'target_table', tc.relname,
+                'target_columns', (SELECT json_agg(a.attname ORDER BY k.ord)
+                                   FROM unnest(con.confkey) WITH ORDINALITY AS k(attnum, ord)
+                                   JOIN pg_catalog.pg_attribute a ON a.attrelid = con.confrelid AND a.attnum = k.attnum)
+            ) ORDER BY con.conname), '[]'::json)
+     FROM pg_catalog.pg_constraint con
+     JOIN pg_catalog.pg_class tc ON tc.oid = con.confrelid
+     WHERE con.conrelid = c.oid AND con.contype = 'f') AS foreign_keys,
+    (SELECT coalesce(json_agg(json_build_object(
+                'name', ic.relname,
+                'columns', (SELECT coalesce(json_agg(a.attname ORDER BY k.ord), '[]'::json)
+                            FROM unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, ord)
+                            JOIN pg_catalog.pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum),
+                'is_unique', i.indisunique,
+                'is_primary', i.indisprimary,
+                'definition', pg_get_indexdef(i.indexrelid)
+            ) ORDER BY ic.relname), '[]'::json)
+     FROM pg_catalog.pg_index i
+     JOIN pg_catalog.pg_class ic ON ic.oid = i.indexrelid
+     WHERE i.indrelid = c.oid) AS indexes
+FROM pg_catalog.pg_class c
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = %(schema)s
+    AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+    AND NOT c.relispartition
+ORDER BY c.relname;
+"""
+
+ASYNC_CATALOG_QUERY = CATALOG_QUERY.replace("%(schema)s", "$1")
+
+# Fallback for servers that reject the pg_catalog query
+INFORMATION_SCHEMA_COLUMNS_QUERY = """
+SELECT table_name, column_name, data_type, is_nullable, column_default
+FROM information_schema.columns
+WHERE table_schema = %(schema)s
+ORDER BY table_name, ordinal_position;
+"""
+
+INFORMATION_SCHEMA_PK_QUERY = """
+SELECT tc.table_name, kcu.column_name
+FROM information_schema.table_constraints tc
+JOIN information_schema.key_column_usage kcu
+    ON tc.constraint_name = kcu.constraint_name
+WHERE tc.constraint_type = 'PRIMARY KEY'
+    AND tc.table_schema = %(schema)s
+ORDER BY tc.table_name, kcu.ordinal_position;
+"""
+
+INFORMATION_SCHEMA_FK_QUERY = """
+SELECT
+    tc.constraint_name,
+    tc.table_name as source_table,
+    kcu.column_name as source_column,
+    ccu.table_name as target_table,
+    ccu.column_name as target_column
+FROM information_schema.table_constraints tc
+JOIN information_schema.key_column_usage kcu
+    ON tc.constraint_name = kcu.constraint_name
+JOIN information_schema.constraint_column_usage ccu
+    ON ccu.constraint_name = tc.constraint_name
+WHERE tc.constraint_type = 'FOREIGN KEY'
+    AND tc.table_schema = %(schema)s
+ORDER BY tc.table_name, kcu.column_name;
+"""
+
+RELKIND_NAMES = {
+    "r": "table",
+    "p": "partitioned table",
+    "v": "view",
+    "m": "materialized view",
+    "f": "foreign table",
+}
+
+
+@dataclass
+class ColumnInfo:
+    name: str
+    data_type: str
+    is_nullable: bool = True
+    default: Optional[str] = None
+    comment: Optional[str] = None
+
+
+@dataclass
+class ForeignKeyInfo:
+    name: str
+    columns: List[str]
+    target_table: str
+    target_columns: List[str]
+
+
+@dataclass
+class IndexInfo:
+    name: str
+    columns: List[str]
+    is_unique: bool = False
+    is_primary: bool = False
+    definition: str = ""
+
+
+@dataclass
+class TableInfo:
+    name: str
+    kind: str = "table"
+    columns: List[ColumnInfo] = field(default_factory=list)
+    primary_key: List[str] = field(default_factory=list)
+    foreign_keys: List[ForeignKeyInfo] = field(default_factory=list)
+    indexes: List[IndexInfo] = field(default_factory=list)
+    row_estimate: Optional[int] = None
+    comment: Optional[str] = None
+
+
+@dataclass
+class CatalogSnapshot:
+    """Structured description of every relation in a schema."""
+    schema: str
+    tables: List[TableInfo] = field(default_factory=list)
+    fingerprint: Optional[str] = None  # catalog fingerprint the snapshot was read under
+
+    def table(self, name: str) -> Optional[TableInfo]:
+        """Look up a table by name."""
+        for table in self.tables:
+            if table.name == name:
+                return table
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CatalogSnapshot":
+        tables = []
+        for table in data.get("tables", []):
+            tables.append(TableInfo(
+                name=table["name"],
+                kind=table.get("kind", "table"),
+                columns=[ColumnInfo(**col) for col in table.get("columns", [])],
+                primary_key=list(table.get("primary_key", [])),
+                foreign_keys=[ForeignKeyInfo(**fk) for fk in table.get("foreign_keys", [])],
+                indexes=[IndexInfo(**idx) for idx in table.get("indexes", [])],
+                row_estimate=table.get("row_estimate"),
+                comment=table.get("comment"),
+            ))
+        return cls(schema=data.get("schema", "public"), tables=tables, fingerprint=data.get("fingerprint"))
+
+
+def introspect_catalog(conn_str: str, schema: str = "public") -> CatalogSnapshot:
+    """Read the full structure of a schema from pg_catalog in a single query."""
+    with get_connection_pool(conn_str).connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(CATALOG_QUERY, {"schema": schema})
+            rows = cursor.fetchall()
+    return snapshot_from_catalog_rows(rows, schema)
+
+
+async def aintrospect_catalog(conn_str: str, schema: str = "public") -> CatalogSnapshot:
+    """Async variant of introspect_catalog on the asyncpg pool."""
+    async with async_connection(conn_str) as conn:
+        rows = await conn.fetch(ASYNC_CATALOG_QUERY, schema)
+    rows = [tuple(_from_asyncpg(i, value) for i, value in enumerate(row)) for row in rows]
+    return snapshot_from_catalog_rows(rows, schema)
+
+
+def _from_asyncpg(position: int, value):
+    # asyncpg returns relkind ("char") as bytes and json columns as text
+    if isinstance(value, bytes):
+        return value.decode("ascii")
+    if position >= 4 and isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def snapshot_from_catalog_rows(rows, schema: str = "public") -> CatalogSnapshot:
+    """Build a snapshot from the rows of CATALOG_QUERY."""
+    tables = []
+    for table_name, kind, row_estimate, comment, columns, primary_key, foreign_keys, indexes in rows:
+        tables.append(TableInfo(
+            name=table_name,
+            kind=RELKIND_NAMES.get(kind, kind),
+            columns=[
+                ColumnInfo(
+                    name=col["name"],
+                    data_type=col["data_type"],
+                    is_nullable=not col["not_null"],
+                    default=col["default"],
+                    comment=col["comment"],
+                )
+                for col in columns
+            ],
+            primary_key=primary_key,
+            foreign_keys=[
+                ForeignKeyInfo(
+                    name=fk["name"],
+                    columns=fk["columns"] or [],
+                    target_table=fk["target_table"],
+                    target_columns=fk["target_columns"] or [],
+                )
+                for fk in foreign_keys
+            ],
+            indexes=[IndexInfo(**idx) for idx in indexes],
+            # reltuples is -1 for relations that were never vacuumed or analyzed
+            row_estimate=row_estimate if row_estimate is not None and row_estimate >= 0 else None,
+            comment=comment,
+        ))
+    return CatalogSnapshot(schema=schema, tables=tables)
+
+
+def snapshot_from_frames(columns_df: pd.DataFrame, pk_df: pd.DataFrame, fk_df: pd.DataFrame,
+                         schema: str = "public") -> CatalogSnapshot:
+    """Build a snapshot from information_schema result frames.
+
+    Each frame is grouped once; rows are then read from plain column lists by
+    the group positions instead of slicing a DataFrame per table.
+    """
+    pk_tables = pk_df["table_name"].tolist()
+    pk_columns = pk_df["column_name"].tolist()
+    pk_index: Dict[str, List[str]] = {}
+    for table_name, column_name in zip(pk_tables, pk_columns):
+        pk_index.setdefault(table_name, []).append(column_name)
+
+    fk_index: Dict[str, List[ForeignKeyInfo]] = {}
+    for name, source_table, source_column, target_table, target_column in zip(
+            fk_df["constraint_name"].tolist(), fk_df["source_table"].tolist(), fk_df["source_column"].tolist(),
+            fk_df["target_table"].tolist(), fk_df["target_column"].tolist()):
+        fk_index.setdefault(source_table, []).append(
+            ForeignKeyInfo(name=name, columns=[source_column], target_table=target_table, target_columns=[target_column]))
+
+    column_names = columns_df["column_name"].tolist()
+    data_types = columns_df["data_type"].tolist()
+    nullables = (columns_df["is_nullable"] == "YES").tolist()
+    defaults = [None if pd.isna(value) else value for value in columns_df["column_default"].tolist()]
+
+    tables = []
+    groups = columns_df.groupby("table_name", sort=False).indices
+    for table_name in sorted(groups):
+        tables.append(TableInfo(
+            name=table_name,
+            columns=[
+                ColumnInfo(name=column_names[i], data_type=data_types[i], is_nullable=nullables[i], default=defaults[i])
+                for i in groups[table_name]
+            ],
+            primary_key=pk_index.get(table_name, []),
+            foreign_keys=fk_index.get(table_name, []),
+        ))
+    return CatalogSnapshot(schema=schema, tables=tables)
+
+
+def introspect_information_schema(conn_str: str, schema: str = "public") -> CatalogSnapshot:
+    """Read a schema through the information_schema views (three queries, no indexes or comments)."""
+    params = {"schema": schema}
+    with get_connection_pool(conn_str).connection() as conn:
+        columns_df = pd.read_sql_query(INFORMATION_SCHEMA_COLUMNS_QUERY, conn, params=params)
+        pk_df = pd.read_sql_query(INFORMATION_SCHEMA_PK_QUERY, conn, params=params)
+        fk_df = pd.read_sql_query(INFORMATION_SCHEMA_FK_QUERY, conn, params=params)
+    return snapshot_from_frames(columns_df, pk_df, fk_df, schema)
+
+
+def load_catalog_snapshot(conn_str: str, schema: str = "public") -> CatalogSnapshot:
+    """Get the catalog snapshot for a connection, using the schema cache when it is still valid."""
+    schema_cache = get_schema_cache()
+    cache_name = f"catalog:{schema}"
+
+    cached = schema_cache.get(conn_str, cache_name, schema)
+    if cached is not None:
+        return CatalogSnapshot.from_dict(cached)
+
+    fingerprint = schema_cache.fingerprint(conn_str, schema)
+    try:
+        snapshot = introspect_catalog(conn_str, schema)
+    except Exception as e:
+        print(f"pg_catalog introspection failed, falling back to information_schema: {e}")
+        snapshot = introspect_information_schema(conn_str, schema)
+    snapshot.fingerprint = fingerprint
+    schema_cache.put(conn_str, cache_name, snapshot.to_dict(), fingerprint)
+    return snapshot
+
+
+async def aload_catalog_snapshot(conn_str: str, schema: str = "public") -> CatalogSnapshot:
+    """Async variant of load_catalog_snapshot."""
+    schema_cache = get_schema_cache()
+    cache_name = f"catalog:{schema}"
+
+    cached = await schema_cache.aget(conn_str, cache_name, schema)
+    if cached is not None:
+        return CatalogSnapshot.from_dict(cached)
+
+    fingerprint = await schema_cache.afingerprint(conn_str, schema)
+    try:
+        snapshot = await aintrospect_catalog(conn_str, schema)
+    except Exception as e:
+        print(f"pg_catalog introspection failed, falling back to information_schema: {e}")
+        snapshot = await asyncio.to_thread(introspect_information_schema, conn_str, schema)
+    snapshot.fingerprint = fingerprint
+    schema_cache.put(conn_str, cache_name, snapshot.to_dict(), fingerprint)
+    return snapshot
@@ -0,0 +1,326 @@
+# src/cogniquery_crew/tools/code_preprocessor.py
+
+import os
+import ast
+import hashlib
+import builtins
+import threading
+import importlib.util
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+CODE_PREPROCESSOR_MAX_ENTRIES = int(os.getenv("COGNIQUERY_CODE_CACHE_MAX_ENTRIES", "512"))
+
+# Libraries agents reach for that the executor does not support, with what to use instead
+UNSUPPORTED_LIBRARIES = {
+    "seaborn": "seaborn is not available. Use matplotlib instead.",
+    "plotly": "plotly is not available. Use matplotlib instead.",
+    "bokeh": "bokeh is not available. Use matplotlib instead.",
+    "altair": "altair is not available. Use matplotlib instead.",
+}
+
+# Conventional names snippets often use without importing them
+IMPLICIT_IMPORTS = {
+    "plt": "import matplotlib.pyplot as plt",
+    "pd": "import pandas as pd",
+    "np": "import numpy as np",
+    "io": "import io",
+    "os": "import os",
+    "json": "import json",
+    "re": "import re",
+    "datetime": "import datetime",
+}
+
+# Snippets importing or calling these can print different things each run
+VOLATILE_MODULES = {"random", "secrets", "uuid", "time"}
+VOLATILE_ATTRIBUTES = {"now", "today", "utcnow", "random", "rand", "randn", "randint", "choice", "shuffle", "sample", "default_rng"}
+
+# Snippets using these read files, the environment, the database or the network, which the
+# execution cache key does not cover
+EXTERNAL_INPUT_MODULES = {
+    "psycopg2", "psycopg", "asyncpg", "sqlalchemy", "sqlite3", "requests", "urllib", "httpx", "socket",
+}
+EXTERNAL_INPUT_CALLS = {"open", "load", "loadtxt", "genfromtxt", "fromfile", "listdir", "scandir", "walk",
+                        "glob", "iglob", "rglob", "iterdir", "exists", "isfile", "isdir", "getsize", "getmtime",
+                        "stat", "getenv", "load_workbook"}
+EXTERNAL_INPUT_ATTRIBUTES = {"environ"}
+
+# Calls that write files; a cache replay restores saved figures only, so these snippets always run.
+# Names shared with common DataFrame, str or list methods (copy, rename, replace, remove) are left out.
+FILE_WRITING_CALLS = {"to_csv", "to_excel", "to_parquet", "to_pickle", "to_feather", "to_hdf", "to_sql",
+                      "to_stata", "to_orc", "savetxt", "save", "savez", "savez_compressed", "tofile", "dump",
+                      "write_text", "write_bytes", "copyfile", "copy2", "copytree", "ExcelWriter"}
+# These return a string unless given a path or buffer to write to
+OPTIONAL_PATH_CALLS = {"to_json", "to_html", "to_latex", "to_xml", "to_markdown", "to_string"}
+
+_BUILTIN_NAMES = set(dir(builtins))
+
+
+@dataclass
+class SnippetAnalysis:
+    """What a snippet imports, uses and saves, read from its AST."""
+    imports: List[str] = field(default_factory=list)  # top-level modules, in order
+    guarded_imports: Set[str] = field(default_factory=set)  # imported inside a try block
+    free_names: Set[str] = field(default_factory=set)  # loaded but never bound
+    savefig_targets: List[str] = field(default_factory=list)  # literal paths only
+    saves_figures: bool = False
+    deterministic: bool = True  # no randomness or clock reads, so re-running reproduces the output
+    reads_external_inputs: bool = False  # files, environment, database or network
+    writes_files: bool = False  # anything other than saved figures
+
+    @property
+    def cacheable(self) -> bool:
+        """Whether the output depends only on the code and the preloaded results."""
+        return self.deterministic and not self.reads_external_inputs and not self.writes_files
+
+
+@dataclass
+class PreprocessedCode:
+    """A snippet ready to run, or the reason it should not be run."""
+    code: str
+    analysis: Optional[SnippetAnalysis] = None
+    error: Optional[str] = None
+    setup: List[str] = field(default_factory=list)  # lines injected before the snippet
+    # Hash of the snippet's AST, equal for snippets differing only in comments and formatting
+    fingerprint: Optional[str] = None
+
+
+def module_available(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class _SnippetVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.analysis = SnippetAnalysis()
+        self.loaded: Set[str] = set()
+        self.bound: Set[str] = set()
+        self.to_markdown_calls: List[ast.Call] = []
+        self._try_depth = 0
+
+    def _add_import(self, module: str):
+        top = module.split(".")[0]
+        if top and top not in self.analysis.imports:
+            self.analysis.imports.append(top)
+        if top and self._try_depth:
+            self.analysis.guarded_imports.add(top)
+
+    def visit_Try(self, node):
+        # Imports in a try block may be optional (`except ImportError`)
+        self._try_depth += 1
+        for statement in node.body:
+            self.visit(statement)
+        self._try_depth -= 1
+        for child in node.handlers + node.orelse + node.finalbody:
+            self.visit(child)
+
+    visit_TryStar = visit_Try
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            self._add_import(alias.name)
+            self.bound.add(alias.asname or alias.name.split(".")[0])
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if node.level == 0 and node.module:
+            self._add_import(node.module)
+        for alias in node.names:
+            self.bound.add(alias.asname or alias.name)
+
+    def visit_Name(self, node: ast.Name):
+        (self.loaded if isinstance(node.ctx, ast.Load) else self.bound).add(node.id)
+
+    def _bind_definition(self, node):
+        self.bound.add(node.name)
+        self.generic_visit(node)
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _bind_definition
+
+    def visit_arg(self, node: ast.arg):
+        self.bound.add(node.arg)
+        self.generic_visit(node)
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler):
+        if node.name:
+            self.bound.add(node.name)
+        self.generic_visit(node)
+
+    def visit_Global(self, node: ast.Global):
+        self.bound.update(node.names)
+
+    def visit_Attribute(self, node: ast.Attribute):
+        if node.attr in VOLATILE_ATTRIBUTES:
+            self.analysis.deterministic = False
+        if node.attr in EXTERNAL_INPUT_ATTRIBUTES:
+            self.analysis.reads_external_inputs = True
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call):
+        called = node.func.attr if isinstance(node.func, ast.Attribute) else getattr(node.func, "id", None)
+        if called and (called in EXTERNAL_INPUT_CALLS or called.startswith("read_")):
+            self.analysis.reads_external_inputs = True
+        if called in FILE_WRITING_CALLS or (called in OPTIONAL_PATH_CALLS and (node.args or node.keywords)):
+            self.analysis.writes_files = True
+        if isinstance(node.func, ast.Attribute):
+            if node.func.attr == "savefig":
+                self.analysis.saves_figures = True
+                target = node.args[0] if node.args else next(
+                    (keyword.value for keyword in node.keywords if keyword.arg == "fname"), None)
+                if isinstance(target, ast.Constant) and isinstance(target.value, str):
+                    self.analysis.savefig_targets.append(target.value)
+            elif node.func.attr == "to_markdown":
+                self.to_markdown_calls.append(node)
+        self.generic_visit(node)
+
+
+def _char_offset(lines: List[str], lineno: int, col: int) -> int:
+    """Offset in the source of an AST position (1-based line, UTF-8 byte column)."""
+    line = lines[lineno - 1]
+    return sum(len(previous) for previous in lines[:lineno - 1]) + len(line.encode("utf-8")[:col].decode("utf-8", errors="ignore"))
+
+
+def _replace_to_markdown(code: str, calls: List[ast.Call]) -> str:
+    """Rewrite `x.to_markdown(...)` as `x.to_string()`, keeping everything else byte for byte."""
+    lines = code.splitlines(keepends=True)
+    edits = []
+    for call in calls:
+        start = _char_offset(lines, call.func.value.end_lineno, call.func.value.end_col_offset)
+        end = _char_offset(lines, call.end_lineno, call.end_col_offset)
+        edits.append((start, end))
+    for start, end in sorted(edits, reverse=True):
+        code = code[:start] + ".to_string()" + code[end:]
+    return code
+
+
+def _insert_setup(code: str, tree: ast.Module, setup: str) -> str:
+    """Put the setup line after the module docstring and `from __future__` imports, which must come first."""
+    after_line = 0
+    for index, statement in enumerate(tree.body):
+        is_docstring = (index == 0 and isinstance(statement, ast.Expr)
+                        and isinstance(statement.value, ast.Constant) and isinstance(statement.value.value, str))
+        is_future = isinstance(statement, ast.ImportFrom) and statement.module == "__future__"
+        if not (is_docstring or is_future):
+            break
+        after_line = statement.end_lineno
+    lines = code.splitlines(keepends=True)
+    head = "".join(lines[:after_line])
+    if head and not head.endswith("\n"):
+        head += "\n"
+    return head + setup + "\n" + "".join(lines[after_line:])
+
+
+def insert_preamble(code: str, preamble: str) -> str:
+    """Put a block of code before a snippet, but after its docstring and __future__ imports."""
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return preamble + code
+    return _insert_setup(code, tree, preamble.rstrip("\n"))
+
+
+def _setup_lines(analysis: SnippetAnalysis) -> List[str]:
+    setup = [IMPLICIT_IMPORTS[name] for name in sorted(analysis.free_names) if name in IMPLICIT_IMPORTS]
+    # The executor creates output/ itself; only deeper directories need creating
+    directories = sorted({os.path.normpath(os.path.dirname(target)) for target in analysis.savefig_targets
+                          if os.path.dirname(target)} - {"output"})
+    if directories:
+        setup.append("import os as _os")
+        setup.extend(f"_os.makedirs({directory!r}, exist_ok=True)" for directory in directories)
+    return setup
+
+
+def preprocess_code(code: str) -> PreprocessedCode:
+    """Check a snippet's imports and inject only the setup it is missing.
+
+    Unsupported or uninstalled imports are reported instead of run,
+    `to_markdown()` becomes `to_string()` when tabulate is missing, and
+    conventional names such as `plt` or `pd` used without an import get one.
+    The setup goes on one line after any docstring and __future__ imports,
+    so snippet line numbers in tracebacks shift by one at most.
+    Code that does not parse is returned as is, so running it reports the error.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return PreprocessedCode(code)
+
+    visitor = _SnippetVisitor()
+    visitor.visit(tree)
+    analysis = visitor.analysis
+    analysis.free_names = visitor.loaded - visitor.bound - _BUILTIN_NAMES
+    if VOLATILE_MODULES.intersection(analysis.imports):
+        analysis.deterministic = False
+    if EXTERNAL_INPUT_MODULES.intersection(analysis.imports):
+        analysis.reads_external_inputs = True
+    fingerprint = hashlib.sha256(ast.dump(tree).encode("utf-8")).hexdigest()
+
+    for module in analysis.imports:
+        if module in UNSUPPORTED_LIBRARIES:
+            message = UNSUPPORTED_LIBRARIES[module]
+        elif module not in analysis.guarded_imports and not module_available(module):
+            message = f"{module} is not installed."
+        else:
+            continue
+        return PreprocessedCode(code, analysis, fingerprint=fingerprint, error=(
+            f"Error: {message} Rewrite the code without {module}; "
+            f"available libraries are pandas, numpy, matplotlib and the standard library."
+        ))
+
+    if visitor.to_markdown_calls and not module_available("tabulate"):
+        code = _replace_to_markdown(code, visitor.to_markdown_calls)
+
+    setup = _setup_lines(analysis)
+    if setup:
+        code = _insert_setup(code, tree, "; ".join(setup))
+    return PreprocessedCode(code, analysis, setup=setup, fingerprint=fingerprint)
+
+
+class CodePreprocessor:
+    """preprocess_code with an LRU cache keyed by the snippet's hash, so repeated snippets skip the parse."""
+
+    def __init__(self, max_entries: int = CODE_PREPROCESSOR_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, PreprocessedCode]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def preprocess(self, code: str) -> PreprocessedCode:
+        key = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return cached
+            self._stats["misses"] += 1
+
+        result = preprocess_code(code)
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), **self._stats}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Global code preprocessor instance
+_code_preprocessor_instance = None
+_code_preprocessor_lock = threading.Lock()
+
+def get_code_preprocessor() -> CodePreprocessor:
+    """Get the global code preprocessor instance."""
+    global _code_preprocessor_instance
+    with _code_preprocessor_lock:
+        if _code_preprocessor_instance is None:
+            _code_preprocessor_instance = CodePreprocessor()
+        return _code_preprocessor_instance
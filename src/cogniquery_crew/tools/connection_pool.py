@@ -0,0 +1,248 @@
+# src/cogniquery_crew/tools/connection_pool.py
+
+import os
+import time
+import atexit
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+import psycopg2
+import psycopg2.extensions
+
+# Pool defaults, overridable through the environment
+POOL_MAX_SIZE = int(os.getenv("COGNIQUERY_DB_POOL_SIZE", "5"))
+POOL_MAX_IDLE_SECONDS = float(os.getenv("COGNIQUERY_DB_POOL_MAX_IDLE", "300"))
+POOL_MAX_LIFETIME_SECONDS = float(os.getenv("COGNIQUERY_DB_POOL_MAX_LIFETIME", "1800"))
+POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("COGNIQUERY_DB_POOL_HEALTH_CHECK", "30"))
+POOL_ACQUIRE_TIMEOUT = float(os.getenv("COGNIQUERY_DB_POOL_ACQUIRE_TIMEOUT", "30"))
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time."""
+
+
+class _PooledConnection:
+    """A psycopg2 connection plus the bookkeeping needed to recycle it."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class PostgresConnectionPool:
+    """Thread-safe pool of psycopg2 connections for a single connection string.
+
+    Connections are health-checked when they have been idle for a while,
+    recycled once they exceed their idle time or lifetime, and rolled back
+    before being handed to the next caller.
+    """
+
+    def __init__(self, conn_str: str,
+                 max_size: int = POOL_MAX_SIZE,
+                 max_idle_seconds: float = POOL_MAX_IDLE_SECONDS,
+                 max_lifetime_seconds: float = POOL_MAX_LIFETIME_SECONDS,
+                 health_check_interval: float = POOL_HEALTH_CHECK_INTERVAL,
+                 acquire_timeout: float = POOL_ACQUIRE_TIMEOUT):
+        self.conn_str = conn_str
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+
+        self._idle: deque = deque()
+        self._in_use = 0
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(max_size)
+        self._stats = {
+            "connections_opened": 0,
+            "connections_closed": 0,
+            "checkouts": 0,
+            "reused": 0,
+            "health_check_failures": 0,
+            "recycled": 0,
+            "acquire_timeouts": 0,
+        }
+
+    def acquire(self) -> _PooledConnection:
+        """Check out a healthy connection, opening a new one if needed."""
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self._stats["acquire_timeouts"] += 1
+            raise PoolTimeoutError(
+                f"Timed out after {self.acquire_timeout}s waiting for a database connection "
+                f"(pool size {self.max_size})"
+            )
+
+        try:
+            entry = self._checkout_idle()
+            if entry is None:
+                entry = _PooledConnection(psycopg2.connect(self.conn_str))
+                with self._lock:
+                    self._stats["connections_opened"] += 1
+            else:
+                with self._lock:
+                    self._stats["reused"] += 1
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._in_use += 1
+            self._stats["checkouts"] += 1
+        return entry
+
+    def release(self, entry: _PooledConnection, discard: bool = False):
+        """Return a connection to the pool, or close it if it is no longer usable."""
+        try:
+            if not discard and not entry.conn.closed:
+                try:
+                    if entry.conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                        entry.conn.rollback()
+                except Exception:
+                    discard = True
+
+            if discard or entry.conn.closed or self._is_expired(entry):
+                self._close(entry)
+            else:
+                entry.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(entry)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+            self._reap_idle()
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a pooled psycopg2 connection."""
+        entry = self.acquire()
+        discard = False
+        try:
+            yield entry.conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.release(entry, discard=discard)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get a snapshot of the pool's usage counters."""
+        with self._lock:
+            return {
+                "database": describe_connection_string(self.conn_str),
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                **self._stats,
+            }
+
+    def close_all(self):
+        """Close every idle connection held by the pool."""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for entry in idle:
+            self._close(entry)
+
+    def _checkout_idle(self) -> Optional[_PooledConnection]:
+        """Pop the most recently used idle connection that is still healthy."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                entry = self._idle.pop()
+
+            if entry.conn.closed or self._is_expired(entry):
+                self._close(entry, recycled=True)
+                continue
+
+            if time.monotonic() - entry.last_used >= self.health_check_interval and not self._is_healthy(entry):
+                with self._lock:
+                    self._stats["health_check_failures"] += 1
+                self._close(entry)
+                continue
+
+            return entry
+
+    def _is_expired(self, entry: _PooledConnection) -> bool:
+        now = time.monotonic()
+        return (now - entry.created_at >= self.max_lifetime_seconds
+                or now - entry.last_used >= self.max_idle_seconds)
+
+    def _is_healthy(self, entry: _PooledConnection) -> bool:
+        try:
+            with entry.conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            entry.conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _reap_idle(self):
+        """Close idle connections that have outlived their idle time or lifetime."""
+        with self._lock:
+            expired = [entry for entry in self._idle if self._is_expired(entry)]
+            for entry in expired:
+                self._idle.remove(entry)
+        for entry in expired:
+            self._close(entry, recycled=True)
+
+    def _close(self, entry: _PooledConnection, recycled: bool = False):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._stats["connections_closed"] += 1
+            if recycled:
+                self._stats["recycled"] += 1
+
+
+def describe_connection_string(conn_str: str) -> str:
+    """Describe a connection string without exposing its credentials."""
+    try:
+        params = psycopg2.extensions.parse_dsn(conn_str)
+    except Exception:
+        return "<unparseable connection string>"
+    host = params.get("host", "localhost")
+    port = params.get("port", "5432")
+    return f"{params.get('user', '')}@{host}:{port}/{params.get('dbname', '')}"
+
+
+def resolve_connection_string(db_connection_string: str | None = None) -> str | None:
+    """Use the given connection string or fall back to NEONDB_CONN_STR."""
+    return db_connection_string or os.getenv("NEONDB_CONN_STR")
+
+
+# Global pool registry, keyed by connection string
+_pools: Dict[str, PostgresConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_connection_pool(conn_str: str) -> PostgresConnectionPool:
+    """Get the shared connection pool for a connection string."""
+    with _pools_lock:
+        pool = _pools.get(conn_str)
+        if pool is None:
+            pool = PostgresConnectionPool(conn_str)
+            _pools[conn_str] = pool
+        return pool
+
+def get_pool_stats() -> List[Dict[str, Any]]:
+    """Get usage statistics for every pool created so far."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
+def close_all_pools():
+    """Close all idle pooled connections, e.g. at interpreter shutdown."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
+
+atexit.register(close_all_pools)
@@ -1,14 +1,16 @@
 # src/cogniquery_crew/tools/db_tools.py
 
-import os
 from dotenv import load_dotenv
 
 # Load variables from .env file
 load_dotenv()
-import psycopg2
 import pandas as pd
+from typing import Optional
 from crewai.tools import BaseTool
-from .activity_logger import get_activity_logger
+from .run_context import RunContext, activity_logger_for, connection_string_for
+from .connection_pool import get_connection_pool
+from .catalog_introspection import load_catalog_snapshot
+from .schema_renderer import render_database_tools
 
 class DatabaseTools(BaseTool):
     name: str = "DatabaseTools"
@@ -25,30 +27,26 @@ class DatabaseTools(BaseTool):
     - For SQL query: DatabaseTools(sql_query='SELECT * FROM regions LIMIT 5')
     
     The connection string is loaded automatically from environment variables."""
+    run_context: Optional[RunContext] = None  # set per run by CogniQueryCrew
 
     def _execute_query(self, query: str, db_connection_string: str | None = None):
-        """Helper function to execute a query and return a pandas DataFrame."""
-        # Determine connection string: passed in or from environment
-        conn_str = db_connection_string or os.getenv("NEONDB_CONN_STR")
+        """Helper function to execute a query on a pooled connection and return a pandas DataFrame."""
+        conn_str = connection_string_for(self.run_context, db_connection_string)
         if not conn_str:
             return "Error: NEONDB_CONN_STR is not set in environment or passed to the tool."
-        conn = None
+        
         try:
-            conn = psycopg2.connect(conn_str)
-            return pd.read_sql_query(query, conn)
+            with get_connection_pool(conn_str).connection() as conn:
+                return pd.read_sql_query(query, conn)
         except Exception as e:
-            # Return the error message as a string if the query fails
             return f"Error executing query: {e}"
-        finally:
-            if conn:
-                conn.close()
 
     def get_schema(self, db_connection_string: str | None = None) -> str:
         """
         Returns the comprehensive schema of the database as a string.
         The schema includes table names, columns, data types, primary keys, foreign keys, and relationships.
         """
-        logger = get_activity_logger()
+        logger = activity_logger_for(self.run_context)
         
         # Determine which agent is calling this
         current_status = logger.get_current_status()
@@ -56,134 +54,30 @@ class DatabaseTools(BaseTool):
         
         logger.log_tool_usage(current_agent, "Database Tools", f"Getting comprehensive database schema")
         
-        # Query 1: Get basic table and column information
-        columns_query = """
-        SELECT table_name, column_name, data_type, is_nullable, column_default
-        FROM information_schema.columns 
-        WHERE table_schema = 'public'
-        ORDER BY table_name, ordinal_position;
-        """
-        
-        # Query 2: Get primary key information
-        pk_query = """
-        SELECT tc.table_name, kcu.column_name
-        FROM information_schema.table_constraints tc
-        JOIN information_schema.key_column_usage kcu 
-            ON tc.constraint_name = kcu.constraint_name
-        WHERE tc.constraint_type = 'PRIMARY KEY' 
-            AND tc.table_schema = 'public'
-        ORDER BY tc.table_name, kcu.ordinal_position;
-        """
-        
-        # Query 3: Get foreign key relationships
-        fk_query = """
-        SELECT
-            tc.table_name as source_table,
-            kcu.column_name as source_column,
-            ccu.table_name as target_table,
-            ccu.column_name as target_column
-        FROM information_schema.table_constraints tc
-        JOIN information_schema.key_column_usage kcu 
-            ON tc.constraint_name = kcu.constraint_name
-        JOIN information_schema.constraint_column_usage ccu 
-            ON ccu.constraint_name = tc.constraint_name
-        WHERE tc.constraint_type = 'FOREIGN KEY' 
-            AND tc.table_schema = 'public'
-        ORDER BY tc.table_name, kcu.column_name;
-        """
-        
-        logger.log_sql_query(current_agent, "Schema analysis queries (columns, primary keys, foreign keys)")
-        
-        # Execute all queries
-        columns_df = self._execute_query(columns_query, db_connection_string)
-        pk_df = self._execute_query(pk_query, db_connection_string)
-        fk_df = self._execute_query(fk_query, db_connection_string)
-        
-        # Check for errors
-        if isinstance(columns_df, str):
-            logger.log_tool_usage(current_agent, "Database Tools", f"Schema query failed: {columns_df}")
-            return columns_df
-        
-        # Build comprehensive schema string
-        schema_str = "=== DATABASE SCHEMA ANALYSIS ===\n\n"
-        
-        # Get all tables
-        tables = columns_df['table_name'].unique()
-        
-        # Primary keys lookup
-        pk_lookup = {}
-        if not isinstance(pk_df, str) and len(pk_df) > 0:
-            for _, row in pk_df.iterrows():
-                table = row['table_name']
-                if table not in pk_lookup:
-                    pk_lookup[table] = []
-                pk_lookup[table].append(row['column_name'])
-        
-        # Foreign keys lookup
-        fk_lookup = {}
-        if not isinstance(fk_df, str) and len(fk_df) > 0:
-            for _, row in fk_df.iterrows():
-                source_table = row['source_table']
-                if source_table not in fk_lookup:
-                    fk_lookup[source_table] = []
-                fk_lookup[source_table].append({
-                    'source_column': row['source_column'],
-                    'target_table': row['target_table'],
-                    'target_column': row['target_column']
-                })
+        conn_str = connection_string_for(self.run_context, db_connection_string)
+        if not conn_str:
+            return "Error: NEONDB_CONN_STR is not set in environment or passed to the tool."
         
-        # Build detailed schema for each table
-        for table in sorted(tables):
-            schema_str += f"📊 Table: {table}\n"
-            
-            # Add columns
-            table_columns = columns_df[columns_df['table_name'] == table]
-            for _, col in table_columns.iterrows():
-                column_name = col['column_name']
-                data_type = col['data_type']
-                is_nullable = col['is_nullable']
-                default_val = col['column_default']
-                
-                # Mark primary keys
-                pk_marker = " [PRIMARY KEY]" if table in pk_lookup and column_name in pk_lookup[table] else ""
-                
-                # Mark foreign keys
-                fk_marker = ""
-                if table in fk_lookup:
-                    for fk in fk_lookup[table]:
-                        if fk['source_column'] == column_name:
-                            fk_marker = f" [FK → {fk['target_table']}.{fk['target_column']}]"
-                            break
-                
-                nullable_info = "" if is_nullable == "YES" else " NOT NULL"
-                default_info = f" DEFAULT {default_val}" if default_val else ""
-                
-                schema_str += f"  - {column_name} ({data_type}){pk_marker}{fk_marker}{nullable_info}{default_info}\n"
-            
-            schema_str += "\n"
+        logger.log_sql_query(current_agent, "Schema analysis query (pg_catalog: columns, keys, indexes, row estimates)")
         
-        # Add relationships summary
-        if not isinstance(fk_df, str) and len(fk_df) > 0:
-            schema_str += "🔗 TABLE RELATIONSHIPS:\n"
-            for _, row in fk_df.iterrows():
-                schema_str += f"  - {row['source_table']}.{row['source_column']} → {row['target_table']}.{row['target_column']}\n"
-            schema_str += "\n"
+        # Single-round-trip catalog introspection, served from the schema cache when unchanged
+        try:
+            snapshot = load_catalog_snapshot(conn_str)
+        except Exception as e:
+            error_msg = f"Error executing query: {e}"
+            logger.log_tool_usage(current_agent, "Database Tools", f"Schema query failed: {error_msg}")
+            return error_msg
         
-        # Add summary statistics
-        schema_str += f"📈 SCHEMA SUMMARY:\n"
-        schema_str += f"  - Total tables: {len(tables)}\n"
-        schema_str += f"  - Total columns: {len(columns_df)}\n"
-        schema_str += f"  - Primary key constraints: {len(pk_df) if not isinstance(pk_df, str) else 0}\n"
-        schema_str += f"  - Foreign key relationships: {len(fk_df) if not isinstance(fk_df, str) else 0}\n"
+        schema_str = render_database_tools(snapshot)
         
-        logger.log_tool_usage(current_agent, "Database Tools", f"Retrieved comprehensive schema for {len(tables)} tables with relationships")
+        logger.log_tool_usage(current_agent, "Database Tools", f"Retrieved comprehensive schema for {len(snapshot.tables)} tables with relationships")
         return schema_str
 
     def get_sample_data(self, table_name: str, limit: int = 5, db_connection_string: str | None = None) -> str:
         """
         Returns sample data from a specific table to help understand the data structure and content.
         """
-        logger = get_activity_logger()
+        logger = activity_logger_for(self.run_context)
         current_status = logger.get_current_status()
         current_agent = current_status.get('current_agent', 'Unknown Agent')
         
@@ -218,7 +112,7 @@ class DatabaseTools(BaseTool):
         as a CSV formatted string.
         If the query fails, it returns the error message.
         """
-        logger = get_activity_logger()
+        logger = activity_logger_for(self.run_context)
         
         # Log the SQL query being executed
         logger.log_sql_query("Data Analyst", sql_query)
@@ -0,0 +1,214 @@
+# src/cogniquery_crew/tools/execution_cache.py
+
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import datetime
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+EXEC_CACHE_ENABLED = os.getenv("COGNIQUERY_EXEC_CACHE", "1").lower() not in ("0", "false", "no")
+EXEC_CACHE_DIR = os.path.join(os.getenv("COGNIQUERY_CACHE_DIR", ".cache"), "executions")
+EXEC_CACHE_MAX_BYTES = int(os.getenv("COGNIQUERY_EXEC_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+_ENTRY_FILE = "entry.json"
+
+
+@dataclass
+class CachedExecution:
+    """What a successful execution printed and saved."""
+    stdout: str
+    stderr: str
+    artifacts: List[str]  # in the order they were saved, relative to the workspace
+    files: Dict[str, bytes] = field(default_factory=dict)  # contents of the artifacts written to disk
+    figures: List[Dict[str, Any]] = field(default_factory=list)  # captured in memory: path, format, data
+
+    @property
+    def size(self) -> int:
+        return (len(self.stdout.encode("utf-8")) + len(self.stderr.encode("utf-8"))
+                + sum(len(data) for data in self.files.values())
+                + sum(len(figure["data"]) for figure in self.figures))
+
+
+def execution_key(fingerprint: str, input_hashes: List[str], settings: Dict[str, Any]) -> str:
+    """Cache key of a snippet: its AST fingerprint, the hashes of the data it loads, and the executor settings."""
+    payload = json.dumps({"code": fingerprint, "inputs": input_hashes, "settings": settings}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+class ExecutionCache:
+    """On-disk LRU of successful Python executions, bounded by total size.
+
+    Each entry is a directory holding the stdout, stderr and saved files of
+    one execution, so a retried snippet with unchanged inputs is answered
+    without running it, across runs and restarts. Entry mtimes record use,
+    so the LRU order survives a restart.
+    """
+
+    def __init__(self, cache_dir: str = EXEC_CACHE_DIR, max_bytes: int = EXEC_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # key -> size, least recently used first
+        self._total_bytes = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[CachedExecution]:
+        """Get a cached execution and mark it as recently used."""
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                self._stats["misses"] += 1
+                return None
+            self._index.move_to_end(key)
+            try:
+                entry = self._read_entry(key)
+                os.utime(os.path.join(self._entry_dir(key), _ENTRY_FILE))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Dropping unreadable execution cache entry {key}: {e}")
+                self._remove(key)
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            return entry
+
+    def put(self, key: str, entry: CachedExecution):
+        """Store an execution, evicting the least recently used ones beyond max_bytes."""
+        size = entry.size
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            # Before staging, so the first load does not sweep the staging directory away
+            self._load_index()
+        staging = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        try:
+            self._write_entry(staging, entry)
+            size = _directory_size(staging)
+        except OSError as e:
+            print(f"Could not write execution cache entry: {e}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+
+        with self._lock:
+            if key in self._index:
+                self._remove(key)
+            try:
+                os.replace(staging, self._entry_dir(key))
+            except OSError as e:
+                print(f"Could not store execution cache entry: {e}")
+                shutil.rmtree(staging, ignore_errors=True)
+                return
+            self._index[key] = size
+            self._total_bytes += size
+            self._stats["stores"] += 1
+            while self._total_bytes > self.max_bytes and len(self._index) > 1:
+                self._remove(next(iter(self._index)))
+                self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._load_index()
+            return {"entries": len(self._index), "bytes": self._total_bytes, **self._stats}
+
+    def clear(self):
+        with self._lock:
+            self._load_index()
+            for key in list(self._index):
+                self._remove(key)
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _load_index(self):
+        # Called with the lock held; rebuilds the LRU order from a previous process's entries
+        if self._loaded:
+            return
+        self._loaded = True
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for name in names:
+            entry_dir = self._entry_dir(name)
+            if name.startswith(".tmp-"):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+            try:
+                used = os.path.getmtime(os.path.join(entry_dir, _ENTRY_FILE))
+                size = _directory_size(entry_dir)
+            except OSError:
+                continue
+            entries.append((used, name, size))
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self._total_bytes += size
+
+    def _remove(self, key: str):
+        # Called with the lock held
+        self._total_bytes -= self._index.pop(key, 0)
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def _write_entry(self, entry_dir: str, entry: CachedExecution):
+        os.makedirs(entry_dir)
+        blobs = 0
+
+        def write_blob(data: bytes) -> str:
+            nonlocal blobs
+            name = f"blob_{blobs}"
+            blobs += 1
+            with open(os.path.join(entry_dir, name), "wb") as f:
+                f.write(data)
+            return name
+
+        manifest = {
+            "stdout": entry.stdout,
+            "stderr": entry.stderr,
+            "artifacts": entry.artifacts,
+            "files": [{"path": path, "blob": write_blob(data)} for path, data in entry.files.items()],
+            "figures": [{"path": figure["path"], "format": figure["format"], "blob": write_blob(figure["data"])}
+                        for figure in entry.figures],
+            "created": datetime.datetime.now().isoformat(),
+        }
+        with open(os.path.join(entry_dir, _ENTRY_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+    def _read_entry(self, key: str) -> CachedExecution:
+        entry_dir = self._entry_dir(key)
+        with open(os.path.join(entry_dir, _ENTRY_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        def read_blob(name: str) -> bytes:
+            with open(os.path.join(entry_dir, name), "rb") as f:
+                return f.read()
+
+        return CachedExecution(
+            stdout=manifest["stdout"],
+            stderr=manifest["stderr"],
+            artifacts=manifest["artifacts"],
+            files={item["path"]: read_blob(item["blob"]) for item in manifest["files"]},
+            figures=[{"path": item["path"], "format": item["format"], "data": read_blob(item["blob"])}
+                     for item in manifest["figures"]],
+        )
+
+
+# Global execution cache instance
+_execution_cache_instance = None
+_execution_cache_lock = threading.Lock()
+
+def get_execution_cache() -> ExecutionCache:
+    """Get the global execution cache instance."""
+    global _execution_cache_instance
+    with _execution_cache_lock:
+        if _execution_cache_instance is None:
+            _execution_cache_instance = ExecutionCache()
+        return _execution_cache_instance
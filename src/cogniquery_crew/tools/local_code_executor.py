@@ -2,12 +2,24 @@
 
 import os
 import sys
+import asyncio
 import subprocess
+import json
 import tempfile
-from crewai.tools import BaseTool
-from .activity_logger import get_activity_logger
+from typing import Dict, List, Optional, Any
+from .async_tool import AsyncNativeTool
+from .run_context import RunContext, activity_logger_for, result_store_for
+from .python_worker_pool import (
+    get_python_worker_pool, decode_figures, SnippetResult, WorkerStartupError, PYTHON_WORKER_POOL_ENABLED, WORKER_SCRIPT,
+)
+from .code_preprocessor import get_code_preprocessor, insert_preamble, PreprocessedCode
+from .execution_cache import get_execution_cache, execution_key, CachedExecution, EXEC_CACHE_ENABLED
+from .sandbox_limits import (
+    ExecutionLimits, cgroup_for_process, limit_message,
+    PY_MEMORY_LIMIT_MB, PY_CPU_LIMIT_SECONDS, PY_MAX_OUTPUT_CHARS,
+)
 
-class LocalCodeExecutorTool(BaseTool):
+class LocalCodeExecutorTool(AsyncNativeTool):
     """Local code executor tool that runs Python code in the current environment.
     
     This tool executes Python code locally instead of in a Docker container,
@@ -27,33 +39,64 @@ class LocalCodeExecutorTool(BaseTool):
     
     Parameters:
     - code: Python code to execute (required)
+    - result_ids: Result IDs returned by SQLExecutor to preload (optional, e.g. ['res_0123456789ab'])
+    - snippets: List of independent code snippets to run in parallel instead of `code` (optional)
     
     CHART REQUIREMENTS (MANDATORY):
     - Use matplotlib.pyplot for visualizations: import matplotlib.pyplot as plt
     - Save charts to output directory: plt.savefig('output/chart_1.png')
     - Create as many charts as needed for comprehensive analysis
     - Charts are automatically displayed in the Streamlit UI ONLY if saved with plt.savefig()
+    - Independent charts render in parallel when passed as snippets=['<chart 1 code>', '<chart 2 code>']
+      (each snippet runs on its own with the same preloaded results; do not share variables between them)
     
     DATA INPUT PATTERN:
-    - SQL results are typically provided as CSV strings
-    - Use pd.read_csv(io.StringIO(csv_data)) to convert CSV strings to DataFrames
+    - Pass the Result ID from SQLExecutor: LocalCodeExecutor(code='...', result_ids=['res_0123456789ab'])
+    - A single result is preloaded as the DataFrame `df`; every result is in `results[result_id]`
+    - load_result(result_id) returns any preloaded result as a DataFrame
+    - Only fall back to pd.read_csv(io.StringIO(csv_data)) when no Result ID is available
     - Always validate data before creating charts
     
     AVAILABLE LIBRARIES: pandas, numpy, matplotlib, datetime, json, re, io
     
+    RESOURCE LIMITS: each execution has a memory and CPU time allowance and long output is truncated,
+    so aggregate in SQL and print summaries rather than whole DataFrames.
+    
     ⚠️  REMINDER: Without LocalCodeExecutor + plt.savefig(), NO CHARTS will appear in the UI!"""
+    run_context: Optional[RunContext] = None  # set per run by CogniQueryCrew
+    
+    use_worker_pool: bool = PYTHON_WORKER_POOL_ENABLED
+    # "memory" captures saved figures as buffers returned over the worker pipe instead of files
+    chart_capture: str = os.getenv("COGNIQUERY_CHART_CAPTURE", "file")
+    chart_format: str = os.getenv("COGNIQUERY_CHART_FORMAT", "png")  # "png" or "svg" when captured
+    chart_dpi: int = int(os.getenv("COGNIQUERY_CHART_DPI", "0"))  # 0 keeps the snippet's dpi
+    # Per-execution caps (0 disables one); COGNIQUERY_PY_CGROUP adds an optional cgroup per interpreter
+    memory_limit_mb: int = PY_MEMORY_LIMIT_MB
+    cpu_limit_seconds: int = PY_CPU_LIMIT_SECONDS
+    max_output_chars: int = PY_MAX_OUTPUT_CHARS
+    # Replay successful executions of the same code on the same data instead of re-running them
+    use_execution_cache: bool = EXEC_CACHE_ENABLED
     
     def __init__(self):
         super().__init__()
+        if self.use_worker_pool:
+            # Start interpreters now so the first snippet does not pay for imports
+            get_python_worker_pool().warm()
         
-    def _run(self, code: str = None, **kwargs) -> str:
+    def _run(self, code: str = None, result_ids: List[str] = None, snippets: List[str] = None, **kwargs) -> str:
         """Run Python code locally and log the execution."""
         # Add debugging
         print(f"🐛 DEBUG: LocalCodeExecutor._run called with code={code is not None}, kwargs: {list(kwargs.keys())}")
         # Handle both calling patterns
         if code is None:
             code = kwargs.get('code', '')
-        return self._execute_code(code=code, **kwargs)
+        return self._execute_code(code=code, result_ids=result_ids, snippets=snippets, **kwargs)
+    
+    async def _arun(self, code: str = None, result_ids: List[str] = None, snippets: List[str] = None, **kwargs) -> str:
+        """Async variant of _run: awaits the worker pool instead of blocking a thread."""
+        if code is None:
+            code = kwargs.get('code', '')
+        return await self._aexecute_code(code=code, result_ids=result_ids, snippets=snippets, **kwargs)
     
     def run(self, **kwargs) -> str:
         """Alternative method name that some CrewAI versions might use."""
@@ -70,28 +113,64 @@ class LocalCodeExecutorTool(BaseTool):
         # Add debugging
         print(f"🐛 DEBUG: LocalCodeExecutor._execute_code called with code={code is not None}, kwargs: {list(kwargs.keys())}")
         
-        logger = get_activity_logger()
+        # Independent snippets run as one parallel batch
+        snippets = kwargs.pop('snippets', None)
+        if isinstance(snippets, str):
+            snippets = [snippets]
+        if snippets:
+            return self._execute_batch(snippets, **kwargs)
+        
+        code, cache_key, error = self._prepare_code(code, **kwargs)
+        if error:
+            return error
+        
+        # Execute code locally
+        try:
+            print("🐛 DEBUG: About to execute code locally...")
+            result = self._execute_locally(code, cache_key)
+            print(f"🐛 DEBUG: Code execution result: {result[:200]}...")
+            return result
+        except Exception as e:
+            return self._execution_error(e)
+
+    async def _aexecute_code(self, code: str = None, **kwargs) -> str:
+        """Async variant of _execute_code."""
+        snippets = kwargs.pop('snippets', None)
+        if isinstance(snippets, str):
+            snippets = [snippets]
+        if snippets:
+            return await self._aexecute_batch(snippets, **kwargs)
+        
+        code, cache_key, error = self._prepare_code(code, **kwargs)
+        if error:
+            return error
+        
+        try:
+            return await self._aexecute_locally(code, cache_key)
+        except Exception as e:
+            return self._execution_error(e)
+
+    def _prepare_code(self, code: str = None, **kwargs):
+        """Fix up and log a snippet and prepend its preloaded results; returns (code, cache_key, error)."""
+        logger = activity_logger_for(self.run_context)
         
         # Extract code from kwargs if not provided directly
         if not code:
             code = kwargs.get('code', '')
         if not code:
             print("🐛 DEBUG: No code provided to LocalCodeExecutor")
-            return "Error: No code provided to execute"
-        
-        print(f"🐛 DEBUG: Code to execute: {code[:100]}...")
+            return None, None, "Error: No code provided to execute"
         
         libraries_used = kwargs.get('libraries_used', [])
+        result_ids = kwargs.get('result_ids') or []
+        if isinstance(result_ids, str):
+            result_ids = [result_ids]
         
-        # Check for problematic library usage and provide helpful guidance
-        code = self._check_and_fix_common_issues(code)
-        
-        # Enhance code with reliable chart generation setup
-        if 'plt.savefig' in code and 'output/' in code:
-            # Inject reliable chart generation code
-            enhanced_code = self._enhance_chart_code(code)
-            code = enhanced_code
-            print("🐛 DEBUG: Enhanced code with chart generation setup")
+        # Reject unavailable libraries and add only the imports and directories the snippet lacks
+        prepared = get_code_preprocessor().preprocess(code)
+        if prepared.error:
+            return None, None, prepared.error
+        code = prepared.code
         
         # Avoid logging duplicate code executions
         if not hasattr(LocalCodeExecutorTool, '_last_logged_code'):
@@ -101,149 +180,435 @@ class LocalCodeExecutorTool(BaseTool):
         details = {"tool": "LocalCodeExecutor"}
         if libraries_used:
             details["libraries"] = libraries_used
+        elif prepared.analysis and prepared.analysis.imports:
+            details["libraries"] = prepared.analysis.imports
+        if result_ids:
+            details["result_ids"] = result_ids
             
-        print("🐛 DEBUG: About to log activity...")
         logger.log_activity(
             agent_name="Data Scientist",
             activity_type="python_code",
             content=code[:500] + "..." if len(code) > 500 else code,
             details=details
         )
-        print("🐛 DEBUG: Activity logged successfully")
         
         LocalCodeExecutorTool._last_logged_code = code
         
-        # Execute code locally
-        try:
-            print("🐛 DEBUG: About to execute code locally...")
-            result = self._execute_locally(code)
-            print(f"🐛 DEBUG: Code execution result: {result[:200]}...")
-            return result
-        except Exception as e:
-            error_msg = f"Error executing code: {str(e)}"
-            print(f"🐛 DEBUG: Error executing code: {e}")
-            logger.log_activity(
-                agent_name="Data Scientist",
-                activity_type="python_code",
-                content=f"ERROR: {error_msg}",
-                details={"error": str(e)}
-            )
-            return error_msg
+        # Preload SQL results handed off by SQLExecutor as DataFrames
+        if result_ids:
+            try:
+                code = insert_preamble(code, result_store_for(self.run_context).build_preload_code(result_ids))
+            except KeyError as e:
+                return None, None, f"Error: {e.args[0]}. Use a Result ID returned by SQLExecutor."
+        return code, self._execution_key(prepared, result_ids), None
+
+    def _execution_error(self, e: Exception) -> str:
+        error_msg = f"Error executing code: {str(e)}"
+        print(f"🐛 DEBUG: Error executing code: {e}")
+        activity_logger_for(self.run_context).log_activity(
+            agent_name="Data Scientist",
+            activity_type="python_code",
+            content=f"ERROR: {error_msg}",
+            details={"error": str(e)}
+        )
+        return error_msg
+
+    def _execute_batch(self, snippets: List[str], **kwargs) -> str:
+        """Run independent snippets concurrently and report each one in order."""
+        codes, keys, error = self._prepare_batch(snippets, **kwargs)
+        if error:
+            return error
         
-        # Execute code locally
-        try:
-            result = self._execute_locally(code)
-            return result
-        except Exception as e:
-            error_msg = f"Error executing code: {str(e)}"
-            logger.log_activity(
-                agent_name="Data Scientist",
-                activity_type="python_code",
-                content=f"ERROR: {error_msg}",
-                details={"error": str(e)}
-            )
-            return error_msg
+        # Only snippets the execution cache cannot answer are run
+        results = [self._cached_result(key) for key in keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+        pending_codes = [codes[i] for i in pending]
+        workspace = self._workspace()
+        ran = None
+        if self.use_worker_pool and pending_codes:
+            ran = get_python_worker_pool().run_batch(
+                pending_codes, cwd=workspace, timeout=30, capture=self._capture(), limits=self._limits())
+            if all(isinstance(result, WorkerStartupError) for result in ran):
+                self._log_fallback("Python worker pool unavailable, running the snippets one by one in fresh interpreters")
+                ran = None
+        if ran is None:
+            ran = []
+            for code in pending_codes:
+                try:
+                    ran.append(self._run_in_subprocess(code))
+                except subprocess.TimeoutExpired as e:
+                    ran.append(e)
+        for i, result in zip(pending, ran):
+            results[i] = result
+            self._cache_result(keys[i], result)
+        return self._format_batch(results, codes)
+
+    async def _aexecute_batch(self, snippets: List[str], **kwargs) -> str:
+        """Async variant of _execute_batch."""
+        codes, keys, error = self._prepare_batch(snippets, **kwargs)
+        if error:
+            return error
+        
+        results = [self._cached_result(key) for key in keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+        pending_codes = [codes[i] for i in pending]
+        workspace = self._workspace()
+        ran = None
+        if self.use_worker_pool and pending_codes:
+            ran = await get_python_worker_pool().arun_batch(
+                pending_codes, cwd=workspace, timeout=30, capture=self._capture(), limits=self._limits())
+            if all(isinstance(result, WorkerStartupError) for result in ran):
+                self._log_fallback("Python worker pool unavailable, running the snippets in fresh interpreters")
+                ran = None
+        if ran is None:
+            ran = await asyncio.gather(*(self._arun_in_subprocess(code) for code in pending_codes), return_exceptions=True)
+        for i, result in zip(pending, ran):
+            results[i] = result
+            self._cache_result(keys[i], result)
+        return self._format_batch(results, codes)
+
+    def _prepare_batch(self, snippets: List[str], **kwargs):
+        """Fix up and log a batch of snippets; returns (codes, cache_keys, error)."""
+        logger = activity_logger_for(self.run_context)
+        result_ids = kwargs.get('result_ids') or []
+        if isinstance(result_ids, str):
+            result_ids = [result_ids]
+        
+        preload = ""
+        if result_ids:
+            try:
+                preload = result_store_for(self.run_context).build_preload_code(result_ids)
+            except KeyError as e:
+                return None, None, f"Error: {e.args[0]}. Use a Result ID returned by SQLExecutor."
+        
+        prepared = []
+        keys = []
+        for i, snippet in enumerate(snippets, 1):
+            preprocessed = get_code_preprocessor().preprocess(snippet)
+            if preprocessed.error:
+                return None, None, f"{preprocessed.error} (snippet {i})"
+            prepared.append(preprocessed.code)
+            keys.append(self._execution_key(preprocessed, result_ids))
+        
+        details = {"tool": "LocalCodeExecutor", "snippets": len(prepared)}
+        if kwargs.get('libraries_used'):
+            details["libraries"] = kwargs['libraries_used']
+        if result_ids:
+            details["result_ids"] = result_ids
+        batch_content = "\n\n".join(f"# --- Snippet {i} ---\n{snippet}" for i, snippet in enumerate(prepared, 1))
+        logger.log_activity(
+            agent_name="Data Scientist",
+            activity_type="python_code",
+            content=batch_content[:500] + "..." if len(batch_content) > 500 else batch_content,
+            details=details
+        )
+        
+        os.makedirs(os.path.join(self._workspace(), "output"), exist_ok=True)
+        return [insert_preamble(snippet, preload) if preload else snippet for snippet in prepared], keys, None
 
-    def _execute_locally(self, code: str) -> str:
+    def _format_batch(self, results, codes: List[str]) -> str:
+        sections = []
+        for i, (result, code) in enumerate(zip(results, codes), 1):
+            header = f"=== Snippet {i}/{len(results)} ==="
+            if isinstance(result, Exception):
+                sections.append(f"{header}\nError executing code: {result}")
+            elif result.returncode == 0:
+                self._log_usage(result)
+                output = result.stdout
+                if result.stderr:
+                    output += f"\nWarnings: {result.stderr}"
+                artifacts = getattr(result, "artifacts", None)
+                if artifacts:
+                    self._record_artifacts(artifacts, code, result.figures)
+                    output += f"\nCharts created: {', '.join(artifacts)}"
+                if getattr(result, "from_cache", False):
+                    output += "\n(Replayed from the execution cache)"
+                sections.append(f"{header}\n{output or 'Code executed successfully (no output)'}")
+            else:
+                self._log_usage(result)
+                limit = getattr(result, "limit_exceeded", None)
+                if limit:
+                    header += f"\n{limit_message(limit, self._limits())}"
+                sections.append(f"{header}\nCode execution failed:\nReturn code: {result.returncode}\nStdout: {result.stdout}\nStderr: {result.stderr}")
+        return "\n\n".join(sections)
+
+    def _execute_locally(self, code: str, cache_key: Optional[str] = None) -> str:
         """Execute Python code in the local environment."""
         # Ensure output directory exists
-        os.makedirs("output", exist_ok=True)
+        workspace = self._workspace()
+        os.makedirs(os.path.join(workspace, "output"), exist_ok=True)
         
+        result = self._cached_result(cache_key)
+        if result is not None:
+            return self._format_output(result, code)
+        if self.use_worker_pool:
+            try:
+                # Warm worker with pandas/numpy/matplotlib already imported
+                result = get_python_worker_pool().run(
+                    code, cwd=workspace, timeout=30, capture=self._capture(), limits=self._limits())  # 30 second timeout
+            except WorkerStartupError as e:
+                self._log_fallback(f"Python worker pool unavailable, running the code in a fresh interpreter: {e}")
+        if result is None:
+            result = self._run_in_subprocess(code)
+        self._cache_result(cache_key, result)
+        return self._format_output(result, code)
+
+    async def _aexecute_locally(self, code: str, cache_key: Optional[str] = None) -> str:
+        """Async variant of _execute_locally."""
+        workspace = self._workspace()
+        os.makedirs(os.path.join(workspace, "output"), exist_ok=True)
+        
+        result = self._cached_result(cache_key)
+        if result is not None:
+            return self._format_output(result, code)
+        if self.use_worker_pool:
+            try:
+                result = await get_python_worker_pool().arun(
+                    code, cwd=workspace, timeout=30, capture=self._capture(), limits=self._limits())
+            except WorkerStartupError as e:
+                self._log_fallback(f"Python worker pool unavailable, running the code in a fresh interpreter: {e}")
+        if result is None:
+            result = await self._arun_in_subprocess(code)
+        self._cache_result(cache_key, result)
+        return self._format_output(result, code)
+
+    def _format_output(self, result, code: str) -> str:
+        self._log_usage(result)
+        if result.returncode == 0:
+            output = result.stdout
+            if result.stderr:
+                output += f"\nWarnings: {result.stderr}"
+            
+            # Report the files this execution saved, not everything in output/
+            chart_files = result.artifacts
+            self._record_artifacts(chart_files, code, result.figures)
+            
+            if chart_files:
+                output += f"\n\nCharts created: {', '.join(chart_files)}"
+            else:
+                output += "\n\nNo chart files were created in output directory"
+            if getattr(result, "from_cache", False):
+                output += "\n(Replayed from the execution cache: same code and input data as an earlier run)"
+                
+            return output or "Code executed successfully (no output)"
+        else:
+            error_output = f"Code execution failed:\nReturn code: {result.returncode}\nStdout: {result.stdout}\nStderr: {result.stderr}"
+            limit = getattr(result, "limit_exceeded", None)
+            if limit:
+                error_output = f"{limit_message(limit, self._limits())}\n{error_output}"
+            return error_output
+
+    def _run_in_subprocess(self, code: str) -> subprocess.CompletedProcess:
+        """Execute code in a fresh interpreter (used when the worker pool is unavailable)."""
         # Create a temporary file for the code
         with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as temp_file:
             temp_file.write(code)
             temp_file_path = temp_file.name
         
+        manifest_path = temp_file_path + ".artifacts.json"
+        args = self._subprocess_args(temp_file_path, manifest_path)
         try:
             # Execute the code using the current Python interpreter
-            result = subprocess.run(
-                [sys.executable, temp_file_path],
-                capture_output=True,
+            process = subprocess.Popen(
+                args,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 text=True,
                 encoding='utf-8',
                 errors='replace',
-                cwd=os.getcwd(),
-                timeout=30,  # 30 second timeout
+                cwd=self._workspace(),
                 env={**os.environ, 'PYTHONIOENCODING': 'utf-8'}  # Force UTF-8 encoding
             )
-            
-            if result.returncode == 0:
-                output = result.stdout
-                if result.stderr:
-                    output += f"\\nWarnings: {result.stderr}"
-                
-                # Check if any chart files were created
-                chart_files = []
-                if os.path.exists("output"):
-                    for file in os.listdir("output"):
-                        if file.endswith('.png'):
-                            chart_files.append(file)
-                
-                if chart_files:
-                    output += f"\\n\\nCharts created: {', '.join(chart_files)}"
-                else:
-                    output += "\\n\\nNo chart files were created in output directory"
-                    
-                return output or "Code executed successfully (no output)"
-            else:
-                error_output = f"Code execution failed:\\nReturn code: {result.returncode}\\nStdout: {result.stdout}\\nStderr: {result.stderr}"
-                return error_output
-                
+            cgroup = cgroup_for_process(process.pid)
+            try:
+                stdout, stderr = process.communicate(timeout=30)  # 30 second timeout
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                raise
+            finally:
+                if cgroup is not None:
+                    cgroup.remove()
+            result = subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
+            self._read_manifest(result, manifest_path)
+            return result
         finally:
-            # Clean up temporary file
+            # Clean up temporary files
+            for path in (temp_file_path, manifest_path):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    async def _arun_in_subprocess(self, code: str) -> subprocess.CompletedProcess:
+        """Async variant of _run_in_subprocess using asyncio.create_subprocess_exec."""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as temp_file:
+            temp_file.write(code)
+            temp_file_path = temp_file.name
+        
+        manifest_path = temp_file_path + ".artifacts.json"
+        args = self._subprocess_args(temp_file_path, manifest_path)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=self._workspace(),
+                env={**os.environ, 'PYTHONIOENCODING': 'utf-8'}
+            )
+            cgroup = cgroup_for_process(process.pid)
             try:
-                os.unlink(temp_file_path)
-            except:
-                pass
-
-    def _check_and_fix_common_issues(self, code: str) -> str:
-        """Check for common issues and provide fixes or alternatives."""
-        
-        # Check for df.to_markdown() usage which requires tabulate
-        if 'to_markdown(' in code:
-            replacement_code = code.replace('df.to_markdown()', 'df.to_string()')
-            return replacement_code
-        
-        # Check for other problematic imports
-        problematic_imports = [
-            ('import seaborn', 'seaborn is not available. Use matplotlib instead.'),
-            ('import plotly', 'plotly is not available. Use matplotlib instead.'),
-            ('import bokeh', 'bokeh is not available. Use matplotlib instead.'),
-            ('import altair', 'altair is not available. Use matplotlib instead.'),
-            ('from tabulate', 'tabulate is not available. Use manual table formatting.'),
-        ]
-        
-        for problematic, suggestion in problematic_imports:
-            if problematic in code:
-                return f"# Error: {suggestion}\\n# Please rewrite your code without {problematic.split()[1]}\\n{code}"
-        
-        return code
-
-    def _enhance_chart_code(self, original_code: str) -> str:
-        """Enhance code to ensure reliable chart generation."""
-        enhancement_prefix = '''
-# === CHART GENERATION RELIABILITY ENHANCEMENTS ===
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
-import pandas as pd
-import io
-import os
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=30)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise subprocess.TimeoutExpired(args, 30)
+            finally:
+                if cgroup is not None:
+                    cgroup.remove()
+            result = subprocess.CompletedProcess(
+                args,
+                process.returncode,
+                stdout.decode('utf-8', errors='replace'),
+                stderr.decode('utf-8', errors='replace'),
+            )
+            self._read_manifest(result, manifest_path)
+            return result
+        finally:
+            for path in (temp_file_path, manifest_path):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
 
-# Ensure output directory exists
-os.makedirs('output', exist_ok=True)
+    def _capture(self) -> Optional[Dict[str, Any]]:
+        """Figure capture settings for the worker, or None to let snippets write files."""
+        # Captured figures live in the run's artifact registry; without a run, write files
+        if self.chart_capture != "memory" or self.run_context is None:
+            return None
+        return {"format": self.chart_format, "dpi": self.chart_dpi or None}
 
-# Clear any existing matplotlib state
-plt.clf()
-plt.close('all')
+    def _subprocess_args(self, script_path: str, manifest_path: str) -> List[str]:
+        # python_worker.py --script installs the same savefig hook as the warm workers
+        return [sys.executable, WORKER_SCRIPT, "--script", script_path, manifest_path,
+                json.dumps(self._capture()), json.dumps(self._limits())]
 
-'''
-        
-        enhancement_suffix = '''
+    def _limits(self) -> Dict[str, Any]:
+        return ExecutionLimits(self.memory_limit_mb, self.cpu_limit_seconds, self.max_output_chars).to_job()
 
-# === CHART SAVING WITH VERIFICATION ===
-print("Chart generation code completed")
+    def _read_manifest(self, result: subprocess.CompletedProcess, manifest_path: str):
+        """Attach what a fresh-interpreter run saved, captured and used to its result."""
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}  # killed before it could write one
+        result.artifacts = manifest.get("artifacts", [])
+        result.figures = decode_figures(manifest.get("figures", []))
+        result.peak_rss_kb = manifest.get("job_peak_rss_kb")
+        result.cpu_seconds = manifest.get("cpu_seconds")
+        result.limit_exceeded = manifest.get("limit_exceeded")
 
-'''
-        
-        return enhancement_prefix + original_code + enhancement_suffix
+    def _execution_key(self, prepared: PreprocessedCode, result_ids: List[str]) -> Optional[str]:
+        """Execution cache key of a preprocessed snippet, or None if its output cannot be replayed."""
+        if not self.use_execution_cache or prepared.fingerprint is None or not prepared.analysis.cacheable:
+            return None
+        try:
+            store = result_store_for(self.run_context)
+            input_hashes = [store.content_hash(result_id) for result_id in result_ids]
+        except (KeyError, OSError):
+            return None
+        # Results are keyed by content, so a re-run query with a new Result ID still matches
+        return execution_key(prepared.fingerprint, input_hashes, {
+            "result_ids": len(result_ids), "capture": self._capture(), "limits": self._limits(),
+        })
+
+    def _cached_result(self, cache_key: Optional[str]) -> Optional[SnippetResult]:
+        """Replay a cached execution: restore the files it saved and return its output."""
+        if cache_key is None:
+            return None
+        cached = get_execution_cache().get(cache_key)
+        if cached is None:
+            return None
+        workspace = self._workspace()
+        try:
+            for path, data in cached.files.items():
+                target = os.path.join(workspace, path)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, "wb") as f:
+                    f.write(data)
+        except OSError as e:
+            self._log_fallback(f"Could not restore cached artifacts, running the code instead: {e}")
+            return None
+        activity_logger_for(self.run_context).log_tool_usage(
+            "Data Scientist", "LocalCodeExecutor", "Replayed an identical earlier execution from the execution cache")
+        return SnippetResult(0, cached.stdout, cached.stderr, artifacts=list(cached.artifacts),
+                             figures=cached.figures, from_cache=True)
+
+    def _cache_result(self, cache_key: Optional[str], result):
+        """Store a successful execution with the contents of the files it saved."""
+        if cache_key is None or isinstance(result, Exception) or result.returncode != 0:
+            return
+        if getattr(result, "from_cache", False) or getattr(result, "limit_exceeded", None):
+            return
+        workspace = self._workspace()
+        captured = {figure["path"] for figure in result.figures}
+        files = {}
+        for path in result.artifacts:
+            if path in captured:
+                continue
+            absolute = os.path.abspath(os.path.join(workspace, path))
+            if os.path.relpath(absolute, workspace).startswith(os.pardir):
+                return  # wrote outside its workspace; a replay could not restore it
+            try:
+                with open(absolute, "rb") as f:
+                    files[path] = f.read()
+            except OSError:
+                return
+        get_execution_cache().put(cache_key, CachedExecution(
+            stdout=result.stdout, stderr=result.stderr, artifacts=list(result.artifacts),
+            files=files, figures=list(result.figures),
+        ))
+
+    def _log_fallback(self, action: str):
+        """Report that an execution took a slower path than the worker pool or the cache."""
+        activity_logger_for(self.run_context).log_tool_usage("Data Scientist", "LocalCodeExecutor", action)
+
+    def _log_usage(self, result):
+        """Report the peak RSS and CPU time of one execution to the activity log."""
+        peak_rss_kb = getattr(result, "peak_rss_kb", None)
+        cpu_seconds = getattr(result, "cpu_seconds", None)
+        limit = getattr(result, "limit_exceeded", None)
+        if peak_rss_kb is None and cpu_seconds is None:
+            return
+        usage = []
+        if peak_rss_kb is not None:
+            usage.append(f"peak RSS {peak_rss_kb / 1024:.0f} MB")
+        if cpu_seconds is not None:
+            usage.append(f"CPU {cpu_seconds:.2f} s")
+        action = f"Execution used {', '.join(usage)}"
+        if limit:
+            action += f" and was stopped by the {limit} limit"
+        activity_logger_for(self.run_context).log_activity(
+            agent_name="Data Scientist",
+            activity_type="tool_usage",
+            content=action,
+            details={
+                "tool_name": "LocalCodeExecutor",
+                "action": action,
+                "peak_rss_kb": peak_rss_kb,
+                "cpu_seconds": cpu_seconds,
+                "limit_exceeded": limit,
+                "limits": self._limits(),
+            }
+        )
+
+    def _workspace(self) -> str:
+        """Working directory for snippets: the run's workspace, else the current directory."""
+        return self.run_context.workspace if self.run_context is not None else os.getcwd()
+
+    def _record_artifacts(self, artifacts: List[str], code: str, figures: Optional[List[Dict[str, Any]]] = None):
+        """Add the files one execution saved, or the figures it captured, to the run's artifact registry."""
+        if self.run_context is None or not artifacts:
+            return
+        self.run_context.artifacts.record(artifacts, snippet=code, base_dir=self.run_context.workspace, figures=figures)
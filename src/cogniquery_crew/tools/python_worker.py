@@ -0,0 +1,481 @@
+# src/cogniquery_crew/tools/python_worker.py
+"""Warm Python worker process used by PythonWorkerPool.
+
+Run as a script, not imported: it preloads the analysis libraries once, then
+executes one JSON job per line from stdin and answers with one JSON line on a
+private copy of the original stdout. With --script it runs a single snippet
+file instead and writes the files it saved to a JSON manifest. Jobs may ask
+for figures to be captured in memory and returned base64-encoded, and may
+carry memory, CPU and output caps; each response reports the job's peak RSS
+and CPU time.
+"""
+
+import os
+import io
+import sys
+import base64
+import gc
+import json
+import math
+import runpy
+import signal
+import time
+import builtins
+import types
+import traceback
+import warnings
+from contextlib import redirect_stdout, redirect_stderr
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:  # Windows
+    RESOURCE_AVAILABLE = False
+
+# Snippets used to run from a temp file, so the tools package must not shadow their imports
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:] = [path for path in sys.path if os.path.abspath(path or ".") != _SCRIPT_DIR]
+
+_saved_rc_params = None
+
+# Options, warning filters and public attributes of the preloaded libraries, restored after each job
+_saved_library_state = None
+_PRELOADED_MODULES = ("numpy", "pandas", "matplotlib", "matplotlib.pyplot")
+
+# Files written by Figure.savefig during the current job
+_saved_artifacts = []
+
+# In-memory capture settings of the current job ({"format", "dpi"}), or None to write files
+_capture = None
+# Figures captured instead of written, by absolute path: (format, bytes)
+_captured_figures = {}
+
+# Soft limits to restore after each job, and the cap a job ran into ("memory" or "cpu")
+_default_limits = {}
+_limit_exceeded = None
+# Highest per-job peak RSS seen by this worker, in KiB
+_worker_peak_rss_kb = None
+
+
+class CPULimitExceeded(BaseException):
+    """Raised in the snippet when it exhausts its CPU allowance (not caught by `except Exception`)."""
+
+
+def preload_libraries():
+    """Import the libraries every snippet uses so jobs do not pay for them."""
+    global _saved_rc_params
+    try:
+        import numpy  # noqa: F401
+        import pandas  # noqa: F401
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot  # noqa: F401
+        from matplotlib.figure import Figure
+        _saved_rc_params = matplotlib.rcParams.copy()
+        Figure.savefig = _recording_savefig(Figure.savefig)
+    except ImportError as e:
+        print(f"Python worker could not preload libraries: {e}", file=sys.stderr)
+    save_library_state()
+
+
+def _public_attributes(namespace):
+    return {name: value for name, value in namespace.items() if not name.startswith("_")}
+
+
+def save_library_state():
+    """Remember what a snippet could change in the preloaded libraries and leave behind for the next job."""
+    global _saved_library_state
+    state = {"warnings": list(warnings.filters), "attributes": []}
+    for name in _PRELOADED_MODULES:
+        module = sys.modules.get(name)
+        if module is not None:
+            state["attributes"].append((module, _public_attributes(vars(module))))
+    if "pandas" in sys.modules:
+        pandas = sys.modules["pandas"]
+        for cls in (pandas.DataFrame, pandas.Series):
+            state["attributes"].append((cls, _public_attributes(vars(cls))))
+    if "numpy" in sys.modules:
+        numpy = sys.modules["numpy"]
+        state["numpy_err"] = numpy.geterr()
+        state["numpy_printoptions"] = numpy.get_printoptions()
+    _saved_library_state = state
+
+
+def restore_library_state():
+    """Undo option changes and monkeypatches to the preloaded libraries."""
+    state = _saved_library_state
+    if state is None:
+        return
+    warnings.filters[:] = state["warnings"]
+    for owner, saved in state["attributes"]:
+        for name, value in _public_attributes(vars(owner)).items():
+            # Submodules imported by the snippet stay, so later imports of them still resolve
+            if name not in saved and not isinstance(value, types.ModuleType):
+                delattr(owner, name)
+        for name, value in saved.items():
+            if getattr(owner, name, None) is not value:
+                setattr(owner, name, value)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if "pandas" in sys.modules:
+            sys.modules["pandas"].reset_option("all")
+        if "numpy_err" in state:
+            sys.modules["numpy"].seterr(**state["numpy_err"])
+            sys.modules["numpy"].set_printoptions(**state["numpy_printoptions"])
+
+
+def _recording_savefig(savefig):
+    """Wrap Figure.savefig (which plt.savefig calls) to remember the files it writes.
+
+    While a job captures figures in memory, saves to a path are rendered
+    into a buffer instead and nothing is written to disk.
+    """
+    def wrapper(self, fname, *args, **kwargs):
+        if not isinstance(fname, (str, os.PathLike)):
+            return savefig(self, fname, *args, **kwargs)
+        path = os.path.abspath(os.fspath(fname))
+        if _capture is None:
+            result = savefig(self, fname, *args, **kwargs)
+        else:
+            buffer = io.BytesIO()
+            kwargs["format"] = _capture.get("format") or "png"
+            if _capture.get("dpi"):
+                kwargs["dpi"] = _capture["dpi"]
+            if kwargs["format"] == "png":
+                # Smaller buffers to pipe and embed; PIL's optimizer is lossless
+                kwargs.setdefault("pil_kwargs", {"optimize": True})
+            result = savefig(self, buffer, *args, **kwargs)
+            _captured_figures[path] = (kwargs["format"], buffer.getvalue())
+        _saved_artifacts.append(path)
+        return result
+    return wrapper
+
+
+def start_job(capture=None):
+    """Forget the previous job's artifacts and set how this one saves figures."""
+    global _capture
+    _capture = capture
+    del _saved_artifacts[:]
+    _captured_figures.clear()
+
+
+def saved_artifacts(cwd):
+    """Files saved by the current job, relative to its working directory."""
+    artifacts = []
+    for path in _saved_artifacts:
+        relative = os.path.relpath(path, cwd)
+        if relative not in artifacts:
+            artifacts.append(relative)
+    return artifacts
+
+
+def captured_figures(cwd):
+    """Figures captured in memory by the current job, base64-encoded for the JSON protocol."""
+    return [
+        {"path": os.path.relpath(path, cwd), "format": image_format, "data": base64.b64encode(data).decode("ascii")}
+        for path, (image_format, data) in _captured_figures.items()
+    ]
+
+
+def peak_rss_kb():
+    """Peak resident set size of this worker in KiB, or None if unknown."""
+    if not RESOURCE_AVAILABLE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KiB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def reset_peak_rss():
+    """Restart peak RSS tracking so the next reading covers one job (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def job_peak_rss_kb(tracking_reset):
+    """Peak RSS since reset_peak_rss(), or the process-wide peak where it cannot be reset."""
+    if tracking_reset:
+        try:
+            with open("/proc/self/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1])
+        except (OSError, ValueError):
+            pass
+    return peak_rss_kb()
+
+
+def cpu_seconds():
+    """User plus system CPU time used by this process so far."""
+    if not RESOURCE_AVAILABLE:
+        return time.process_time()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _address_space_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _on_cpu_limit(signum, frame):
+    global _limit_exceeded
+    _limit_exceeded = "cpu"
+    raise CPULimitExceeded("CPU time limit exceeded")
+
+
+def _drop_handler_frames(tb):
+    """Cut the SIGXCPU handler's frame off the end of a traceback."""
+    head = tb
+    while tb is not None and tb.tb_next is not None:
+        if tb.tb_next.tb_frame.f_code is _on_cpu_limit.__code__:
+            tb.tb_next = None
+            break
+        tb = tb.tb_next
+    return head
+
+
+def apply_limits(limits, final=False):
+    """Cap the address space and CPU time the next job may add on top of what the process uses now.
+
+    Warm workers only lower soft limits, so restore_limits() can lift them
+    again; with `final` (one-shot --script runs) the hard limits are lowered
+    too, and the kernel kills the interpreter shortly after the CPU cap.
+    """
+    global _limit_exceeded
+    _limit_exceeded = None
+    if not RESOURCE_AVAILABLE or not limits:
+        return
+    memory_mb, cpu_limit = limits.get("memory_mb") or 0, limits.get("cpu_seconds") or 0
+    caps = []
+    if memory_mb > 0:
+        caps.append((resource.RLIMIT_AS, _address_space_bytes() + memory_mb * 1024 * 1024, 0))
+    if cpu_limit > 0:
+        if hasattr(signal, "SIGXCPU"):
+            signal.signal(signal.SIGXCPU, _on_cpu_limit)
+        caps.append((resource.RLIMIT_CPU, math.ceil(cpu_seconds()) + cpu_limit, 2))
+    for kind, soft, grace in caps:
+        try:
+            current_soft, hard = resource.getrlimit(kind)
+            _default_limits.setdefault(kind, current_soft)
+            if hard != resource.RLIM_INFINITY:
+                soft = min(soft, hard)
+            resource.setrlimit(kind, (soft, soft + grace if final else hard))
+        except (ValueError, OSError) as e:
+            print(f"Python worker could not set resource limit: {e}", file=sys.stderr)
+
+
+def restore_limits():
+    """Lift the soft limits a job ran under."""
+    for kind, soft in _default_limits.items():
+        try:
+            resource.setrlimit(kind, (soft, resource.getrlimit(kind)[1]))
+        except (ValueError, OSError):
+            pass
+    # A SIGXCPU still pending must not interrupt the worker between jobs
+    if hasattr(signal, "SIGXCPU") and _default_limits:
+        signal.signal(signal.SIGXCPU, signal.SIG_IGN)
+
+
+def limit_exceeded(error, limits):
+    """Name the cap that stopped a job, if any."""
+    if _limit_exceeded:
+        return _limit_exceeded
+    if isinstance(error, MemoryError) and limits and limits.get("memory_mb"):
+        return "memory"
+    return None
+
+
+class BoundedOutput(io.TextIOBase):
+    """Text stream that passes through at most `limit` characters, then notes how much it dropped."""
+
+    def __init__(self, target, limit):
+        self.target = target
+        self.limit = limit
+        self.written = 0
+        self.dropped = 0
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if self.limit and self.written + len(text) > self.limit:
+            kept = max(self.limit - self.written, 0)
+            self.target.write(text[:kept])
+            self.written += kept
+            self.dropped += len(text) - kept
+        else:
+            self.target.write(text)
+            self.written += len(text)
+        return len(text)
+
+    def flush(self):
+        self.target.flush()
+
+    def finish(self):
+        if self.dropped:
+            self.target.write(f"\n[output truncated: {self.dropped:,} more characters]\n")
+        self.flush()
+
+
+def reset_state(saved_cwd, saved_environ, saved_argv):
+    """Undo process-wide changes a snippet may have made."""
+    os.chdir(saved_cwd)
+    os.environ.clear()
+    os.environ.update(saved_environ)
+    sys.argv = saved_argv
+
+    if "matplotlib.pyplot" in sys.modules:
+        import matplotlib
+        sys.modules["matplotlib.pyplot"].close("all")
+        if _saved_rc_params is not None:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                matplotlib.rcParams.update(_saved_rc_params)
+    try:
+        restore_library_state()
+    except Exception as e:
+        print(f"Python worker could not reset library state: {e}", file=sys.stderr)
+    gc.collect()
+
+
+def run_job(job):
+    """Execute one snippet in a fresh namespace, capturing its output like a subprocess would."""
+    global _worker_peak_rss_kb
+    limits = job.get("limits") or {}
+    stdout_buffer, stderr_buffer = io.StringIO(), io.StringIO()
+    stdout = BoundedOutput(stdout_buffer, limits.get("output_chars"))
+    stderr = BoundedOutput(stderr_buffer, limits.get("output_chars"))
+    saved_cwd, saved_environ, saved_argv = os.getcwd(), dict(os.environ), list(sys.argv)
+    returncode = 0
+    exceeded = None
+    started = time.perf_counter()
+    tracking_reset = reset_peak_rss()
+    cpu_started = cpu_seconds()
+    start_job(job.get("capture"))
+    try:
+        os.chdir(job.get("cwd") or saved_cwd)
+        sys.argv = ["<snippet>"]
+        namespace = {"__name__": "__main__", "__builtins__": builtins}
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                apply_limits(limits)
+                try:
+                    exec(compile(job["code"], "<snippet>", "exec"), namespace)
+                finally:
+                    restore_limits()
+            except SystemExit as e:
+                if e.code is None or isinstance(e.code, int):
+                    returncode = e.code or 0
+                else:
+                    print(e.code, file=sys.stderr)
+                    returncode = 1
+            except BaseException as e:
+                exceeded = limit_exceeded(e, limits)
+                # Skip this frame so the traceback starts in the snippet, as it would in a script
+                traceback.print_exception(type(e), e, _drop_handler_frames(e.__traceback__.tb_next))
+                returncode = 1
+            finally:
+                namespace.clear()
+    finally:
+        restore_limits()
+        reset_state(saved_cwd, saved_environ, saved_argv)
+    stdout.finish()
+    stderr.finish()
+
+    job_peak = job_peak_rss_kb(tracking_reset)
+    if job_peak is not None:
+        _worker_peak_rss_kb = max(_worker_peak_rss_kb or 0, job_peak)
+    return {
+        "returncode": returncode,
+        "stdout": stdout_buffer.getvalue(),
+        "stderr": stderr_buffer.getvalue(),
+        "artifacts": saved_artifacts(job.get("cwd") or saved_cwd),
+        "figures": captured_figures(job.get("cwd") or saved_cwd),
+        "duration": time.perf_counter() - started,
+        "job_peak_rss_kb": job_peak,
+        "cpu_seconds": cpu_seconds() - cpu_started,
+        "limit_exceeded": exceeded,
+        "peak_rss_kb": _worker_peak_rss_kb,
+    }
+
+
+def run_script(path, manifest_path, capture=None, limits=None):
+    """Run one snippet file as __main__ with the savefig hook, then write what it saved.
+
+    Used by LocalCodeExecutor when it falls back to a fresh interpreter, so
+    artifacts, captured figures and resource usage are reported the same way
+    as from a warm worker.
+    """
+    preload_libraries()
+    limits = limits or {}
+    start_job(capture)
+    cwd = os.getcwd()
+    sys.argv = [path]
+    stdout = sys.stdout = BoundedOutput(sys.stdout, limits.get("output_chars"))
+    stderr = sys.stderr = BoundedOutput(sys.stderr, limits.get("output_chars"))
+    exceeded = None
+    tracking_reset = reset_peak_rss()
+    cpu_started = cpu_seconds()
+    try:
+        apply_limits(limits, final=True)
+        runpy.run_path(path, run_name="__main__")
+    except SystemExit:
+        raise
+    except BaseException as e:
+        exceeded = limit_exceeded(e, limits)
+        # Start the traceback in the snippet, as it would when run as a script
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != path:
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, _drop_handler_frames(tb or e.__traceback__))
+        sys.exit(1)
+    finally:
+        stdout.finish()
+        stderr.finish()
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "artifacts": saved_artifacts(cwd),
+                "figures": captured_figures(cwd),
+                "job_peak_rss_kb": job_peak_rss_kb(tracking_reset),
+                "cpu_seconds": cpu_seconds() - cpu_started,
+                "limit_exceeded": exceeded,
+            }, f)
+
+
+def main():
+    if len(sys.argv) in (4, 5, 6) and sys.argv[1] == "--script":
+        capture = json.loads(sys.argv[4]) if len(sys.argv) >= 5 else None
+        limits = json.loads(sys.argv[5]) if len(sys.argv) == 6 else None
+        run_script(sys.argv[2], sys.argv[3], capture, limits)
+        return
+
+    # Keep a private channel for responses; anything else written to fd 1
+    # (e.g. by C extensions or child processes) goes to stderr instead.
+    protocol = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+
+    preload_libraries()
+    protocol.write(json.dumps({"ready": True, "pid": os.getpid()}) + "\n")
+    protocol.flush()
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            response = run_job(json.loads(line))
+        except Exception as e:
+            response = {"returncode": 1, "stdout": "", "stderr": f"Worker error: {e}", "peak_rss_kb": _worker_peak_rss_kb}
+        protocol.write(json.dumps(response) + "\n")
+        protocol.flush()
+
+
+if __name__ == "__main__":
+    main()
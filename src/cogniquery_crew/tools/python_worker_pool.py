@@ -0,0 +1,419 @@
+# src/cogniquery_crew/tools/python_worker_pool.py
+
+import os
+import sys
+import json
+import base64
+import queue
+import atexit
+import asyncio
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Union
+from .sandbox_limits import cgroup_for_process
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python_worker.py")
+
+PYTHON_WORKER_POOL_ENABLED = os.getenv("COGNIQUERY_PY_WORKER_POOL", "1").lower() not in ("0", "false", "no")
+PYTHON_WORKER_POOL_SIZE = int(os.getenv("COGNIQUERY_PY_WORKERS", str(max(2, min(4, os.cpu_count() or 1)))))
+PYTHON_WORKER_MAX_RUNS = int(os.getenv("COGNIQUERY_PY_WORKER_MAX_RUNS", "50"))
+PYTHON_WORKER_MAX_RSS_MB = int(os.getenv("COGNIQUERY_PY_WORKER_MAX_RSS_MB", "1024"))
+PYTHON_WORKER_STARTUP_TIMEOUT = float(os.getenv("COGNIQUERY_PY_WORKER_STARTUP_TIMEOUT", "60"))
+
+
+class WorkerStartupError(RuntimeError):
+    """Raised when no worker process could be started."""
+
+
+@dataclass
+class SnippetResult:
+    """Outcome of one snippet, shaped like subprocess.CompletedProcess plus the files it saved."""
+    returncode: int
+    stdout: str
+    stderr: str
+    artifacts: List[str] = field(default_factory=list)
+    figures: List[Dict[str, Any]] = field(default_factory=list)  # captured in memory: path, format, data
+    duration: float = 0.0
+    peak_rss_kb: Optional[int] = None  # of this snippet
+    cpu_seconds: Optional[float] = None
+    limit_exceeded: Optional[str] = None  # "memory" or "cpu" when a cap stopped the snippet
+    from_cache: bool = False  # replayed from the execution cache instead of run
+
+
+def decode_figures(figures: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Decode the base64 figure buffers a worker sent back."""
+    return [{**figure, "data": base64.b64decode(figure["data"])} for figure in figures]
+
+
+def _resolve(future: "asyncio.Future", value: Any):
+    if not future.done():
+        future.set_result(value)
+
+
+class _WorkerProcess:
+    """One warm interpreter speaking the python_worker.py line protocol."""
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            cwd=os.getcwd(),
+            env={**os.environ, "PYTHONIOENCODING": "utf-8"},
+        )
+        self.cgroup = cgroup_for_process(self.process.pid)
+        self.runs = 0
+        self.peak_rss_kb: Optional[int] = None
+        self._responses: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._waiter = None  # (loop, future) of an async run awaiting the next response
+        self._waiter_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_responses, daemon=True)
+        self._reader.start()
+
+    def _read_responses(self):
+        for line in self.process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            self._deliver(message)
+        self._deliver(None)  # worker exited
+
+    def _deliver(self, message: Optional[Dict[str, Any]]):
+        with self._waiter_lock:
+            waiter, self._waiter = self._waiter, None
+        if waiter is None:
+            self._responses.put(message)
+            return
+        loop, future = waiter
+        try:
+            loop.call_soon_threadsafe(_resolve, future, message)
+        except RuntimeError:
+            pass  # the waiting event loop has closed
+
+    def wait_ready(self, timeout: float) -> bool:
+        try:
+            message = self._responses.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        return bool(message and message.get("ready"))
+
+    def run(self, code: str, cwd: str, timeout: float, capture: Optional[Dict[str, Any]] = None,
+            limits: Optional[Dict[str, Any]] = None) -> SnippetResult:
+        self._send(code, cwd, capture, limits)
+        try:
+            response = self._responses.get(timeout=timeout)
+        except queue.Empty:
+            raise subprocess.TimeoutExpired([sys.executable, "<snippet>"], timeout)
+        return self._result(response)
+
+    async def arun(self, code: str, cwd: str, timeout: float, capture: Optional[Dict[str, Any]] = None,
+                   limits: Optional[Dict[str, Any]] = None) -> SnippetResult:
+        """Like run, but awaits the response on the running event loop."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._waiter_lock:
+            self._waiter = (loop, future)
+        self._send(code, cwd, capture, limits)
+        try:
+            response = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise subprocess.TimeoutExpired([sys.executable, "<snippet>"], timeout)
+        return self._result(response)
+
+    def _send(self, code: str, cwd: str, capture: Optional[Dict[str, Any]], limits: Optional[Dict[str, Any]]):
+        job = {"code": code, "cwd": cwd}
+        if capture:
+            job["capture"] = capture
+        if limits:
+            job["limits"] = limits
+        self.process.stdin.write(json.dumps(job) + "\n")
+        self.process.stdin.flush()
+
+    def _result(self, response: Optional[Dict[str, Any]]) -> SnippetResult:
+        self.runs += 1
+        if response is None:
+            returncode = self.process.wait()
+            return SnippetResult(returncode or 1, "", "Python worker exited unexpectedly")
+        self.peak_rss_kb = response.get("peak_rss_kb")
+        return SnippetResult(
+            returncode=response["returncode"],
+            stdout=response["stdout"],
+            stderr=response["stderr"],
+            artifacts=response.get("artifacts", []),
+            figures=decode_figures(response.get("figures", [])),
+            duration=response.get("duration", 0.0),
+            peak_rss_kb=response.get("job_peak_rss_kb"),
+            cpu_seconds=response.get("cpu_seconds"),
+            limit_exceeded=response.get("limit_exceeded"),
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.wait(timeout=5)
+        except Exception:
+            pass
+        if self.cgroup is not None:
+            self.cgroup.remove()
+
+
+class PythonWorkerPool:
+    """Pool of pre-started interpreters with pandas, numpy and matplotlib already imported.
+
+    Each snippet runs in a fresh namespace in an idle worker; afterwards the
+    worker restores its working directory, environment, warning filters,
+    pandas/numpy/matplotlib options and monkeypatched library attributes.
+    Other module-level state persists between snippets. Workers are
+    replaced after `max_runs` snippets, once their peak RSS passes
+    `max_rss_mb`, or when a snippet times out, hits a resource limit or
+    kills its interpreter.
+    Replacements start in the background so the next snippet finds a warm worker.
+    """
+
+    def __init__(self, size: int = PYTHON_WORKER_POOL_SIZE,
+                 max_runs: int = PYTHON_WORKER_MAX_RUNS,
+                 max_rss_mb: int = PYTHON_WORKER_MAX_RSS_MB,
+                 startup_timeout: float = PYTHON_WORKER_STARTUP_TIMEOUT):
+        self.size = max(1, size)
+        self.max_runs = max_runs
+        self.max_rss_mb = max_rss_mb
+        self.startup_timeout = startup_timeout
+        self._idle: List[_WorkerProcess] = []
+        self._workers = 0  # idle, busy and starting
+        self._startup_error: Optional[str] = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._async_waiters: List[Any] = []  # (loop, future) pairs waiting in _aacquire
+        self._stats = {"runs": 0, "started": 0, "recycled": 0, "timeouts": 0, "limits_exceeded": 0}
+
+    def warm(self):
+        """Start workers in the background up to the pool size."""
+        with self._condition:
+            if self._closed:
+                return
+            missing = self.size - self._workers
+            self._workers += max(missing, 0)
+        for _ in range(max(missing, 0)):
+            self._start_worker_async()
+
+    def run(self, code: str, cwd: Optional[str] = None, timeout: float = 30,
+            capture: Optional[Dict[str, Any]] = None, limits: Optional[Dict[str, Any]] = None) -> SnippetResult:
+        """Run a snippet in a warm worker; raises subprocess.TimeoutExpired like subprocess.run.
+
+        With `capture` ({"format": "png" or "svg", "dpi": ...}), figures the
+        snippet saves come back as buffers in the result instead of files.
+        `limits` ({"memory_mb", "cpu_seconds", "output_chars"}) caps the snippet.
+        """
+        worker = self._acquire()
+        discard = True
+        try:
+            result = worker.run(code, cwd or os.getcwd(), timeout, capture, limits)
+            # A worker that hit a cap may be left fragmented or half-initialized
+            discard = result.limit_exceeded is not None
+            if discard:
+                with self._condition:
+                    self._stats["limits_exceeded"] += 1
+            return result
+        except subprocess.TimeoutExpired:
+            with self._condition:
+                self._stats["timeouts"] += 1
+            raise
+        finally:
+            self._release(worker, discard)
+
+    def run_batch(self, snippets: List[str], cwd: Optional[str] = None, timeout: float = 30,
+                  capture: Optional[Dict[str, Any]] = None, limits: Optional[Dict[str, Any]] = None) -> List[Union[SnippetResult, Exception]]:
+        """Run independent snippets concurrently on separate workers.
+
+        Results come back in input order; a snippet that times out or cannot
+        be started yields its exception instead of a result.
+        """
+        if not snippets:
+            return []
+        cwd = cwd or os.getcwd()
+
+        def run_one(code):
+            try:
+                return self.run(code, cwd=cwd, timeout=timeout, capture=capture, limits=limits)
+            except (subprocess.TimeoutExpired, WorkerStartupError) as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=min(len(snippets), self.size)) as executor:
+            return list(executor.map(run_one, snippets))
+
+    async def arun(self, code: str, cwd: Optional[str] = None, timeout: float = 30,
+                   capture: Optional[Dict[str, Any]] = None, limits: Optional[Dict[str, Any]] = None) -> SnippetResult:
+        """Async variant of run: waits for a worker and its response without blocking a thread."""
+        worker = await self._aacquire()
+        discard = True
+        try:
+            result = await worker.arun(code, cwd or os.getcwd(), timeout, capture, limits)
+            discard = result.limit_exceeded is not None
+            if discard:
+                with self._condition:
+                    self._stats["limits_exceeded"] += 1
+            return result
+        except subprocess.TimeoutExpired:
+            with self._condition:
+                self._stats["timeouts"] += 1
+            raise
+        finally:
+            self._release(worker, discard)
+
+    async def arun_batch(self, snippets: List[str], cwd: Optional[str] = None, timeout: float = 30,
+                         capture: Optional[Dict[str, Any]] = None, limits: Optional[Dict[str, Any]] = None) -> List[Union[SnippetResult, Exception]]:
+        """Async variant of run_batch; the pool size bounds how many run at once."""
+        cwd = cwd or os.getcwd()
+
+        async def run_one(code):
+            try:
+                return await self.arun(code, cwd=cwd, timeout=timeout, capture=capture, limits=limits)
+            except (subprocess.TimeoutExpired, WorkerStartupError) as e:
+                return e
+
+        return list(await asyncio.gather(*(run_one(code) for code in snippets)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {"size": self.size, "workers": self._workers, "idle": len(self._idle), **self._stats}
+
+    def close_all(self):
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._workers -= len(idle)
+            self._notify_all()
+        for worker in idle:
+            worker.kill()
+
+    def _acquire(self) -> _WorkerProcess:
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise WorkerStartupError("Python worker pool is closed")
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.alive:
+                        return worker
+                    self._workers -= 1
+                if self._workers < self.size and not self._startup_error:
+                    self._workers += 1
+                    self._start_worker_async()
+                elif self._workers == 0:
+                    error, self._startup_error = self._startup_error, None
+                    raise WorkerStartupError(error)
+                self._condition.wait()
+
+    async def _aacquire(self) -> _WorkerProcess:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self._closed:
+                    raise WorkerStartupError("Python worker pool is closed")
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.alive:
+                        return worker
+                    self._workers -= 1
+                if self._workers < self.size and not self._startup_error:
+                    self._workers += 1
+                    self._start_worker_async()
+                elif self._workers == 0:
+                    error, self._startup_error = self._startup_error, None
+                    raise WorkerStartupError(error)
+                future = loop.create_future()
+                self._async_waiters.append((loop, future))
+            await future
+
+    def _notify_all(self):
+        # Called with the condition held
+        self._condition.notify_all()
+        self._wake_async_waiters()
+
+    def _wake_async_waiters(self):
+        # Called with the condition held; woken waiters re-check the pool and may wait again
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future, None)
+            except RuntimeError:
+                pass
+
+    def _release(self, worker: _WorkerProcess, discard: bool):
+        over_memory = worker.peak_rss_kb is not None and worker.peak_rss_kb > self.max_rss_mb * 1024
+        recycle = discard or over_memory or worker.runs >= self.max_runs or not worker.alive
+        with self._condition:
+            self._stats["runs"] += 1
+            closed = self._closed
+            if not recycle and not closed:
+                self._idle.append(worker)
+                self._condition.notify()
+                self._wake_async_waiters()
+                return
+            if recycle:
+                self._stats["recycled"] += 1
+            if closed:
+                self._workers -= 1
+                self._notify_all()
+        worker.kill()
+        # Keep the slot and warm its replacement before anyone needs it
+        if not closed:
+            self._start_worker_async()
+
+    def _start_worker_async(self):
+        threading.Thread(target=self._start_worker, daemon=True).start()
+
+    def _start_worker(self):
+        error = None
+        worker = None
+        try:
+            worker = _WorkerProcess()
+            if not worker.wait_ready(self.startup_timeout):
+                error = "Python worker did not become ready"
+        except Exception as e:
+            error = f"Could not start Python worker: {e}"
+
+        with self._condition:
+            if error is None and not self._closed:
+                self._stats["started"] += 1
+                self._startup_error = None
+                self._idle.append(worker)
+            else:
+                self._workers -= 1
+                if error:
+                    self._startup_error = error
+            self._notify_all()
+        if (error or self._closed) and worker is not None:
+            worker.kill()
+
+
+# Global worker pool instance
+_python_worker_pool_instance = None
+_python_worker_pool_lock = threading.Lock()
+
+def get_python_worker_pool() -> PythonWorkerPool:
+    """Get the global Python worker pool instance."""
+    global _python_worker_pool_instance
+    with _python_worker_pool_lock:
+        if _python_worker_pool_instance is None:
+            _python_worker_pool_instance = PythonWorkerPool()
+        return _python_worker_pool_instance
+
+
+def close_python_worker_pool():
+    """Stop every idle worker (called on interpreter exit)."""
+    if _python_worker_pool_instance is not None:
+        _python_worker_pool_instance.close_all()
+
+
+atexit.register(close_python_worker_pool)
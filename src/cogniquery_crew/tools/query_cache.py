@@ -0,0 +1,309 @@
+# src/cogniquery_crew/tools/query_cache.py
+
+import os
+import re
+import time
+import hashlib
+import threading
+import dataclasses
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Tuple, Optional, Any
+from .connection_pool import get_connection_pool
+from .async_db import async_connection
+
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("COGNIQUERY_QUERY_CACHE_TTL", "600"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("COGNIQUERY_QUERY_CACHE_MAX_ENTRIES", "256"))
+QUERY_CACHE_MAX_BYTES = int(os.getenv("COGNIQUERY_QUERY_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Token kinds, tried in order
+_TOKEN_PATTERN = re.compile(r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<dollar>\$(?P<tag>[A-Za-z_]*)\$.*?\$(?P=tag)\$)
+  | (?P<ident>"(?:[^"]|"")*")
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<space>\s+)
+  | (?P<op>::|<=|>=|<>|!=|\|\||.)
+""", re.VERBOSE | re.DOTALL)
+
+_READ_ONLY_STARTS = {"select", "with", "values", "table"}
+# Clauses that end a FROM list
+_FROM_LIST_ENDS = {
+    "where", "group", "order", "limit", "having", "window", "union", "intersect", "except",
+    "offset", "fetch", "for",
+}
+# Functions whose argument syntax contains FROM, e.g. extract(year from order_date)
+_FUNCTIONS_WITH_FROM = {"extract", "substring", "trim", "overlay"}
+
+# Statements containing these can change data or read volatile state
+_UNCACHEABLE_WORDS = {
+    "insert", "update", "delete", "merge", "truncate", "create", "alter", "drop", "grant",
+    "revoke", "copy", "call", "do", "lock", "into", "nextval", "setval", "random",
+    "now", "clock_timestamp", "statement_timestamp", "timeofday", "current_date",
+    "current_time", "current_timestamp", "localtime", "localtimestamp", "txid_current",
+    "pg_sleep", "gen_random_uuid", "uuid_generate_v4",
+}
+
+TABLE_SIGNATURE_QUERY = """
+SELECT relname, n_tup_ins, n_tup_upd, n_tup_del, n_live_tup
+FROM pg_catalog.pg_stat_user_tables
+WHERE schemaname = 'public' AND relname = ANY(%s);
+"""
+ASYNC_TABLE_SIGNATURE_QUERY = TABLE_SIGNATURE_QUERY.replace("%s", "$1")
+
+
+@dataclass
+class NormalizedQuery:
+    """Canonical form of a read-only statement and the tables it reads."""
+    text: str
+    tables: List[str]
+
+
+def _from_tables(tokens: List[Tuple[str, str]], cte_names: set) -> Optional[List[str]]:
+    """Relations named in every FROM list and JOIN of a tokenized statement, subqueries included.
+
+    Returns None when a FROM list cannot be read with confidence (quoted
+    mixed-case names, parenthesized joins, FROM or JOIN inside an expression
+    that is not one of the functions whose syntax uses FROM).
+    """
+    tables: List[str] = []
+    parens: List[Optional[str]] = []  # per open parenthesis: None for a subquery, else the word before it
+    scopes = [{"in_from": False, "expect_item": False}]  # one per query level
+    i, n = 0, len(tokens)
+    while i < n:
+        kind, value = tokens[i]
+        previous = tokens[i - 1][1] if i > 0 else ""
+        scope = scopes[-1]
+        if (kind, value) == ("op", "("):
+            following = tokens[i + 1][1] if i + 1 < n else ""
+            if following in _READ_ONLY_STARTS:
+                parens.append(None)
+                scopes.append({"in_from": False, "expect_item": False})
+            else:
+                if scope["expect_item"]:
+                    return None  # parenthesized join
+                parens.append(previous)
+            scope["expect_item"] = False
+        elif (kind, value) == ("op", ")"):
+            if not parens:
+                return None
+            if parens.pop() is None:
+                scopes.pop()
+        elif parens and parens[-1] is not None:
+            # Inside an expression or function call
+            if kind == "word" and value in ("from", "join") and previous != "distinct":
+                if value == "join" or parens[-1] not in _FUNCTIONS_WITH_FROM:
+                    return None
+        elif kind == "word" and value in ("from", "join") and previous != "distinct":
+            scope["in_from"] = scope["expect_item"] = True
+        elif scope["in_from"]:
+            if (kind, value) == ("op", ","):
+                scope["expect_item"] = True
+            elif kind == "word" and value in _FROM_LIST_ENDS:
+                scope["in_from"] = scope["expect_item"] = False
+            elif scope["expect_item"] and not (kind == "word" and value in ("lateral", "only")):
+                if kind != "word":
+                    return None
+                # Skip schema qualifiers: public.orders -> orders
+                while i + 2 < n and tokens[i + 1] == ("op", ".") and tokens[i + 2][0] in ("word", "ident"):
+                    i += 2
+                kind, value = tokens[i]
+                if kind != "word":
+                    return None  # mixed-case relation names are not tracked
+                scope["expect_item"] = False
+                if i + 1 < n and tokens[i + 1] == ("op", "("):
+                    i += 1
+                    continue  # set-returning function; its parenthesis is handled above
+                if value not in cte_names and value not in tables:
+                    tables.append(value)
+        i += 1
+    if parens:
+        return None
+    return sorted(tables)
+
+
+def normalize_sql(sql: str) -> Optional[NormalizedQuery]:
+    """Normalize a statement for cache keying, or return None if it must not be cached.
+
+    Comments and whitespace are dropped, keywords and unquoted identifiers are
+    lowercased and integer literals are canonicalized. String literals, quoted
+    identifiers and decimals are kept verbatim because they change results.
+    """
+    tokens: List[Tuple[str, str]] = []
+    for match in _TOKEN_PATTERN.finditer(sql):
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind in ("comment", "space"):
+            continue
+        if kind == "word":
+            value = value.lower()
+        elif kind == "number" and value.isdigit():
+            value = str(int(value))
+        elif kind == "ident" and re.fullmatch(r'"[a-z_][a-z0-9_$]*"', value):
+            # "orders" and orders name the same relation
+            kind, value = "word", value[1:-1]
+        tokens.append((kind, value))
+
+    while tokens and tokens[-1] == ("op", ";"):
+        tokens.pop()
+    if not tokens or tokens[0][1] not in _READ_ONLY_STARTS:
+        return None
+    if any(kind == "op" and value == ";" for kind, value in tokens):
+        return None  # multiple statements
+    if any(kind == "word" and value in _UNCACHEABLE_WORDS for kind, value in tokens):
+        return None
+
+    cte_names = set()
+    for i in range(1, len(tokens) - 2):
+        if (tokens[i][0] == "word" and tokens[i + 1] == ("word", "as") and tokens[i + 2] == ("op", "(")
+                and tokens[i - 1][1] in ("with", ",", "recursive")):
+            cte_names.add(tokens[i][1])
+
+    tables = _from_tables(tokens, cte_names)
+    if tables is None:
+        return None
+
+    return NormalizedQuery(text=" ".join(value for _, value in tokens), tables=sorted(tables))
+
+
+class QueryResultCache:
+    """LRU cache of query results with byte-size eviction, a TTL and per-table invalidation.
+
+    Each entry remembers the pg_stat_user_tables modification counters of the
+    tables it read; a hit is only served while those counters are unchanged.
+    """
+
+    def __init__(self, ttl_seconds: float = QUERY_CACHE_TTL_SECONDS,
+                 max_entries: int = QUERY_CACHE_MAX_ENTRIES,
+                 max_bytes: int = QUERY_CACHE_MAX_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0, "uncacheable": 0}
+
+    def make_key(self, conn_str: str, sql: str, variant: str = "") -> Optional[Tuple[str, NormalizedQuery]]:
+        """Build the cache key for a statement, or None if it is not cacheable."""
+        normalized = normalize_sql(sql)
+        if normalized is None or not normalized.tables:
+            with self._lock:
+                self._stats["uncacheable"] += 1
+            return None
+        digest = hashlib.sha256("\x00".join([conn_str, variant, normalized.text]).encode("utf-8")).hexdigest()
+        return digest, normalized
+
+    def get(self, conn_str: str, key: str) -> Optional[Any]:
+        """Return a cached result if it is fresh and none of its tables changed."""
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        return self._validate(key, entry, self.table_signatures(conn_str, list(entry["signatures"])))
+
+    async def aget(self, conn_str: str, key: str) -> Optional[Any]:
+        """Async variant of get, revalidating through the asyncpg pool."""
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        return self._validate(key, entry, await self.atable_signatures(conn_str, list(entry["signatures"])))
+
+    def put(self, key: str, result: Any, signatures: Optional[Dict[str, Tuple]], size: int):
+        """Store a result with the table signatures captured before it was computed."""
+        if signatures is None or size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = {"result": result, "signatures": signatures, "size": size, "created": time.monotonic()}
+            self._total_bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def table_signatures(self, conn_str: str, tables: List[str]) -> Optional[Dict[str, Tuple]]:
+        """Fetch modification counters for tables; None if any table is not tracked."""
+        try:
+            with get_connection_pool(conn_str).connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(TABLE_SIGNATURE_QUERY, (tables,))
+                    rows = cursor.fetchall()
+        except Exception as e:
+            print(f"Error fetching table statistics for query cache: {e}")
+            return None
+        signatures = {row[0]: tuple(row[1:]) for row in rows}
+        if len(signatures) != len(set(tables)):
+            return None  # views or other relations without modification counters
+        return signatures
+
+    async def atable_signatures(self, conn_str: str, tables: List[str]) -> Optional[Dict[str, Tuple]]:
+        """Async variant of table_signatures."""
+        try:
+            async with async_connection(conn_str) as conn:
+                rows = await conn.fetch(ASYNC_TABLE_SIGNATURE_QUERY, tables)
+        except Exception as e:
+            print(f"Error fetching table statistics for query cache: {e}")
+            return None
+        signatures = {row[0]: tuple(row[1:]) for row in rows}
+        if len(signatures) != len(set(tables)):
+            return None
+        return signatures
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._total_bytes, **self._stats}
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Find an entry that is still within its TTL."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if time.monotonic() - entry["created"] > self.ttl_seconds:
+                self._stats["invalidations"] += 1
+                self._stats["misses"] += 1
+                self._remove(key)
+                return None
+            return entry
+
+    def _validate(self, key: str, entry: Dict[str, Any], signatures: Optional[Dict[str, Tuple]]) -> Optional[Any]:
+        """Serve an entry only while its tables' current signatures still match."""
+        with self._lock:
+            if signatures != entry["signatures"]:
+                self._stats["invalidations"] += 1
+                self._stats["misses"] += 1
+                self._remove(key)
+                return None
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+        return entry["result"]
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry["size"]
+
+
+def mark_cached(result):
+    """Copy of a cached StreamedResult flagged as served from the cache."""
+    return dataclasses.replace(result, from_cache=True)
+
+
+# Global query cache instance
+_query_cache_instance = None
+
+def get_query_cache() -> QueryResultCache:
+    """Get the global query result cache instance."""
+    global _query_cache_instance
+    if _query_cache_instance is None:
+        _query_cache_instance = QueryResultCache()
+    return _query_cache_instance
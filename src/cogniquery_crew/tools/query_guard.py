@@ -0,0 +1,228 @@
+# src/cogniquery_crew/tools/query_guard.py
+
+import os
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from .query_cache import _TOKEN_PATTERN
+from .result_streaming import strip_statement, _CURSOR_COMPATIBLE
+
+# Planner cost above which a query is not run as written (0 disables the guard)
+SQL_MAX_COST = float(os.getenv("COGNIQUERY_SQL_MAX_COST", "5000000"))
+# Plan nodes shown to the agent when a query is rejected
+PLAN_SUMMARY_MAX_NODES = 12
+# A join producing this share of the product of its inputs is most likely missing a condition
+_CARTESIAN_RATIO = 0.5
+_CARTESIAN_MIN_ROWS = 1_000_000
+
+
+@dataclass
+class PlanEstimate:
+    """Top-level planner estimate of a statement and its full JSON plan."""
+    total_cost: float
+    rows: int
+    plan: Dict[str, Any]
+
+
+@dataclass
+class GuardDecision:
+    """What to run for a query: as written, rewritten with a LIMIT, or nothing."""
+    action: str  # "run", "rewrite" or "reject"
+    query: str
+    estimate: Optional[PlanEstimate] = None
+    message: Optional[str] = None
+
+
+def _explain_statement(statement: str) -> str:
+    return f"EXPLAIN (FORMAT JSON) {statement}"
+
+
+def _parse_plan(value) -> PlanEstimate:
+    # psycopg2 decodes json columns, asyncpg returns text
+    document = json.loads(value) if isinstance(value, str) else value
+    plan = document[0]["Plan"]
+    return PlanEstimate(total_cost=float(plan["Total Cost"]), rows=int(plan["Plan Rows"]), plan=plan)
+
+
+def split_statements(statement: str) -> List[str]:
+    """Split a script on the semicolons outside strings, identifiers and comments."""
+    statements, start = [], 0
+    for match in _TOKEN_PATTERN.finditer(statement):
+        if match.lastgroup == "op" and match.group() == ";":
+            statements.append(statement[start:match.start()])
+            start = match.end()
+    statements.append(statement[start:])
+    return [strip_statement(part) for part in statements if strip_statement(part)]
+
+
+def add_limit(statement: str, limit: int) -> Optional[str]:
+    """Append a LIMIT to a row-returning statement, or return None if it cannot be done safely.
+
+    Statements that already limit their top level (LIMIT or FETCH) or lock
+    rows (FOR UPDATE/SHARE, which must follow the LIMIT) are left alone.
+    """
+    if not _CURSOR_COMPATIBLE.match(statement):
+        return None
+    depth = 0
+    for match in _TOKEN_PATTERN.finditer(statement):
+        kind, value = match.lastgroup, match.group()
+        if kind == "op" and value == "(":
+            depth += 1
+        elif kind == "op" and value == ")":
+            depth -= 1
+        elif kind == "word" and depth == 0 and value.lower() in ("limit", "fetch", "for"):
+            return None
+    return f"{statement}\nLIMIT {limit}"
+
+
+def _node_label(node: Dict[str, Any]) -> str:
+    label = node["Node Type"]
+    if node.get("Join Type") not in (None, "Inner"):
+        label = f"{node['Join Type']} {label}"
+    if node.get("Relation Name"):
+        label += f" on {node['Relation Name']}"
+    return label
+
+
+def _looks_cartesian(node: Dict[str, Any]) -> bool:
+    children = node.get("Plans", [])
+    if node["Node Type"] != "Nested Loop" or len(children) != 2 or "Join Filter" in node:
+        return False
+    product = children[0]["Plan Rows"] * children[1]["Plan Rows"]
+    return product >= _CARTESIAN_MIN_ROWS and node["Plan Rows"] >= _CARTESIAN_RATIO * product
+
+
+def summarize_plan(plan: Dict[str, Any], max_nodes: int = PLAN_SUMMARY_MAX_NODES) -> str:
+    """Render the top of a JSON plan as indented lines with row and cost estimates."""
+    lines: List[str] = []
+
+    def visit(node: Dict[str, Any], depth: int):
+        if len(lines) >= max_nodes:
+            return
+        line = f"{'  ' * depth}- {_node_label(node)}: ~{int(node['Plan Rows']):,} rows, cost {node['Total Cost']:,.0f}"
+        if _looks_cartesian(node):
+            line += "  <-- joins every row with every row; a join condition is probably missing"
+        lines.append(line)
+        for child in node.get("Plans", []):
+            visit(child, depth + 1)
+
+    visit(plan, 0)
+    return "\n".join(lines)
+
+
+def _first_decision(statement: str, estimate: PlanEstimate, max_cost: float, max_rows: int):
+    """Accept the statement, or return the LIMIT rewrite worth re-planning (None if there is none)."""
+    if estimate.total_cost <= max_cost and estimate.rows <= max_rows:
+        return GuardDecision("run", statement, estimate), None
+    if estimate.rows <= max_rows:
+        # Already within the row budget, so a LIMIT cannot make the plan any cheaper
+        return None, None
+    # One row past the budget still tells the result streamer the output was truncated
+    return None, add_limit(statement, max_rows + 1)
+
+
+def _script_decision(query: str, estimates: List[PlanEstimate], max_cost: float) -> GuardDecision:
+    """Scripts are run as written unless one of their statements is too expensive."""
+    for estimate in estimates:
+        if estimate.total_cost > max_cost:
+            return _rejection(query, estimate, max_cost)
+    return GuardDecision("run", query)
+
+
+def _rejection(query: str, estimate: PlanEstimate, max_cost: float, scan_bound: bool = False) -> GuardDecision:
+    if scan_bound:
+        advice = ("Returning fewer rows will not help: the cost comes from the scan itself, not from the rows returned. "
+                  "Filter early on selective or indexed columns (e.g. by date), join fewer or smaller tables, "
+                  "or aggregate over fewer rows.")
+    else:
+        advice = ("Fix the query and try again: add missing join conditions, filter early (e.g. by date), "
+                  "aggregate in SQL, or select fewer rows.")
+    return GuardDecision("reject", query, estimate, message=(
+        f"Error: Query rejected by the cost guard before execution. The planner estimated cost "
+        f"{estimate.total_cost:,.0f} (limit {max_cost:,.0f}) and {estimate.rows:,} rows.\n"
+        f"Plan summary:\n{summarize_plan(estimate.plan)}\n"
+        f"{advice}"
+    ))
+
+
+def _second_decision(statement: str, estimate: PlanEstimate, rewritten: Optional[str],
+                     rewritten_estimate: Optional[PlanEstimate], max_cost: float, max_rows: int) -> GuardDecision:
+    if rewritten_estimate is not None and rewritten_estimate.total_cost <= max_cost:
+        return GuardDecision("rewrite", rewritten, rewritten_estimate, message=(
+            f"QUERY GUARD: the planner estimated {estimate.rows:,} rows at cost {estimate.total_cost:,.0f}, "
+            f"so LIMIT {max_rows + 1} was added before running it."
+        ))
+    if estimate.total_cost <= max_cost:
+        # Too many rows but affordable; the result streamer will truncate it
+        return GuardDecision("run", statement, estimate)
+    # A LIMIT that leaves the cost where it was means the whole input has to be read anyway
+    scan_bound = estimate.rows <= max_rows or (
+        rewritten_estimate is not None and rewritten_estimate.total_cost >= estimate.total_cost)
+    return _rejection(statement, estimate, max_cost, scan_bound=scan_bound)
+
+
+def guard_query(conn, query: str, max_cost: float = SQL_MAX_COST, max_rows: int = 100000) -> GuardDecision:
+    """EXPLAIN a query on a psycopg2 connection and decide whether and how to run it.
+
+    Statements the planner cannot explain (DDL, syntax errors) are passed
+    through so execution reports its own error. Scripts of several
+    statements are checked statement by statement but never rewritten.
+    """
+    statement = strip_statement(query)
+    if max_cost <= 0:
+        return GuardDecision("run", query)
+
+    def explain(text: str) -> Optional[PlanEstimate]:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(_explain_statement(text))
+                return _parse_plan(cursor.fetchone()[0])
+        except Exception as e:
+            print(f"Query guard could not EXPLAIN the query: {e}")
+            # Nothing else has run in this transaction yet
+            conn.rollback()
+            return None
+
+    statements = split_statements(statement)
+    if len(statements) > 1:
+        estimates = [explain(part) for part in statements]
+        return _script_decision(query, [estimate for estimate in estimates if estimate], max_cost)
+
+    estimate = explain(statement)
+    if estimate is None:
+        return GuardDecision("run", query)
+    decision, rewritten = _first_decision(statement, estimate, max_cost, max_rows)
+    if decision is not None:
+        return decision
+    rewritten_estimate = explain(rewritten) if rewritten is not None else None
+    return _second_decision(statement, estimate, rewritten, rewritten_estimate, max_cost, max_rows)
+
+
+async def aguard_query(conn, query: str, max_cost: float = SQL_MAX_COST, max_rows: int = 100000) -> GuardDecision:
+    """Async variant of guard_query on an asyncpg connection inside a transaction."""
+    statement = strip_statement(query)
+    if max_cost <= 0:
+        return GuardDecision("run", query)
+
+    async def explain(text: str) -> Optional[PlanEstimate]:
+        try:
+            # A savepoint keeps a failed EXPLAIN from aborting the caller's transaction
+            async with conn.transaction():
+                return _parse_plan(await conn.fetchval(_explain_statement(text)))
+        except Exception as e:
+            print(f"Query guard could not EXPLAIN the query: {e}")
+            return None
+
+    statements = split_statements(statement)
+    if len(statements) > 1:
+        estimates = [await explain(part) for part in statements]
+        return _script_decision(query, [estimate for estimate in estimates if estimate], max_cost)
+
+    estimate = await explain(statement)
+    if estimate is None:
+        return GuardDecision("run", query)
+    decision, rewritten = _first_decision(statement, estimate, max_cost, max_rows)
+    if decision is not None:
+        return decision
+    rewritten_estimate = await explain(rewritten) if rewritten is not None else None
+    return _second_decision(statement, estimate, rewritten, rewritten_estimate, max_cost, max_rows)
@@ -2,20 +2,22 @@
 
 import os
 import base64
+from typing import Optional
 from crewai.tools import BaseTool
 from markdown_it import MarkdownIt
-from .activity_logger import get_activity_logger
+from .run_context import RunContext, activity_logger_for
 
 class ReportingTools(BaseTool):
     name: str = "Reporting Tools"
     description: str = "A tool to create a PDF report from markdown content."
+    run_context: Optional[RunContext] = None  # set per run by CogniQueryCrew
 
     def create_report(self, markdown_content: str, report_file_path: str) -> str:
         """
         Converts markdown content, including images and tables, into a PDF report.
         It saves the report to the specified file path.
         """
-        logger = get_activity_logger()
+        logger = activity_logger_for(self.run_context)
         logger.log_tool_usage("Communications Strategist", "Reporting Tools", f"Creating PDF report at {report_file_path}")
         
         # Ensure the output directory exists
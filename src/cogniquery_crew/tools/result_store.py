@@ -0,0 +1,148 @@
+# src/cogniquery_crew/tools/result_store.py
+
+import os
+import re
+import json
+import uuid
+import hashlib
+import datetime
+import threading
+from typing import Dict, Any, List, Optional
+import pandas as pd
+
+# Parquet needs pyarrow; fall back to pandas pickles when it is missing
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+RESULT_ID_PATTERN = re.compile(r"^res_[0-9a-f]{12}$")
+
+
+class ResultStore:
+    """Columnar on-disk store for SQL results, addressed by result ID.
+
+    SQLExecutor saves each result here so LocalCodeExecutor can load it as a
+    DataFrame directly instead of the data round-tripping through the LLM.
+    """
+
+    def __init__(self, base_dir: str = "output/results"):
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+        self._content_hashes: Dict[str, str] = {}
+
+    @property
+    def file_format(self) -> str:
+        return "parquet" if PARQUET_AVAILABLE else "pickle"
+
+    def save(self, df: pd.DataFrame, sql_query: str | None = None) -> str:
+        """Persist a DataFrame and return its new result ID."""
+        result_id = f"res_{uuid.uuid4().hex[:12]}"
+        os.makedirs(self.base_dir, exist_ok=True)
+
+        data_path = self._data_path(result_id)
+        if PARQUET_AVAILABLE:
+            # Parquet requires string column names
+            df.rename(columns=str).to_parquet(data_path, index=False)
+        else:
+            df.to_pickle(data_path)
+
+        metadata = {
+            "result_id": result_id,
+            "format": self.file_format,
+            "rows": len(df),
+            "columns": [str(col) for col in df.columns],
+            "sql_query": sql_query,
+            "created": datetime.datetime.now().isoformat(),
+        }
+        with self._lock:
+            with open(self._metadata_path(result_id), "w", encoding="utf-8") as f:
+                json.dump(metadata, f)
+        return result_id
+
+    def load(self, result_id: str) -> pd.DataFrame:
+        """Load a stored result as a DataFrame."""
+        data_path = self.path_for(result_id)
+        if data_path is None:
+            raise KeyError(f"Unknown result ID: {result_id}")
+        if data_path.endswith(".parquet"):
+            return pd.read_parquet(data_path)
+        return pd.read_pickle(data_path)
+
+    def path_for(self, result_id: str) -> Optional[str]:
+        """Get the absolute data file path of a result, or None if it does not exist."""
+        if not RESULT_ID_PATTERN.match(result_id or ""):
+            return None
+        for extension in ("parquet", "pkl"):
+            path = os.path.join(self.base_dir, f"{result_id}.{extension}")
+            if os.path.exists(path):
+                return os.path.abspath(path)
+        return None
+
+    def content_hash(self, result_id: str) -> str:
+        """SHA-256 of a result's data file; results are never rewritten, so it is computed once."""
+        with self._lock:
+            cached = self._content_hashes.get(result_id)
+        if cached is not None:
+            return cached
+        data_path = self.path_for(result_id)
+        if data_path is None:
+            raise KeyError(f"Unknown result ID: {result_id}")
+        digest = hashlib.sha256()
+        with open(data_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        with self._lock:
+            self._content_hashes[result_id] = digest.hexdigest()
+        return digest.hexdigest()
+
+    def describe(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """Get the metadata recorded for a result."""
+        if not RESULT_ID_PATTERN.match(result_id or ""):
+            return None
+        try:
+            with open(self._metadata_path(result_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def build_preload_code(self, result_ids: List[str]) -> str:
+        """Python source that loads the given results into `results` (and `df` for a single one)."""
+        paths = {}
+        for result_id in result_ids:
+            path = self.path_for(result_id)
+            if path is None:
+                raise KeyError(f"Unknown result ID: {result_id}")
+            paths[result_id] = path
+
+        lines = [
+            "# === PRELOADED SQL RESULTS ===",
+            "import pandas as pd",
+            f"_result_paths = {paths!r}",
+            "def load_result(result_id):",
+            "    path = _result_paths[result_id]",
+            "    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_pickle(path)",
+            "results = {result_id: load_result(result_id) for result_id in _result_paths}",
+        ]
+        if len(paths) == 1:
+            lines.append(f"df = results[{next(iter(paths))!r}]")
+        return "\n".join(lines) + "\n\n"
+
+    def _data_path(self, result_id: str) -> str:
+        extension = "parquet" if PARQUET_AVAILABLE else "pkl"
+        return os.path.join(self.base_dir, f"{result_id}.{extension}")
+
+    def _metadata_path(self, result_id: str) -> str:
+        return os.path.join(self.base_dir, f"{result_id}.json")
+
+
+# Global result store instance
+_result_store_instance = None
+
+def get_result_store() -> ResultStore:
+    """Get the global result store instance."""
+    global _result_store_instance
+    if _result_store_instance is None:
+        _result_store_instance = ResultStore()
+    return _result_store_instance
@@ -0,0 +1,168 @@
+# src/cogniquery_crew/tools/result_streaming.py
+
+import re
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+import psycopg2
+import pandas as pd
+
+DEFAULT_MAX_ROWS = 5000
+DEFAULT_MAX_BYTES = 200_000
+DEFAULT_BATCH_SIZE = 500
+
+# Statements that can be wrapped in DECLARE ... CURSOR FOR
+_CURSOR_COMPATIBLE = re.compile(r"^\s*(select|with|values|table)\b", re.IGNORECASE)
+_LEADING_COMMENTS = re.compile(r"^\s*(--[^\n]*\n|/\*.*?\*/)\s*", re.DOTALL)
+
+
+@dataclass
+class StreamedResult:
+    """Rows fetched within a row/byte budget plus what was left behind."""
+    dataframe: pd.DataFrame
+    rows_returned: int
+    bytes_returned: int
+    truncated: bool = False
+    truncation_reason: Optional[str] = None
+    max_rows: int = DEFAULT_MAX_ROWS
+    max_bytes: int = DEFAULT_MAX_BYTES
+    from_cache: bool = False
+    guard_note: Optional[str] = None  # set when the cost guard rewrote the query
+
+    def truncation_note(self) -> str:
+        """Explain to the agent how much of the result it is seeing."""
+        if not self.truncated:
+            return f"Complete result: {self.rows_returned} rows."
+        if self.truncation_reason == "byte_limit":
+            limit = f"the {self.max_bytes:,}-byte result budget"
+        else:
+            limit = f"the {self.max_rows:,}-row limit"
+        return (f"RESULT TRUNCATED: showing the first {self.rows_returned} rows because the query hit {limit}; "
+                f"more rows exist. Aggregate, filter or add a LIMIT to see the rest.")
+
+
+def strip_statement(query: str) -> str:
+    """Remove leading comments and trailing semicolons so the query can be wrapped."""
+    query = query.strip()
+    while True:
+        stripped = _LEADING_COMMENTS.sub("", query, count=1)
+        if stripped == query:
+            break
+        query = stripped
+    return query.rstrip().rstrip(";").rstrip()
+
+
+def _row_bytes(row) -> int:
+    # Approximate CSV size of a row: values, separators and newline
+    return sum(len(str(value)) for value in row if value is not None) + len(row)
+
+
+class _RowCollector:
+    """Accumulates fetched rows until the row or byte budget runs out."""
+
+    def __init__(self, max_rows: int, max_bytes: int):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.rows = []
+        self.bytes_returned = 0
+        self.truncated = False
+        self.reason = None
+
+    def fetch_size(self, batch_size: int) -> int:
+        # One row past the limit tells us whether the result was truncated
+        return min(batch_size, self.max_rows - len(self.rows) + 1)
+
+    def add(self, batch):
+        for row in batch:
+            if len(self.rows) >= self.max_rows:
+                self.truncated, self.reason = True, "row_limit"
+                return
+            size = _row_bytes(row)
+            if self.rows and self.bytes_returned + size > self.max_bytes:
+                self.truncated, self.reason = True, "byte_limit"
+                return
+            self.rows.append(row)
+            self.bytes_returned += size
+
+    def result(self, columns) -> StreamedResult:
+        dataframe = pd.DataFrame.from_records(self.rows, columns=columns, coerce_float=True)
+        return StreamedResult(
+            dataframe=dataframe,
+            rows_returned=len(self.rows),
+            bytes_returned=self.bytes_returned,
+            truncated=self.truncated,
+            truncation_reason=self.reason,
+            max_rows=self.max_rows,
+            max_bytes=self.max_bytes,
+        )
+
+
+def stream_query(conn, query: str,
+                 max_rows: int = DEFAULT_MAX_ROWS,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> StreamedResult:
+    """Fetch a query result in batches, stopping as soon as a budget is exhausted.
+
+    Row-returning statements run through a server-side named cursor so rows
+    beyond the budget are never transferred. Other statements fall back to a
+    regular client cursor.
+    """
+    statement = strip_statement(query)
+    if _CURSOR_COMPATIBLE.match(statement):
+        cursor = conn.cursor(name=f"cq_{uuid.uuid4().hex[:12]}")
+        cursor.itersize = batch_size
+        try:
+            cursor.execute(statement)
+        except psycopg2.Error:
+            # e.g. data-modifying CTEs cannot be declared as cursors
+            conn.rollback()
+            cursor = conn.cursor()
+            cursor.execute(statement)
+    else:
+        cursor = conn.cursor()
+        cursor.execute(statement)
+
+    try:
+        collector = _RowCollector(max_rows, max_bytes)
+
+        # Named cursors only expose a description after the first fetch
+        if cursor.name is not None or cursor.description is not None:
+            while not collector.truncated:
+                batch = cursor.fetchmany(collector.fetch_size(batch_size))
+                if not batch:
+                    break
+                collector.add(batch)
+
+        columns = [desc[0] for desc in cursor.description] if cursor.description else []
+        return collector.result(columns)
+    finally:
+        cursor.close()
+
+
+async def astream_query(conn, query: str,
+                        max_rows: int = DEFAULT_MAX_ROWS,
+                        max_bytes: int = DEFAULT_MAX_BYTES,
+                        batch_size: int = DEFAULT_BATCH_SIZE) -> StreamedResult:
+    """Async counterpart of stream_query for an asyncpg connection inside a transaction.
+
+    Row-returning statements are read through a server-side cursor in
+    batches; other statements are executed and their rows, if any, fetched
+    at once under the same budget.
+    """
+    statement = strip_statement(query)
+    collector = _RowCollector(max_rows, max_bytes)
+    prepared = await conn.prepare(statement)
+    columns = [attribute.name for attribute in prepared.get_attributes()]
+
+    if columns and _CURSOR_COMPATIBLE.match(statement):
+        cursor = await prepared.cursor()
+        while not collector.truncated:
+            batch = await cursor.fetch(collector.fetch_size(batch_size))
+            if not batch:
+                break
+            collector.add([tuple(row) for row in batch])
+    else:
+        # e.g. INSERT ... RETURNING, or statements without a result
+        collector.add([tuple(row) for row in await prepared.fetch()])
+
+    return collector.result(columns)
@@ -0,0 +1,119 @@
+# src/cogniquery_crew/tools/run_context.py
+
+import os
+import uuid
+import shutil
+import time
+import datetime
+from typing import Iterable, List, Optional
+from .activity_logger import ActivityLogger, get_activity_logger
+from .result_store import ResultStore, get_result_store
+from .artifact_registry import ArtifactRegistry
+from .connection_pool import resolve_connection_string
+
+RUNS_DIR = os.getenv("COGNIQUERY_RUNS_DIR", "runs")
+# Workspaces untouched for longer than this are deleted; 0 keeps them forever
+RUN_WORKSPACE_TTL_HOURS = float(os.getenv("COGNIQUERY_RUN_TTL_HOURS", "24"))
+
+
+class RunContext:
+    """Everything one analysis run writes to, kept apart from concurrent runs.
+
+    Each run gets its own workspace (runs/<run_id>/) holding an output/
+    directory for charts, reports, stored SQL results and the activity log,
+    plus its own ActivityLogger, ResultStore and ArtifactRegistry. Python
+    snippets execute with the workspace as their working directory, so the
+    'output/...' paths the agents write resolve inside it.
+    """
+
+    def __init__(self, run_id: str, workspace: str, db_connection_string: Optional[str] = None):
+        self.run_id = run_id
+        self.workspace = os.path.abspath(workspace)
+        self.db_connection_string = db_connection_string
+        self.created = datetime.datetime.now()
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        self.logger = ActivityLogger(log_file_path=self.output_path("activity_log.json"))
+        self.result_store = ResultStore(base_dir=self.output_path("results"))
+        self.artifacts = ArtifactRegistry(self.output_dir, manifest_path=self.output_path("artifacts.jsonl"))
+
+    @classmethod
+    def create(cls, db_connection_string: Optional[str] = None, base_dir: str = RUNS_DIR) -> "RunContext":
+        """Create a run with a fresh ID and workspace."""
+        run_id = f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        return cls(run_id, os.path.join(base_dir, run_id), db_connection_string)
+
+    @property
+    def output_dir(self) -> str:
+        return os.path.join(self.workspace, "output")
+
+    def output_path(self, *parts: str) -> str:
+        """Path of a file inside this run's output directory."""
+        return os.path.join(self.output_dir, *parts)
+
+    def get_charts(self) -> List[str]:
+        """Chart files the run's executions produced, relative to output_dir, in creation order."""
+        return self.artifacts.charts()
+
+    def close(self):
+        """Export the activity log and stop the run's background writer."""
+        self.logger.close()
+
+    def cleanup(self):
+        """Close the run and delete its workspace."""
+        try:
+            self.close()
+        except Exception as e:
+            print(f"Error closing run {self.run_id}: {e}")
+        shutil.rmtree(self.workspace, ignore_errors=True)
+
+
+def reap_stale_workspaces(base_dir: str = RUNS_DIR, ttl_hours: float = RUN_WORKSPACE_TTL_HOURS,
+                          keep: Iterable[str] = ()) -> int:
+    """Delete run workspaces last modified more than ttl_hours ago, except those in `keep`.
+
+    Sessions that end without starting another run never call cleanup(), so
+    their workspaces are only removed here. Returns how many were deleted.
+    """
+    if ttl_hours <= 0:
+        return 0
+    try:
+        names = os.listdir(base_dir)
+    except OSError:
+        return 0
+    keep = {os.path.abspath(path) for path in keep}
+    cutoff = time.time() - ttl_hours * 3600
+    reaped = 0
+    for name in names:
+        workspace = os.path.abspath(os.path.join(base_dir, name))
+        if workspace in keep or not os.path.isdir(workspace):
+            continue
+        try:
+            # output/ changes as the run writes files, the workspace itself only when created
+            modified = max(os.path.getmtime(path) for path in (workspace, os.path.join(workspace, "output"))
+                           if os.path.exists(path))
+        except (OSError, ValueError):
+            continue
+        if modified < cutoff:
+            shutil.rmtree(workspace, ignore_errors=True)
+            reaped += 1
+    if reaped:
+        print(f"Removed {reaped} run workspaces older than {ttl_hours:g} hours from {base_dir}")
+    return reaped
+
+
+def activity_logger_for(run_context: Optional[RunContext]) -> ActivityLogger:
+    """The run's logger, or the global one for tools used outside a run."""
+    return run_context.logger if run_context is not None else get_activity_logger()
+
+
+def result_store_for(run_context: Optional[RunContext]) -> ResultStore:
+    """The run's result store, or the global one for tools used outside a run."""
+    return run_context.result_store if run_context is not None else get_result_store()
+
+
+def connection_string_for(run_context: Optional[RunContext], db_connection_string: Optional[str] = None) -> Optional[str]:
+    """Explicit connection string, else the run's, else NEONDB_CONN_STR."""
+    if not db_connection_string and run_context is not None:
+        db_connection_string = run_context.db_connection_string
+    return resolve_connection_string(db_connection_string)
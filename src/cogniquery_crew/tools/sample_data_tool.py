@@ -1,59 +1,158 @@
 # src/cogniquery_crew/tools/sample_data_tool.py
 
 import os
+import asyncio
 from dotenv import load_dotenv
 load_dotenv()
-import psycopg2
 import pandas as pd
-from crewai.tools import BaseTool
-from .activity_logger import get_activity_logger
+from typing import Optional
+from .async_tool import AsyncNativeTool
+from .run_context import RunContext, activity_logger_for, connection_string_for
+from .connection_pool import get_connection_pool
+from .async_db import async_connection, ASYNCPG_AVAILABLE
+from .table_profiler import get_profile_cache, render_table_profile
+from .table_sampling import (
+    SAMPLE_METHODS, SAMPLE_STATEMENT_TIMEOUT_MS,
+    table_sample_info, atable_sample_info, build_sample_query, set_statement_timeout, aset_statement_timeout,
+)
 
-class SampleDataTool(BaseTool):
+# "profile" (per-column statistics) or "rows" (raw sample rows)
+SAMPLE_DATA_MODE = os.getenv("COGNIQUERY_SAMPLE_MODE", "profile")
+
+class SampleDataTool(AsyncNativeTool):
     name: str = "SampleData"
-    description: str = """Gets sample data from a specific table in the NeonDB PostgreSQL database to understand data patterns and content.
+    description: str = """Gets a statistical profile or sample rows of a specific table in the NeonDB PostgreSQL database to understand data patterns and content.
     
-    Usage: SampleData(table_name='your_table_name', limit=5)
+    Usage: SampleData(table_name='your_table_name') or SampleData(table_name='your_table_name', mode='rows', limit=5)
     
     Parameters:
-    - table_name: Name of the table to get sample data from (required)
-    - limit: Number of rows to return (optional, default is 5)
+    - table_name: Name of the table to examine (required)
+    - mode: 'profile' for per-column null fraction, distinct count, min/max and top values (default),
+      or 'rows' for raw sample rows (optional)
+    - limit: Number of rows to return in 'rows' mode (optional, default is 5)
+    - sampling: How rows are picked in 'rows' mode (optional): 'auto' (default) takes a random,
+      repeatable TABLESAMPLE (row-level BERNOULLI, or block-level SYSTEM on very large tables),
+      'bernoulli' or 'system' force a method, 'none' returns the first rows of the table
+    - stratify_by: Column whose values should all be represented in the rows (optional)
     
     DATABASE TYPE: NeonDB PostgreSQL
     
-    Example: SampleData(table_name='regions', limit=3)"""
+    Examples: SampleData(table_name='orders'), SampleData(table_name='regions', mode='rows', limit=3),
+    SampleData(table_name='orders', mode='rows', limit=10, stratify_by='status')"""
+    run_context: Optional[RunContext] = None  # set per run by CogniQueryCrew
 
-    def _execute_query(self, query: str, db_connection_string: str | None = None):
-        """Helper function to execute a query and return a pandas DataFrame."""
-        conn_str = db_connection_string or os.getenv("NEONDB_CONN_STR")
+    def _execute_query(self, table_name: str, limit: int, sampling: str, stratify_by: str | None,
+                       db_connection_string: str | None = None):
+        """Helper function to sample a table on a pooled connection and return a pandas DataFrame."""
+        conn_str = connection_string_for(self.run_context, db_connection_string)
         if not conn_str:
             return "Error: NEONDB_CONN_STR is not set in environment."
         
-        conn = None
         try:
-            conn = psycopg2.connect(conn_str)
-            return pd.read_sql_query(query, conn)
+            with get_connection_pool(conn_str).connection() as conn:
+                with conn.cursor() as cursor:
+                    info = table_sample_info(cursor, table_name)
+                    query = build_sample_query(info, limit, sampling, stratify_by=stratify_by)
+                    self._log_query(table_name, query)
+                    set_statement_timeout(cursor)
+                return pd.read_sql_query(query, conn)
         except Exception as e:
-            return f"Error executing query: {e}"
-        finally:
-            if conn:
-                conn.close()
+            return self._query_error(e)
 
-    def _run(self, table_name: str, limit: int = 5, **kwargs) -> str:
-        """Get sample data from a specific table."""
-        logger = get_activity_logger()
-        current_status = logger.get_current_status()
-        current_agent = current_status.get('current_agent', 'Unknown Agent')
+    async def _aexecute_query(self, table_name: str, limit: int, sampling: str, stratify_by: str | None,
+                              db_connection_string: str | None = None):
+        """Async variant of _execute_query on the asyncpg pool."""
+        conn_str = connection_string_for(self.run_context, db_connection_string)
+        if not conn_str:
+            return "Error: NEONDB_CONN_STR is not set in environment."
+        
+        try:
+            async with async_connection(conn_str) as conn:
+                info = await atable_sample_info(conn, table_name)
+                query = build_sample_query(info, limit, sampling, stratify_by=stratify_by)
+                self._log_query(table_name, query)
+                await aset_statement_timeout(conn)
+                prepared = await conn.prepare(query)
+                columns = [attribute.name for attribute in prepared.get_attributes()]
+                rows = await prepared.fetch()
+            return pd.DataFrame.from_records([tuple(row) for row in rows], columns=columns, coerce_float=True)
+        except Exception as e:
+            return self._query_error(e)
+
+    def _query_error(self, error: Exception) -> str:
+        if "statement timeout" in str(error):
+            return (f"Error: Sampling took longer than {SAMPLE_STATEMENT_TIMEOUT_MS} ms and was cancelled. "
+                    "Try sampling='system', a smaller limit, or no stratify_by.")
+        return f"Error executing query: {error}"
+
+    def _run(self, table_name: str, limit: int = 5, mode: str = SAMPLE_DATA_MODE,
+             sampling: str = "auto", stratify_by: str | None = None, **kwargs) -> str:
+        """Get a profile of, or sample data from, a specific table."""
+        if mode == "profile":
+            return self._profile(table_name)
+        error = self._validate(table_name, sampling)
+        if error:
+            return error
+        return self._format_sample(table_name, self._execute_query(table_name, limit, sampling, stratify_by))
+
+    async def _arun(self, table_name: str, limit: int = 5, mode: str = SAMPLE_DATA_MODE,
+                    sampling: str = "auto", stratify_by: str | None = None, **kwargs) -> str:
+        """Async variant of _run; falls back to _run in a thread without asyncpg."""
+        if not ASYNCPG_AVAILABLE or mode == "profile":
+            # Profiling is a few short catalog queries on the psycopg2 pool
+            return await asyncio.to_thread(self._run, table_name, limit, mode, sampling, stratify_by, **kwargs)
+        error = self._validate(table_name, sampling)
+        if error:
+            return error
+        return self._format_sample(table_name, await self._aexecute_query(table_name, limit, sampling, stratify_by))
+
+    def _profile(self, table_name: str) -> str:
+        """Per-column statistics for a table, from pg_stats or a table sample, cached per table."""
+        logger = activity_logger_for(self.run_context)
+        current_agent = logger.get_current_status().get('current_agent', 'Unknown Agent')
         
-        # Validate table name to prevent SQL injection
         if not table_name.replace('_', '').isalnum():
             return "Error: Invalid table name. Only alphanumeric characters and underscores allowed."
         
-        query = f"SELECT * FROM {table_name} LIMIT {limit};"
+        conn_str = connection_string_for(self.run_context)
+        if not conn_str:
+            return "Error: NEONDB_CONN_STR is not set in environment."
+        
+        logger.log_tool_usage(current_agent, "Sample Data", f"Profiling table: {table_name}")
+        try:
+            profile, cached = get_profile_cache().get_profile(conn_str, table_name)
+        except Exception as e:
+            error_msg = f"Error profiling table: {e}"
+            logger.log_tool_usage(current_agent, "Sample Data", f"Profile failed: {error_msg}")
+            return error_msg
+        
+        logger.log_tool_usage(current_agent, "Sample Data",
+                              f"Profiled {len(profile.columns)} columns of {table_name} from {profile.source}"
+                              + (" (cached)" if cached else ""))
+        return render_table_profile(profile)
+
+    def _validate(self, table_name: str, sampling: str) -> str | None:
+        """Validate the arguments and log the request."""
+        logger = activity_logger_for(self.run_context)
+        current_agent = logger.get_current_status().get('current_agent', 'Unknown Agent')
+        
+        # Validate table name to prevent SQL injection
+        if not table_name.replace('_', '').isalnum():
+            return "Error: Invalid table name. Only alphanumeric characters and underscores allowed."
+        if sampling not in SAMPLE_METHODS:
+            return f"Error: Invalid sampling method '{sampling}'. Use one of: {', '.join(SAMPLE_METHODS)}."
         
         logger.log_tool_usage(current_agent, "Sample Data", f"Getting sample data from table: {table_name}")
+        return None
+
+    def _log_query(self, table_name: str, query: str):
+        logger = activity_logger_for(self.run_context)
+        current_agent = logger.get_current_status().get('current_agent', 'Unknown Agent')
         logger.log_sql_query(current_agent, query)
-        
-        sample_df = self._execute_query(query)
+
+    def _format_sample(self, table_name: str, sample_df) -> str:
+        logger = activity_logger_for(self.run_context)
+        current_agent = logger.get_current_status().get('current_agent', 'Unknown Agent')
         
         if isinstance(sample_df, str):
             logger.log_tool_usage(current_agent, "Sample Data", f"Sample data query failed: {sample_df}")
@@ -0,0 +1,100 @@
+# src/cogniquery_crew/tools/sandbox_limits.py
+
+import os
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional
+
+# Per-execution caps for agent Python code; 0 disables a cap
+PY_MEMORY_LIMIT_MB = int(os.getenv("COGNIQUERY_PY_MEMORY_LIMIT_MB", "2048"))
+PY_CPU_LIMIT_SECONDS = int(os.getenv("COGNIQUERY_PY_CPU_LIMIT", "60"))
+PY_MAX_OUTPUT_CHARS = int(os.getenv("COGNIQUERY_PY_MAX_OUTPUT_CHARS", "100000"))
+
+# Optional cgroup v2 directory, delegated to this user, under which every interpreter gets its own group
+PY_CGROUP_PARENT = os.getenv("COGNIQUERY_PY_CGROUP", "")
+# Memory for the whole interpreter, preloaded libraries included (default: the per-run cap plus headroom)
+PY_CGROUP_MEMORY_MB = int(os.getenv("COGNIQUERY_PY_CGROUP_MEMORY_MB", str(PY_MEMORY_LIMIT_MB + 512 if PY_MEMORY_LIMIT_MB else 0)))
+PY_CGROUP_CPUS = float(os.getenv("COGNIQUERY_PY_CGROUP_CPUS", "1"))
+_CPU_PERIOD_US = 100000
+
+
+@dataclass
+class ExecutionLimits:
+    """Caps the Python worker applies around one snippet."""
+    memory_mb: int = PY_MEMORY_LIMIT_MB  # address space the snippet may add
+    cpu_seconds: int = PY_CPU_LIMIT_SECONDS
+    output_chars: int = PY_MAX_OUTPUT_CHARS  # per stream, stdout and stderr
+
+    def to_job(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def limit_message(limit: str, limits: Optional[Dict[str, Any]]) -> str:
+    """Explain to the agent which cap stopped its code and how to stay under it."""
+    limits = limits or {}
+    if limit == "memory":
+        return (f"RESOURCE LIMIT: the code ran out of its {limits.get('memory_mb', PY_MEMORY_LIMIT_MB)} MB memory allowance. "
+                f"Aggregate or filter in SQL, select fewer columns, or process the data in chunks.")
+    return (f"RESOURCE LIMIT: the code used more than {limits.get('cpu_seconds', PY_CPU_LIMIT_SECONDS)} s of CPU time. "
+            f"Avoid row-by-row Python loops and aggregate in SQL or with vectorized pandas operations.")
+
+
+class ProcessCgroup:
+    """cgroup v2 group capping the memory and CPU of one interpreter process.
+
+    Best effort: when the parent directory is not a writable cgroup v2
+    hierarchy, a warning is printed and the process runs without it.
+    """
+
+    def __init__(self, name: str, parent: str = PY_CGROUP_PARENT,
+                 memory_mb: int = PY_CGROUP_MEMORY_MB, cpus: float = PY_CGROUP_CPUS):
+        self.path: Optional[str] = os.path.join(parent, name)
+        try:
+            os.mkdir(self.path)
+            if memory_mb > 0:
+                self._write("memory.max", str(memory_mb * 1024 * 1024))
+                self._write("memory.swap.max", "0", required=False)
+            if cpus > 0:
+                self._write("cpu.max", f"{int(cpus * _CPU_PERIOD_US)} {_CPU_PERIOD_US}")
+        except OSError as e:
+            print(f"Could not create cgroup {self.path}, running without it: {e}")
+            self.remove()
+
+    def _write(self, control: str, value: str, required: bool = True):
+        try:
+            with open(os.path.join(self.path, control), "w") as f:
+                f.write(value)
+        except OSError:
+            if required:
+                raise
+
+    def add(self, pid: int) -> bool:
+        """Move a started process into the group."""
+        if self.path is None:
+            return False
+        try:
+            self._write("cgroup.procs", str(pid))
+            return True
+        except OSError as e:
+            print(f"Could not move process {pid} into cgroup {self.path}: {e}")
+            return False
+
+    def remove(self):
+        """Delete the group once its process has exited."""
+        if self.path is None:
+            return
+        try:
+            os.rmdir(self.path)
+        except OSError:
+            pass
+        self.path = None
+
+
+def cgroup_for_process(pid: int) -> Optional[ProcessCgroup]:
+    """Put a freshly started interpreter in its own cgroup, if COGNIQUERY_PY_CGROUP is set."""
+    if not PY_CGROUP_PARENT:
+        return None
+    cgroup = ProcessCgroup(f"cogniquery-{os.getpid()}-{pid}")
+    if not cgroup.add(pid):
+        cgroup.remove()
+        return None
+    return cgroup
@@ -0,0 +1,178 @@
+# src/cogniquery_crew/tools/schema_cache.py
+
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Any, Optional
+from .connection_pool import get_connection_pool
+from .async_db import async_connection
+
+SCHEMA_CACHE_TTL_SECONDS = float(os.getenv("COGNIQUERY_SCHEMA_CACHE_TTL", "300"))
+CACHE_DIR = os.getenv("COGNIQUERY_CACHE_DIR", ".cache")
+
+# Cheap catalog fingerprint: any DDL on the schema rewrites the xmin of
+# the affected pg_class / pg_attribute / pg_constraint rows, COMMENT ON
+# rewrites the pg_description row of the table or column, and table rewrites
+# change relfilenode, so the digest changes whenever the schema does.
+FINGERPRINT_QUERY = """
+SELECT md5(
+    (SELECT coalesce(string_agg(c.oid::text || ':' || c.relfilenode::text || ':' || c.xmin::text, ',' ORDER BY c.oid), '')
+     FROM pg_catalog.pg_class c
+     WHERE c.relnamespace = (SELECT oid FROM pg_catalog.pg_namespace WHERE nspname = %(schema)s))
+    || '|' ||
+    (SELECT count(*)::text || ':' || coalesce(sum(a.xmin::text::bigint), 0)::text
+     FROM pg_catalog.pg_attribute a
+     JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+     WHERE c.relnamespace = (SELECT oid FROM pg_catalog.pg_namespace WHERE nspname = %(schema)s) AND a.attnum > 0)
+    || '|' ||
+    (SELECT count(*)::text || ':' || coalesce(sum(con.xmin::text::bigint), 0)::text
+     FROM pg_catalog.pg_constraint con
+     WHERE con.connamespace = (SELECT oid FROM pg_catalog.pg_namespace WHERE nspname = %(schema)s))
+    || '|' ||
+    (SELECT count(*)::text || ':' || coalesce(sum(d.xmin::text::bigint), 0)::text
+     FROM pg_catalog.pg_description d
+     JOIN pg_catalog.pg_class c ON c.oid = d.objoid AND d.classoid = 'pg_catalog.pg_class'::regclass
+     WHERE c.relnamespace = (SELECT oid FROM pg_catalog.pg_namespace WHERE nspname = %(schema)s))
+) AS fingerprint;
+"""
+ASYNC_FINGERPRINT_QUERY = FINGERPRINT_QUERY.replace("%(schema)s", "$1")
+
+
+class SchemaCache:
+    """TTL cache of schema introspection results, keyed by connection string.
+
+    Entries are served without touching the database while they are younger
+    than the TTL. Older entries are revalidated with a single fingerprint
+    query and only dropped when the catalog actually changed. Entries are
+    persisted to disk so a restarted app starts warm.
+    """
+
+    def __init__(self, ttl_seconds: float = SCHEMA_CACHE_TTL_SECONDS,
+                 cache_dir: str = os.path.join(CACHE_DIR, "schema")):
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir
+        self._entries: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, conn_str: str, name: str, schema: str = "public") -> Optional[Any]:
+        """Get a cached value, revalidating it against the fingerprint of `schema` if stale."""
+        entry = self._lookup(conn_str, name)
+        if entry is None:
+            return None
+        if self._is_fresh(entry):
+            return entry["value"]
+        return self._revalidate(conn_str, name, entry, self.fingerprint(conn_str, schema))
+
+    async def aget(self, conn_str: str, name: str, schema: str = "public") -> Optional[Any]:
+        """Async variant of get, revalidating through the asyncpg pool."""
+        entry = self._lookup(conn_str, name)
+        if entry is None:
+            return None
+        if self._is_fresh(entry):
+            return entry["value"]
+        return self._revalidate(conn_str, name, entry, await self.afingerprint(conn_str, schema))
+
+    def put(self, conn_str: str, name: str, value: Any, fingerprint: Optional[str]):
+        """Store a value together with the fingerprint it was computed under."""
+        if fingerprint is None:
+            return
+        with self._lock:
+            entries = self._load_entries(conn_str)
+            entries[name] = {"fingerprint": fingerprint, "value": value, "checked_at": time.time()}
+            self._persist(conn_str, entries)
+
+    def invalidate(self, conn_str: str, name: str | None = None):
+        """Drop one cached value, or everything cached for a connection."""
+        with self._lock:
+            entries = self._load_entries(conn_str)
+            if name is None:
+                entries.clear()
+            else:
+                entries.pop(name, None)
+            self._persist(conn_str, entries)
+
+    def fingerprint(self, conn_str: str, schema: str = "public") -> Optional[str]:
+        """Fetch the current catalog fingerprint of a schema, or None if the database is unreachable."""
+        try:
+            with get_connection_pool(conn_str).connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(FINGERPRINT_QUERY, {"schema": schema})
+                    return cursor.fetchone()[0]
+        except Exception as e:
+            print(f"Error fetching schema fingerprint: {e}")
+            return None
+
+    async def afingerprint(self, conn_str: str, schema: str = "public") -> Optional[str]:
+        """Async variant of fingerprint."""
+        try:
+            async with async_connection(conn_str) as conn:
+                return await conn.fetchval(ASYNC_FINGERPRINT_QUERY, schema)
+        except Exception as e:
+            print(f"Error fetching schema fingerprint: {e}")
+            return None
+
+    def _lookup(self, conn_str: str, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._load_entries(conn_str).get(name)
+
+    def _is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry["checked_at"] < self.ttl_seconds
+
+    def _revalidate(self, conn_str: str, name: str, entry: Dict[str, Any], fingerprint: Optional[str]) -> Optional[Any]:
+        """Keep a stale entry if the catalog fingerprint is unchanged, else drop it."""
+        if fingerprint is None or fingerprint != entry["fingerprint"]:
+            self.invalidate(conn_str, name)
+            return None
+        with self._lock:
+            entry["checked_at"] = time.time()
+        return entry["value"]
+
+    def _cache_path(self, conn_str: str) -> str:
+        # Hash the connection string so credentials never reach the disk
+        key = hashlib.sha256(conn_str.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_entries(self, conn_str: str) -> Dict[str, Dict[str, Any]]:
+        """Get the in-memory entries for a connection, reading them from disk on first use."""
+        if conn_str in self._entries:
+            return self._entries[conn_str]
+
+        entries = {}
+        path = self._cache_path(conn_str)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+                # Entries from a previous process are revalidated before use
+                for entry in entries.values():
+                    entry["checked_at"] = 0
+            except Exception as e:
+                print(f"Error loading schema cache: {e}")
+                entries = {}
+        self._entries[conn_str] = entries
+        return entries
+
+    def _persist(self, conn_str: str, entries: Dict[str, Dict[str, Any]]):
+        """Atomically write the entries for a connection to disk."""
+        path = self._cache_path(conn_str)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error saving schema cache: {e}")
+
+
+# Global schema cache instance
+_schema_cache_instance = None
+
+def get_schema_cache() -> SchemaCache:
+    """Get the global schema cache instance."""
+    global _schema_cache_instance
+    if _schema_cache_instance is None:
+        _schema_cache_instance = SchemaCache()
+    return _schema_cache_instance
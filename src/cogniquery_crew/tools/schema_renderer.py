@@ -0,0 +1,96 @@
+# src/cogniquery_crew/tools/schema_renderer.py
+
+from typing import Dict, List, Tuple
+from .catalog_introspection import CatalogSnapshot, TableInfo
+
+# Renderers build a list of lines with dict/set indexes per table and join
+# once at the end, so cost is linear in the number of columns.
+
+
+def _relationships(tables: List[TableInfo]) -> List[Tuple[str, str, str, str]]:
+    """Flatten foreign keys into (source_table, source_column, target_table, target_column) tuples."""
+    return [
+        (table.name, source_column, fk.target_table, target_column)
+        for table in tables
+        for fk in table.foreign_keys
+        for source_column, target_column in zip(fk.columns, fk.target_columns)
+    ]
+
+
+def _fk_index(table: TableInfo) -> Dict[str, Tuple[str, str]]:
+    """Map each source column to its first foreign key target."""
+    index = {}
+    for fk in table.foreign_keys:
+        for source_column, target_column in zip(fk.columns, fk.target_columns):
+            index.setdefault(source_column, (fk.target_table, target_column))
+    return index
+
+
+def _summary_lines(tables: List[TableInfo], relationship_count: int) -> List[str]:
+    return [
+        "📈 SCHEMA SUMMARY:",
+        f"  - Total tables: {len(tables)}",
+        f"  - Total columns: {sum(len(t.columns) for t in tables)}",
+        f"  - Primary key constraints: {sum(len(t.primary_key) for t in tables)}",
+        f"  - Foreign key relationships: {relationship_count}",
+        "",
+    ]
+
+
+def render_schema_explorer(snapshot: CatalogSnapshot) -> str:
+    """Render a snapshot in the SchemaExplorer tool format."""
+    tables = sorted(snapshot.tables, key=lambda t: t.name)
+    lines = ["=== DATABASE SCHEMA ANALYSIS ===", ""]
+
+    for table in tables:
+        primary_key = set(table.primary_key)
+        lines.append(f"📊 TABLE: {table.name}")
+        for col in table.columns:
+            pk_indicator = " (PK)" if col.name in primary_key else ""
+            nullable = "NULL" if col.is_nullable else "NOT NULL"
+            default = f", DEFAULT: {col.default}" if col.default else ""
+            lines.append(f"  • {col.name}: {col.data_type}{pk_indicator} ({nullable}{default})")
+
+        if table.foreign_keys:
+            lines.append("  Foreign Keys:")
+            for fk in table.foreign_keys:
+                for source_column, target_column in zip(fk.columns, fk.target_columns):
+                    lines.append(f"    • {source_column} -> {fk.target_table}.{target_column}")
+        lines.append("")
+
+    relationships = _relationships(tables)
+    if relationships:
+        lines.append("🔗 TABLE RELATIONSHIPS:")
+        lines.extend(f"  • {st}.{sc} -> {tt}.{tc}" for st, sc, tt, tc in relationships)
+        lines.append("")
+
+    lines.extend(_summary_lines(tables, len(relationships)))
+    return "\n".join(lines)
+
+
+def render_database_tools(snapshot: CatalogSnapshot) -> str:
+    """Render a snapshot in the DatabaseTools format."""
+    tables = sorted(snapshot.tables, key=lambda t: t.name)
+    lines = ["=== DATABASE SCHEMA ANALYSIS ===", ""]
+
+    for table in tables:
+        primary_key = set(table.primary_key)
+        fk_index = _fk_index(table)
+        lines.append(f"📊 Table: {table.name}")
+        for col in table.columns:
+            pk_marker = " [PRIMARY KEY]" if col.name in primary_key else ""
+            target = fk_index.get(col.name)
+            fk_marker = f" [FK → {target[0]}.{target[1]}]" if target else ""
+            nullable_info = "" if col.is_nullable else " NOT NULL"
+            default_info = f" DEFAULT {col.default}" if col.default else ""
+            lines.append(f"  - {col.name} ({col.data_type}){pk_marker}{fk_marker}{nullable_info}{default_info}")
+        lines.append("")
+
+    relationships = _relationships(tables)
+    if relationships:
+        lines.append("🔗 TABLE RELATIONSHIPS:")
+        lines.extend(f"  - {st}.{sc} → {tt}.{tc}" for st, sc, tt, tc in relationships)
+        lines.append("")
+
+    lines.extend(_summary_lines(tables, len(relationships)))
+    return "\n".join(lines)
@@ -0,0 +1,226 @@
+# src/cogniquery_crew/tools/schema_retrieval.py
+
+import re
+import math
+import hashlib
+import threading
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Optional
+from .catalog_introspection import CatalogSnapshot, TableInfo
+from .schema_renderer import render_schema_explorer
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Table names say more about relevance than individual column names
+TABLE_NAME_WEIGHT = 3
+
+# Longest FK chain considered when connecting two relevant tables
+MAX_JOIN_HOPS = 3
+
+# Indexes kept for reuse, one per database, schema and catalog fingerprint
+SCHEMA_INDEX_CACHE_SIZE = 16
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it",
+    "me", "my", "of", "on", "or", "our", "show", "that", "the", "their", "this", "to", "what",
+    "which", "with", "find", "give", "top", "each", "per", "all", "most", "using", "create",
+    "chart", "charts", "visualization", "visualizations", "analysis", "analyze",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Split identifiers and prose into lowercase, lightly stemmed terms."""
+    if not text:
+        return []
+    # Break camelCase before splitting on anything that is not a letter or digit
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    terms = []
+    for word in re.split(r"[^A-Za-z0-9]+", text.lower()):
+        if not word or word in STOPWORDS:
+            continue
+        terms.append(_stem(word))
+    return terms
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+@dataclass
+class JoinStep:
+    source_table: str
+    source_columns: List[str]
+    target_table: str
+    target_columns: List[str]
+
+    def condition(self) -> str:
+        return " AND ".join(
+            f"{self.source_table}.{source} = {self.target_table}.{target}"
+            for source, target in zip(self.source_columns, self.target_columns)
+        )
+
+
+@dataclass
+class SchemaSelection:
+    """Tables chosen for a query, with their scores and the join paths between them."""
+    tables: List[TableInfo]
+    scores: Dict[str, float]
+    join_paths: List[Tuple[str, str, List[JoinStep]]] = field(default_factory=list)
+    total_tables: int = 0
+
+
+class SchemaIndex:
+    """BM25 index over table names, column names and comments of a catalog snapshot."""
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.snapshot = snapshot
+        self.tables: Dict[str, TableInfo] = {table.name: table for table in snapshot.tables}
+        self._term_freqs: Dict[str, Counter] = {}
+        self._doc_freqs: Counter = Counter()
+
+        for table in snapshot.tables:
+            terms = tokenize(table.name) * TABLE_NAME_WEIGHT
+            terms += tokenize(table.comment or "")
+            for col in table.columns:
+                terms += tokenize(col.name)
+                terms += tokenize(col.comment or "")
+            for fk in table.foreign_keys:
+                terms += tokenize(fk.target_table)
+            counts = Counter(terms)
+            self._term_freqs[table.name] = counts
+            self._doc_freqs.update(counts.keys())
+
+        doc_count = max(len(self._term_freqs), 1)
+        self._avg_length = sum(sum(c.values()) for c in self._term_freqs.values()) / doc_count
+        self._idf = {
+            term: math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            for term, df in self._doc_freqs.items()
+        }
+
+        # Undirected FK graph: table -> [(neighbour, JoinStep)]
+        self._edges: Dict[str, List[Tuple[str, JoinStep]]] = {name: [] for name in self.tables}
+        for table in snapshot.tables:
+            for fk in table.foreign_keys:
+                if fk.target_table not in self.tables:
+                    continue
+                step = JoinStep(table.name, fk.columns, fk.target_table, fk.target_columns)
+                self._edges[table.name].append((fk.target_table, step))
+                self._edges[fk.target_table].append((table.name, step))
+
+    def score(self, query: str) -> Dict[str, float]:
+        """BM25 score of every table with at least one matching term."""
+        query_terms = set(tokenize(query))
+        scores = {}
+        for table_name, counts in self._term_freqs.items():
+            length = sum(counts.values())
+            total = 0.0
+            for term in query_terms:
+                tf = counts.get(term)
+                if not tf:
+                    continue
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / (self._avg_length or 1))
+                total += self._idf[term] * tf * (BM25_K1 + 1) / norm
+            if total > 0:
+                scores[table_name] = total
+        return scores
+
+    def join_path(self, start: str, end: str, max_hops: int = MAX_JOIN_HOPS) -> Optional[List[JoinStep]]:
+        """Shortest FK path between two tables, or None if they are not connected."""
+        previous: Dict[str, Tuple[str, JoinStep]] = {}
+        visited = {start}
+        queue = deque([(start, 0)])
+        while queue:
+            table, hops = queue.popleft()
+            if table == end:
+                path = []
+                while table != start:
+                    table, step = previous[table]
+                    path.append(step)
+                return list(reversed(path))
+            if hops >= max_hops:
+                continue
+            for neighbour, step in self._edges.get(table, []):
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    previous[neighbour] = (table, step)
+                    queue.append((neighbour, hops + 1))
+        return None
+
+    def select(self, query: str, top_k: int = 5) -> SchemaSelection:
+        """Pick the top-k tables for a query and add the tables needed to join them."""
+        scores = self.score(query)
+        ranked = sorted(scores, key=lambda name: (-scores[name], name))[:top_k]
+        if not ranked:
+            # Nothing matched lexically: fall back to the most connected tables
+            ranked = sorted(self.tables, key=lambda name: (-len(self._edges[name]), name))[:top_k]
+
+        selected = list(ranked)
+        join_paths = []
+        for i, start in enumerate(ranked):
+            for end in ranked[i + 1:]:
+                path = self.join_path(start, end)
+                if not path:
+                    continue
+                join_paths.append((start, end, path))
+                for step in path:
+                    for table_name in (step.source_table, step.target_table):
+                        if table_name not in selected:
+                            selected.append(table_name)
+
+        return SchemaSelection(
+            tables=[self.tables[name] for name in selected],
+            scores=scores,
+            join_paths=join_paths,
+            total_tables=len(self.tables),
+        )
+
+
+# Indexes of recent snapshots, least recently used first
+_schema_indexes: "OrderedDict[Tuple[str, str, str], SchemaIndex]" = OrderedDict()
+_schema_indexes_lock = threading.Lock()
+
+def get_schema_index(snapshot: CatalogSnapshot, conn_str: str) -> SchemaIndex:
+    """The BM25 index of a database's snapshot, built once per catalog fingerprint instead of on every call."""
+    if snapshot.fingerprint is None:
+        return SchemaIndex(snapshot)
+    # Hash the connection string so credentials are not kept around in the key
+    database = hashlib.sha256(conn_str.encode("utf-8")).hexdigest()[:32]
+    key = (database, snapshot.schema, snapshot.fingerprint)
+    with _schema_indexes_lock:
+        index = _schema_indexes.get(key)
+        if index is not None:
+            _schema_indexes.move_to_end(key)
+            return index
+    index = SchemaIndex(snapshot)
+    with _schema_indexes_lock:
+        _schema_indexes[key] = index
+        while len(_schema_indexes) > SCHEMA_INDEX_CACHE_SIZE:
+            _schema_indexes.popitem(last=False)
+    return index
+
+
+def render_schema_selection(selection: SchemaSelection, query: str) -> str:
+    """Render the pruned schema followed by the join paths between the chosen tables."""
+    lines = [
+        f"🎯 RELEVANT SCHEMA for: {query}",
+        f"  Showing {len(selection.tables)} of {selection.total_tables} tables. "
+        f"Call SchemaExplorer() without a query for the full schema.",
+        "",
+    ]
+    pruned = CatalogSnapshot(schema="public", tables=selection.tables)
+    lines.append(render_schema_explorer(pruned))
+
+    if selection.join_paths:
+        lines.append("🧭 JOIN PATHS:")
+        for start, end, path in selection.join_paths:
+            lines.append(f"  • {start} ↔ {end}:")
+            lines.extend(f"      JOIN ON {step.condition()}" for step in path)
+        lines.append("")
+    return "\n".join(lines)
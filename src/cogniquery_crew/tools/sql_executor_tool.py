@@ -1,14 +1,20 @@
 # src/cogniquery_crew/tools/sql_executor_tool.py
 
 import os
+import asyncio
 from dotenv import load_dotenv
 load_dotenv()
-import psycopg2
 import pandas as pd
-from crewai.tools import BaseTool
-from .activity_logger import get_activity_logger
+from typing import Optional
+from .async_tool import AsyncNativeTool
+from .run_context import RunContext, activity_logger_for, result_store_for, connection_string_for
+from .connection_pool import get_connection_pool
+from .async_db import async_connection, ASYNCPG_AVAILABLE
+from .result_streaming import stream_query, astream_query
+from .query_cache import get_query_cache, mark_cached
+from .query_guard import SQL_MAX_COST, guard_query, aguard_query
 
-class SQLExecutorTool(BaseTool):
+class SQLExecutorTool(AsyncNativeTool):
     name: str = "SQLExecutor"
     description: str = """Executes SQL queries on the NeonDB PostgreSQL database and returns results in CSV format.
     
@@ -33,57 +39,188 @@ class SQLExecutorTool(BaseTool):
     - SQLExecutor(sql_query="SELECT * FROM regions WHERE region_name = 'Southeast Asia'")
     - SQLExecutor(sql_query="SELECT COUNT(*) FROM orders WHERE profit < 0")
     - SQLExecutor(sql_query="SELECT p.sub_category, SUM(o.sales) FROM products p JOIN orders o ON p.product_id = o.product_id GROUP BY p.sub_category")
-    - SQLExecutor(sql_query="SELECT region_name, STRING_AGG(country, ', ') FROM regions GROUP BY region_name")"""
+    - SQLExecutor(sql_query="SELECT region_name, STRING_AGG(country, ', ') FROM regions GROUP BY region_name")
+    
+    Every result is saved under a Result ID. Pass it to LocalCodeExecutor(code=..., result_ids=['res_...'])
+    to get the full result as a DataFrame named `df` - do NOT paste CSV data into your code.
+    Large results are truncated to a row and byte budget; the output says when this happened.
+    Queries are checked with EXPLAIN first: very expensive ones get a LIMIT added or are rejected
+    with a plan summary showing where the cost comes from, so you can fix the query."""
+    run_context: Optional[RunContext] = None  # set per run by CogniQueryCrew
+
+    # Result budgets for streamed execution
+    max_rows: int = int(os.getenv("COGNIQUERY_SQL_MAX_ROWS", "100000"))
+    max_result_bytes: int = int(os.getenv("COGNIQUERY_SQL_MAX_BYTES", "20000000"))
+    fetch_batch_size: int = 500
+    # Results up to this CSV size are shown inline; larger ones only as a preview
+    inline_result_bytes: int = int(os.getenv("COGNIQUERY_SQL_INLINE_BYTES", "8000"))
+    preview_rows: int = 20
+    use_query_cache: bool = True
+    # Queries the planner costs above this are rewritten with a LIMIT or rejected (0 disables)
+    max_query_cost: float = SQL_MAX_COST
+
+    def _cache_settings(self) -> str:
+        # The budgets and the cost guard shape the result, so a result is only reused under the same ones
+        return f"{self.max_rows}:{self.max_result_bytes}:{self.max_query_cost}"
 
     def _execute_query(self, query: str, db_connection_string: str | None = None):
-        """Helper function to execute a query and return a pandas DataFrame."""
-        conn_str = db_connection_string or os.getenv("NEONDB_CONN_STR")
+        """Helper function to stream a query within the result budget and return a StreamedResult."""
+        conn_str = connection_string_for(self.run_context, db_connection_string)
         if not conn_str:
             return "Error: NEONDB_CONN_STR is not set in environment."
         
-        conn = None
+        # Serve repeated read-only queries from the result cache while their tables are unchanged
+        query_cache = get_query_cache()
+        cache_key = query_cache.make_key(conn_str, query, self._cache_settings()) if self.use_query_cache else None
+        signatures = None
+        if cache_key:
+            key, normalized = cache_key
+            cached = query_cache.get(conn_str, key)
+            if cached is not None:
+                return mark_cached(cached)
+            signatures = query_cache.table_signatures(conn_str, normalized.tables)
+        
+        try:
+            with get_connection_pool(conn_str).connection() as conn:
+                decision = guard_query(conn, query, self.max_query_cost, self.max_rows)
+                if decision.action == "reject":
+                    return decision.message
+                result = stream_query(
+                    conn,
+                    decision.query,
+                    max_rows=self.max_rows,
+                    max_bytes=self.max_result_bytes,
+                    batch_size=self.fetch_batch_size,
+                )
+        except Exception as e:
+            return f"Error executing query: {e}"
+        
+        result.guard_note = decision.message
+        if cache_key:
+            size = int(result.dataframe.memory_usage(deep=True).sum())
+            query_cache.put(key, result, signatures, size)
+        return result
+
+    async def _aexecute_query(self, query: str, db_connection_string: str | None = None):
+        """Async variant of _execute_query on the asyncpg pool."""
+        conn_str = connection_string_for(self.run_context, db_connection_string)
+        if not conn_str:
+            return "Error: NEONDB_CONN_STR is not set in environment."
+        
+        query_cache = get_query_cache()
+        cache_key = query_cache.make_key(conn_str, query, self._cache_settings()) if self.use_query_cache else None
+        signatures = None
+        if cache_key:
+            key, normalized = cache_key
+            cached = await query_cache.aget(conn_str, key)
+            if cached is not None:
+                return mark_cached(cached)
+            signatures = await query_cache.atable_signatures(conn_str, normalized.tables)
+        
         try:
-            conn = psycopg2.connect(conn_str)
-            return pd.read_sql_query(query, conn)
+            async with async_connection(conn_str) as conn:
+                decision = await aguard_query(conn, query, self.max_query_cost, self.max_rows)
+                if decision.action == "reject":
+                    return decision.message
+                result = await astream_query(
+                    conn,
+                    decision.query,
+                    max_rows=self.max_rows,
+                    max_bytes=self.max_result_bytes,
+                    batch_size=self.fetch_batch_size,
+                )
         except Exception as e:
             return f"Error executing query: {e}"
-        finally:
-            if conn:
-                conn.close()
+        
+        result.guard_note = decision.message
+        if cache_key:
+            size = int(result.dataframe.memory_usage(deep=True).sum())
+            query_cache.put(key, result, signatures, size)
+        return result
 
     def _run(self, sql_query: str, **kwargs) -> str:
         """Execute SQL query and return results."""
-        logger = get_activity_logger()
+        logger, current_agent = self._log_query(sql_query)
+        result = self._execute_query(sql_query)
+        return self._format_result(sql_query, result, logger, current_agent)
+
+    async def _arun(self, sql_query: str, **kwargs) -> str:
+        """Async variant of _run; falls back to _run in a thread without asyncpg."""
+        if not ASYNCPG_AVAILABLE:
+            return await asyncio.to_thread(self._run, sql_query, **kwargs)
+        logger, current_agent = self._log_query(sql_query)
+        result = await self._aexecute_query(sql_query)
+        return self._format_result(sql_query, result, logger, current_agent)
+
+    def _log_query(self, sql_query: str):
+        logger = activity_logger_for(self.run_context)
         current_status = logger.get_current_status()
         current_agent = current_status.get('current_agent', 'Data Scientist')
         
         # Log the SQL query being executed
         logger.log_sql_query(current_agent, sql_query)
         logger.log_tool_usage(current_agent, "SQL Executor", f"Executing SQL query")
+        return logger, current_agent
+
+    def _format_result(self, sql_query: str, result, logger, current_agent: str) -> str:
+        """Store the result and build the agent-facing answer."""
+        if isinstance(result, str):  # Error occurred
+            logger.log_tool_usage(current_agent, "SQL Executor", f"Query failed: {result}")
+            return result
         
-        result_df = self._execute_query(sql_query)
+        result_df = result.dataframe
         
-        if isinstance(result_df, str):  # Error occurred
-            logger.log_tool_usage(current_agent, "SQL Executor", f"Query failed: {result_df}")
-            return result_df
+        # Hand the full result off out-of-band as a columnar artifact
+        try:
+            result_id = result_store_for(self.run_context).save(result_df, sql_query)
+        except Exception as e:
+            result_id = None
+            logger.log_tool_usage(current_agent, "SQL Executor", f"Could not store result artifact: {e}")
         
         # Log successful execution with result preview
         result_csv = result_df.to_csv(index=False)
         result_preview = f"Query returned {len(result_df)} rows"
+        if result.truncated:
+            result_preview += f" (truncated: {result.truncation_reason})"
+        if result.guard_note:
+            result_preview += " (LIMIT added by cost guard)"
+        if result.from_cache:
+            result_preview += " (served from query cache)"
+        if result_id:
+            result_preview += f", stored as {result_id}"
         if len(result_df) > 0:
             result_preview += f". Sample data:\n{result_df.head(3).to_string()}"
         
         logger.log_tool_usage(current_agent, "SQL Executor", f"Query executed successfully: {result_preview}")
         
-        # Add instruction for the agent to use Code Interpreter for visualization
-        result_with_instruction = f"""SQL Query Results (CSV format):
-{result_csv}
-
-NEXT STEP REQUIRED: Use Code Interpreter tool to create charts from this data!
+        if len(result_csv.encode("utf-8")) <= self.inline_result_bytes or result_id is None:
+            data_section = f"SQL Query Results (CSV format):\n{result_csv}"
+        else:
+            preview_csv = result_df.head(self.preview_rows).to_csv(index=False)
+            data_section = (f"SQL Query Results (CSV preview, first {min(self.preview_rows, len(result_df))} of "
+                            f"{len(result_df)} rows - the full result is in the artifact below):\n{preview_csv}")
+        
+        if result_id:
+            next_step = f"""NEXT STEP REQUIRED: Use Code Interpreter tool to create charts from this data!
+- Result ID: {result_id}
+- Call LocalCodeExecutor(code='...', result_ids=['{result_id}'])
+- The full result is preloaded as a pandas DataFrame named `df` (also `results['{result_id}']`)
+- Do NOT copy the CSV data into your code
+- Create visualizations with matplotlib.pyplot
+- Save charts with plt.savefig('output/chart_1.png')"""
+        else:
+            next_step = """NEXT STEP REQUIRED: Use Code Interpreter tool to create charts from this data!
 - Copy the CSV data above into your Python code
 - Use pd.read_csv(io.StringIO(csv_data)) to convert to DataFrame
 - Create visualizations with matplotlib.pyplot
-- Save charts with plt.savefig('output/chart_1.png')
+- Save charts with plt.savefig('output/chart_1.png')"""
+        
+        # Add instruction for the agent to use Code Interpreter for visualization
+        guard_note = f"{result.guard_note}\n" if result.guard_note else ""
+        result_with_instruction = f"""{data_section}
+{guard_note}{result.truncation_note()}
+
+{next_step}
 
 REMEMBER: Charts will only appear in the UI if you use Code Interpreter + plt.savefig()!
 """
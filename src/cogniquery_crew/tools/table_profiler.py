@@ -0,0 +1,223 @@
+# src/cogniquery_crew/tools/table_profiler.py
+
+import os
+import time
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Optional, Any
+import pandas as pd
+from .connection_pool import get_connection_pool
+from .table_sampling import table_sample_info, build_sample_query, set_statement_timeout
+
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("COGNIQUERY_PROFILE_CACHE_TTL", "3600"))
+# Rows read when a table has no planner statistics
+PROFILE_SAMPLE_ROWS = int(os.getenv("COGNIQUERY_PROFILE_SAMPLE_ROWS", "10000"))
+PROFILE_TOP_VALUES = 5
+# Longest value shown in a profile
+MAX_VALUE_LENGTH = 40
+
+# Planner statistics gathered by ANALYZE; anyarray columns are cast to text[]
+PG_STATS_QUERY = """
+SELECT attname, null_frac, n_distinct,
+       most_common_vals::text::text[] AS most_common_vals,
+       most_common_freqs,
+       histogram_bounds::text::text[] AS histogram_bounds
+FROM pg_catalog.pg_stats
+WHERE schemaname = 'public' AND tablename = %s;
+"""
+
+# Changes whenever rows are modified or the table is re-analyzed
+PROFILE_SIGNATURE_QUERY = """
+SELECT n_tup_ins, n_tup_upd, n_tup_del, last_analyze, last_autoanalyze
+FROM pg_catalog.pg_stat_user_tables
+WHERE schemaname = 'public' AND relname = %s;
+"""
+
+
+@dataclass
+class ColumnProfile:
+    name: str
+    data_type: str
+    null_fraction: Optional[float] = None
+    distinct: Optional[int] = None
+    min_value: Optional[str] = None
+    max_value: Optional[str] = None
+    top_values: List[Tuple[str, float]] = field(default_factory=list)
+
+
+@dataclass
+class TableProfile:
+    """Per-column statistics of a table and where they came from."""
+    table: str
+    row_estimate: Optional[int]
+    columns: List[ColumnProfile]
+    source: str  # "pg_stats" or "sample"
+    sampled_rows: int = 0
+
+
+def _short(value: Any) -> str:
+    text = str(value)
+    return text if len(text) <= MAX_VALUE_LENGTH else text[:MAX_VALUE_LENGTH - 1] + "…"
+
+
+def _typed_sort_key(value: str):
+    # pg_stats hands values back as text; order numbers numerically
+    try:
+        return (0, float(value), "")
+    except ValueError:
+        return (1, 0.0, value)
+
+
+def _profile_from_pg_stats(table: str, row_estimate: int, columns: List[Dict[str, str]],
+                           stats: Dict[str, tuple], top_values: int) -> TableProfile:
+    profiles = []
+    for column in columns:
+        null_frac, n_distinct, common_values, common_freqs, bounds = stats[column["name"]]
+        # Negative n_distinct is a fraction of the row count
+        distinct = int(round(-n_distinct * row_estimate)) if n_distinct < 0 else int(n_distinct)
+        # The histogram leaves out the most common values, so both bound the range
+        candidates = (list(common_values or []) + ([bounds[0], bounds[-1]] if bounds else []))
+        min_value = max_value = None
+        if candidates:
+            ordered = sorted(candidates, key=_typed_sort_key)
+            min_value, max_value = ordered[0], ordered[-1]
+        top = list(zip(common_values or [], common_freqs or []))[:top_values]
+        profiles.append(ColumnProfile(
+            name=column["name"],
+            data_type=column["data_type"],
+            null_fraction=null_frac,
+            distinct=distinct,
+            min_value=min_value,
+            max_value=max_value,
+            top_values=top,
+        ))
+    return TableProfile(table=table, row_estimate=row_estimate, columns=profiles, source="pg_stats")
+
+
+def _profile_from_sample(table: str, row_estimate: Optional[int], columns: List[Dict[str, str]],
+                         sample_df: pd.DataFrame, top_values: int) -> TableProfile:
+    profiles = []
+    rows = len(sample_df)
+    for column in columns:
+        values = sample_df[column["name"]]
+        present = values.dropna()
+        profile = ColumnProfile(
+            name=column["name"],
+            data_type=column["data_type"],
+            null_fraction=float(values.isna().mean()) if rows else None,
+        )
+        try:
+            profile.distinct = int(present.nunique())
+        except TypeError:  # unhashable values such as json or arrays
+            present = present.astype(str)
+            profile.distinct = int(present.nunique())
+        if len(present):
+            try:
+                profile.min_value, profile.max_value = present.min(), present.max()
+            except TypeError:
+                pass
+            # Top values only say something when values repeat
+            if profile.distinct < len(present):
+                counts = present.value_counts(normalize=True).head(top_values)
+                profile.top_values = [(value, float(freq)) for value, freq in counts.items() if freq * len(present) > 1]
+        profiles.append(profile)
+    return TableProfile(table=table, row_estimate=row_estimate, columns=profiles, source="sample", sampled_rows=rows)
+
+
+def compute_table_profile(conn_str: str, table: str,
+                          sample_rows: int = PROFILE_SAMPLE_ROWS,
+                          top_values: int = PROFILE_TOP_VALUES) -> TableProfile:
+    """Profile a table from pg_stats, or from a random TABLESAMPLE sample if it was never analyzed."""
+    with get_connection_pool(conn_str).connection() as conn:
+        with conn.cursor() as cursor:
+            info = table_sample_info(cursor, table)
+            columns, row_estimate = info.columns, info.row_estimate
+
+            stats = {}
+            if info.analyzed:
+                cursor.execute(PG_STATS_QUERY, (table,))
+                stats = {row[0]: row[1:] for row in cursor.fetchall()}
+            if stats and all(column["name"] in stats for column in columns):
+                return _profile_from_pg_stats(table, row_estimate, columns, stats, top_values)
+
+            set_statement_timeout(cursor)
+            cursor.execute(build_sample_query(info, sample_rows))
+            sample_df = pd.DataFrame.from_records(cursor.fetchall(), columns=[desc[0] for desc in cursor.description])
+    return _profile_from_sample(table, row_estimate, columns, sample_df, top_values)
+
+
+def render_table_profile(profile: TableProfile) -> str:
+    """Render a profile as compact per-column lines for the agent."""
+    if profile.source == "pg_stats":
+        origin = "planner statistics (pg_stats)"
+    else:
+        origin = f"a sample of {profile.sampled_rows} rows"
+    size = f"~{profile.row_estimate:,} rows" if profile.row_estimate is not None else "row count unknown"
+    lines = [f"📊 PROFILE of table '{profile.table}' ({size}; from {origin}):"]
+    for column in profile.columns:
+        parts = []
+        if column.null_fraction is not None:
+            parts.append(f"nulls {column.null_fraction:.0%}")
+        if column.distinct is not None:
+            parts.append(f"{'~' if profile.source == 'pg_stats' else ''}{column.distinct:,} distinct")
+        if column.min_value is not None:
+            parts.append(f"range {_short(column.min_value)} … {_short(column.max_value)}")
+        if column.top_values:
+            parts.append("top: " + ", ".join(f"{_short(value)} ({freq:.0%})" for value, freq in column.top_values))
+        lines.append(f"  • {column.name} ({column.data_type}): {'; '.join(parts) or 'no data'}")
+    return "\n".join(lines)
+
+
+class TableProfileCache:
+    """Table profiles keyed by connection and table, revalidated against pg_stat_user_tables.
+
+    A profile is reused while it is younger than the TTL and the table has
+    neither been modified nor re-analyzed since it was computed.
+    """
+
+    def __init__(self, ttl_seconds: float = PROFILE_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get_profile(self, conn_str: str, table: str) -> Tuple[TableProfile, bool]:
+        """Return (profile, served_from_cache), computing the profile on a miss."""
+        signature = self.signature(conn_str, table)
+        with self._lock:
+            entry = self._entries.get((conn_str, table))
+        if (entry is not None and signature is not None and entry["signature"] == signature
+                and time.monotonic() - entry["created"] < self.ttl_seconds):
+            return entry["profile"], True
+
+        profile = compute_table_profile(conn_str, table)
+        if signature is not None:
+            with self._lock:
+                self._entries[(conn_str, table)] = {"profile": profile, "signature": signature, "created": time.monotonic()}
+        return profile, False
+
+    def signature(self, conn_str: str, table: str) -> Optional[tuple]:
+        try:
+            with get_connection_pool(conn_str).connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(PROFILE_SIGNATURE_QUERY, (table,))
+                    return cursor.fetchone()
+        except Exception as e:
+            print(f"Error fetching table statistics for profile cache: {e}")
+            return None
+
+    def invalidate(self, conn_str: str, table: str | None = None):
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == conn_str and (table is None or key[1] == table):
+                    del self._entries[key]
+
+
+# Global profile cache instance
+_profile_cache_instance = None
+
+def get_profile_cache() -> TableProfileCache:
+    """Get the global table profile cache instance."""
+    global _profile_cache_instance
+    if _profile_cache_instance is None:
+        _profile_cache_instance = TableProfileCache()
+    return _profile_cache_instance
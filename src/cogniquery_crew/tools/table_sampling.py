@@ -0,0 +1,157 @@
+# src/cogniquery_crew/tools/table_sampling.py
+
+import os
+import json
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Fixed seed for TABLESAMPLE ... REPEATABLE, so repeated samples agree
+SAMPLE_SEED = int(os.getenv("COGNIQUERY_SAMPLE_SEED", "42"))
+# Tables at least this large are sampled by block (SYSTEM) rather than by row (BERNOULLI)
+SAMPLE_SYSTEM_MIN_ROWS = int(os.getenv("COGNIQUERY_SAMPLE_SYSTEM_MIN_ROWS", "1000000"))
+# Guard against sampling queries that scan more than expected
+SAMPLE_STATEMENT_TIMEOUT_MS = int(os.getenv("COGNIQUERY_SAMPLE_TIMEOUT_MS", "5000"))
+# Rows drawn before they are spread across the strata of a column
+STRATIFY_POOL_ROWS = int(os.getenv("COGNIQUERY_STRATIFY_POOL_ROWS", "10000"))
+# Sample this many times the rows needed; the surplus is shuffled away
+OVERSAMPLE_FACTOR = 2
+# Block samples never read fewer pages than this
+SYSTEM_MIN_PAGES = 8
+
+SAMPLE_METHODS = ("auto", "bernoulli", "system", "none")
+
+# Plain tables, materialized views and partitioned tables accept TABLESAMPLE; views do not
+_SAMPLEABLE_KINDS = ("r", "m", "p")
+
+TABLE_SAMPLE_INFO_QUERY = """
+SELECT c.relkind::text, c.reltuples::bigint, c.relpages,
+       (SELECT s.n_live_tup FROM pg_catalog.pg_stat_user_tables s WHERE s.relid = c.oid),
+       (SELECT json_agg(json_build_object('name', a.attname, 'data_type', format_type(a.atttypid, a.atttypmod))
+                        ORDER BY a.attnum)
+        FROM pg_catalog.pg_attribute a
+        WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped)
+FROM pg_catalog.pg_class c
+WHERE c.oid = to_regclass(%s);
+"""
+
+ASYNC_TABLE_SAMPLE_INFO_QUERY = TABLE_SAMPLE_INFO_QUERY.replace("%s", "$1")
+
+
+@dataclass
+class TableSampleInfo:
+    """Size and shape of a table, as needed to plan a sample of it."""
+    table: str
+    kind: str
+    analyzed: bool
+    row_estimate: Optional[int]
+    pages: int
+    columns: List[Dict[str, str]]
+
+    @property
+    def supports_tablesample(self) -> bool:
+        return self.kind in _SAMPLEABLE_KINDS
+
+    @property
+    def column_names(self) -> List[str]:
+        return [column["name"] for column in self.columns]
+
+
+def quote_ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _info_from_row(table: str, row) -> TableSampleInfo:
+    if row is None or row[4] is None:
+        raise ValueError(f"Table '{table}' does not exist")
+    kind, reltuples, pages, live_tuples, columns = row
+    if isinstance(columns, str):  # asyncpg returns json as text
+        columns = json.loads(columns)
+    # reltuples is -1 (or 0 on older servers) for tables never vacuumed or analyzed;
+    # the statistics collector's live row count is the next best estimate
+    analyzed = bool(reltuples and reltuples > 0)
+    return TableSampleInfo(
+        table=table,
+        kind=kind,
+        analyzed=analyzed,
+        row_estimate=reltuples if analyzed else (live_tuples or None),
+        pages=pages or 0,
+        columns=columns,
+    )
+
+
+def table_sample_info(cursor, table: str) -> TableSampleInfo:
+    """Look up the sampling info of a public table on an open psycopg2 cursor."""
+    cursor.execute(TABLE_SAMPLE_INFO_QUERY, (f'public.{quote_ident(table)}',))
+    return _info_from_row(table, cursor.fetchone())
+
+
+async def atable_sample_info(conn, table: str) -> TableSampleInfo:
+    """Async variant of table_sample_info on an asyncpg connection."""
+    row = await conn.fetchrow(ASYNC_TABLE_SAMPLE_INFO_QUERY, f'public.{quote_ident(table)}')
+    return _info_from_row(table, tuple(row) if row is not None else None)
+
+
+def sample_clause(info: TableSampleInfo, rows: int, method: str = "auto", seed: int = SAMPLE_SEED) -> str:
+    """TABLESAMPLE clause expected to yield a little over `rows` rows, or '' to read the table as is.
+
+    Small tables, views and tables of unknown size are not sampled. Otherwise
+    BERNOULLI picks individual rows; SYSTEM picks whole pages, which is far
+    cheaper on very large tables but clusters the rows it returns.
+    """
+    if method == "none" or not info.supports_tablesample or not info.row_estimate:
+        return ""
+    if info.row_estimate <= rows:
+        return ""
+    if method == "auto":
+        method = "system" if info.row_estimate >= SAMPLE_SYSTEM_MIN_ROWS else "bernoulli"
+
+    wanted = rows * OVERSAMPLE_FACTOR
+    if method == "system" and info.pages:
+        rows_per_page = max(1.0, info.row_estimate / info.pages)
+        pages = max(SYSTEM_MIN_PAGES, math.ceil(wanted / rows_per_page))
+        percent = 100.0 * pages / info.pages
+    else:
+        percent = 100.0 * wanted / info.row_estimate
+    percent = min(100.0, percent)
+    return f" TABLESAMPLE {method.upper()} ({percent:.10f}) REPEATABLE ({seed})"
+
+
+def build_sample_query(info: TableSampleInfo, limit: int, method: str = "auto",
+                       seed: int = SAMPLE_SEED, stratify_by: Optional[str] = None,
+                       pool_rows: int = STRATIFY_POOL_ROWS) -> str:
+    """Build a query returning `limit` random rows of a table.
+
+    Sampled rows are shuffled by a hash of their contents, so the result does
+    not favour the start of the table and is the same on every call. With
+    `stratify_by`, a larger pool of rows is drawn and dealt out round-robin
+    across the column's values, so rare values show up next to common ones.
+    """
+    table = f"public.{quote_ident(info.table)}"
+    shuffle = "md5(_sample::text)"
+    if stratify_by is None:
+        clause = sample_clause(info, limit, method, seed)
+        if not clause:
+            return f"SELECT * FROM {table} LIMIT {limit};"
+        return f"SELECT _sample.* FROM {table} AS _sample{clause} ORDER BY {shuffle} LIMIT {limit};"
+
+    if stratify_by not in info.column_names:
+        raise ValueError(f"Column '{stratify_by}' does not exist in table '{info.table}'")
+    clause = sample_clause(info, max(limit, pool_rows), method, seed)
+    columns = ", ".join(quote_ident(name) for name in info.column_names)
+    stratum = quote_ident(stratify_by)
+    return (
+        f"SELECT {columns} FROM ("
+        f"SELECT _sample.*, row_number() OVER (PARTITION BY _sample.{stratum} ORDER BY {shuffle}) AS _stratum_rank "
+        f"FROM {table} AS _sample{clause}"
+        f") AS _strata ORDER BY _stratum_rank, {stratum} LIMIT {limit};"
+    )
+
+
+def set_statement_timeout(cursor, timeout_ms: int = SAMPLE_STATEMENT_TIMEOUT_MS):
+    # SET LOCAL ends with the transaction, which the pool rolls back on release
+    cursor.execute(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+async def aset_statement_timeout(conn, timeout_ms: int = SAMPLE_STATEMENT_TIMEOUT_MS):
+    await conn.execute(f"SET LOCAL statement_timeout = {int(timeout_ms)}")